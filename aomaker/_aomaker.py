@@ -5,12 +5,12 @@ from functools import wraps
 
 import yaml
 import click
-from jsonpath import jsonpath
 from genson import SchemaBuilder
 
 from aomaker.path import BASEDIR
 from aomaker.exceptions import FileNotFound, YamlKeyError
 from aomaker.hook_manager import cli_hook, session_hook
+from aomaker.core.extractor import extract_one
 
 
 
@@ -74,8 +74,7 @@ def genson(data):
 
 
 def _extract_by_jsonpath(source: Text, jsonpath_expr: Text, index: int):
-    target = jsonpath(source, jsonpath_expr)[index]
-    return target
+    return extract_one(source, jsonpath_expr, index)
 
 
 
@@ -11,6 +11,10 @@ class DataBase:
     CACHE_TABLE = 'cache'
     SCHEMA_TABLE = 'schema'
     STATS_TABLE = 'statistics'
+    LATENCY_TABLE = 'latency'
+    MIDDLEWARE_TIMING_TABLE = 'middleware_timing'
+    RETRY_STATS_TABLE = 'retry_stats'
+    PHASE_TIMING_TABLE = 'phase_timing'
     CACHE_VAR_NAME = 'var_name'
     CACHE_RESPONSE = 'response'
     CACHE_WORKER = 'worker'
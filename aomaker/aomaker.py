@@ -1,6 +1,8 @@
 # --coding:utf-8--
 from aomaker._aomaker import command, hook, genson, data_maker
 from aomaker.extension.retry.retry import retry, AoMakerRetry
+from aomaker.core.polling import wait_until
+from aomaker.core.extractor import extract, extract_one
 
 __all__ = [
     'command',
@@ -8,5 +10,8 @@ __all__ = [
     'genson',
     'data_maker',
     'retry',
-    'AoMakerRetry'
+    'AoMakerRetry',
+    'wait_until',
+    'extract',
+    'extract_one'
 ]
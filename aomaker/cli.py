@@ -96,8 +96,13 @@ def mock():
 @click.option("--no_gen", help="Don't generate allure reports.", is_flag=True, flag_value=False, default=True)
 @click.option("-p", "--processes", default=None, type=int,
               help="Number of processes to run concurrently. Defaults to the number of CPU cores available on the system.")
+@click.option("--per-worker-log", "per_worker_log", is_flag=True, default=False,
+              help="In multi-process mode, also write a separate log file for each worker.")
+@click.option("--profile-middlewares", "profile_middlewares", is_flag=True, default=False,
+              help="Measure the self time of each middleware (excluding call_next) and report it at session end.")
 @click.pass_context
-def run(ctx, env, log_level, mp, mt, d_suite, d_file, d_mark, skip_login, no_gen, processes, **custom_kwargs):
+def run(ctx, env, log_level, mp, mt, d_suite, d_file, d_mark, skip_login, no_gen, processes, per_worker_log,
+        profile_middlewares, **custom_kwargs):
     from aomaker.runner import run_tests, RunConfig
     pytest_args = ctx.args
     extra_custom_kwargs = ctx.obj or {}
@@ -127,7 +132,9 @@ def run(ctx, env, log_level, mp, mt, d_suite, d_file, d_mark, skip_login, no_gen
         pytest_args=pytest_args,
         login_obj=login_obj,
         report_enabled=no_gen,
-        processes=processes
+        processes=processes,
+        per_worker_log=per_worker_log,
+        profile_middlewares=profile_middlewares
     )
 
     run_tests(run_config)
@@ -199,6 +206,71 @@ def query_stats(package, showindex):
     console.print(table)
 
 
+@show.command(name="calls")
+@click.option("--path", "log_path", default=None,
+              help="JSONL call log file or directory. Defaults to logs/calls.")
+@click.option("--sort", "sort_by", default="p95", show_default=True,
+              type=click.Choice(["count", "errors", "retries", "conns", "ttfb", "p50", "p90", "p95", "p99", "max"]),
+              help="Sort endpoints by this column (descending).")
+@click.option("--top", default=None, type=int, help="Only show the top N endpoints.")
+def show_calls(log_path, sort_by, top):
+    """Show per-endpoint latency percentiles from the JSONL call log."""
+    from aomaker.core.call_log import CALL_LOG_DIR, call_log_files, iter_call_records, summarize_calls
+
+    files = call_log_files(log_path or CALL_LOG_DIR)
+    if not files:
+        print_message(f"未找到接口调用记录: {log_path or CALL_LOG_DIR}，"
+                      f"请在 middlewares.yaml 中开启 logging_middleware 的 call_log 选项", style="bold red")
+        return
+
+    summary = summarize_calls(iter_call_records(files))
+    total = sum(stats.count for stats in summary.values())
+    print_message(f"Total calls: {total}, endpoints: {len(summary)}", style="bold green")
+
+    def sort_key(item):
+        stats = item[1]
+        if sort_by == "count":
+            return stats.count
+        if sort_by == "errors":
+            return stats.errors
+        if sort_by == "retries":
+            return stats.retries
+        if sort_by == "conns":
+            return stats.new_connections
+        if sort_by == "ttfb":
+            return stats.ttfb.quantile(0.95) or 0
+        if sort_by == "max":
+            return stats.histogram.max
+        return stats.histogram.quantile(int(sort_by[1:]) / 100) or 0
+
+    rows = sorted(summary.items(), key=sort_key, reverse=True)
+    if top:
+        rows = rows[:top]
+
+    console = Console()
+    table = Table(show_header=True, header_style="bold magenta", title="API Call Latency (ms)", show_edge=True,
+                  border_style="green")
+    table.add_column("Method", style="cyan", no_wrap=True)
+    table.add_column("Route", style="green")
+    # 调用记录中带有分阶段计时时，额外展示新建连接数和首字节耗时
+    has_timing = any(stats.ttfb.count for _, stats in rows)
+    timing_columns = ("Conns", "TTFB p95") if has_timing else ()
+    for column in ("Count", "Errors", "Retries") + timing_columns + ("p50", "p90", "p95", "p99", "Max"):
+        table.add_column(column, justify="right")
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    for (method, route), stats in rows:
+        hist = stats.histogram
+        timing_cells = (str(stats.new_connections), fmt(stats.ttfb.quantile(0.95))) if has_timing else ()
+        table.add_row(method, route, str(stats.count), str(stats.errors), str(stats.retries), *timing_cells,
+                      fmt(hist.quantile(0.5)), fmt(hist.quantile(0.9)), fmt(hist.quantile(0.95)),
+                      fmt(hist.quantile(0.99)), fmt(hist.max if hist.count else None))
+
+    console.print(table)
+
+
 @gen.command(name="stats")
 @click.option("--api-dir", default="apis", type=click.Path(exists=True), show_default=True, help="Specify the api dir.")
 def gen_stats(api_dir):
@@ -340,6 +412,8 @@ def main_run(env: str = None,
              no_gen: bool = True,
              pytest_args: List[str] = None,
              processes: int = None,
+             per_worker_log: bool = False,
+             profile_middlewares: bool = False,
              **custom_kwargs):
     print(__image__)
     cli_hook.custom_kwargs = custom_kwargs
@@ -369,7 +443,9 @@ def main_run(env: str = None,
         pytest_args=pytest_args,
         login_obj=login_obj,
         report_enabled=no_gen,
-        processes=processes
+        processes=processes,
+        per_worker_log=per_worker_log,
+        profile_middlewares=profile_middlewares
     )
 
     run_tests(run_config)
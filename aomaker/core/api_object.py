@@ -88,6 +88,7 @@ class BaseAPIObject(Generic[ResponseT]):
     def send(self, 
             override_headers: bool = False,
             stream: bool = False, 
+            structure: bool = True,
             **request_kwargs) -> AoResponse[ResponseT]:
         """
         发送请求并返回响应
@@ -95,6 +96,7 @@ class BaseAPIObject(Generic[ResponseT]):
         Args:
             override_headers: 是否覆盖默认请求头
             stream: 是否使用流式响应
+            structure: 是否校验并结构化响应模型；大列表响应只做列式断言时可关闭（response_model 为 None）
             **request_kwargs: 其他请求参数
             
         Returns:
@@ -108,20 +110,22 @@ class BaseAPIObject(Generic[ResponseT]):
             **request_kwargs
         )
         
-        return self._handle_response(cached_response, stream)
+        return self._handle_response(cached_response, stream, structure)
     
-    def _handle_response(self, cached_response, stream: bool = False) -> AoResponse[ResponseT]:
+    def _handle_response(self, cached_response, stream: bool = False, structure: bool = True) -> AoResponse[ResponseT]:
         """
         处理 HTTP 响应
         """
-        if stream or self.response is None:
+        if stream or not structure or self.response is None:
             parsed = None
         else:
             parsed = self._parse_response(cached_response)
         return AoResponse(
             cached_response=cached_response,
             response_model=parsed,
-            is_stream=stream
+            is_stream=stream,
+            response_type=self.response,
+            converter=self.converter
         )
     
     def _prepare_request(self, is_stream: bool) -> Dict[str, Any]:
@@ -130,7 +134,14 @@ class BaseAPIObject(Generic[ResponseT]):
         req["_api_meta"] = {
             "class_name": self.class_name,
             "class_doc": self.class_doc.strip(),
-            "is_streaming": is_stream
+            "is_streaming": is_stream,
+            "route": self.endpoint_config.route,
+            "method": self.endpoint_config.method,
+            "tags": self.endpoint_config.tags,
+            "cache": self.endpoint_config.cache,
+            "coalesce": self.endpoint_config.coalesce,
+            "retry": self.endpoint_config.retry,
+            "compress": self.endpoint_config.compress
         }
         
         if is_stream:
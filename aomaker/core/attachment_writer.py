@@ -0,0 +1,161 @@
+# --coding:utf-8--
+"""
+allure 附件异步写入
+
+allure.attach 会在调用线程上同步写一次文件。这里把附件登记（必须在当前测试上下文中完成）
+和文件写入拆开：登记仍在请求线程上进行，文件内容交给后台线程通过有界队列写入，
+并在每个用例结束前 flush，保证用例结果落盘时附件已经写好。
+
+可选：
+    dedup: 以内容哈希作为文件名，相同内容只写一次
+    compress_size: 超过该字节数的附件以 gzip 压缩存储（0 表示不压缩）
+
+登记附件依赖 allure-pytest 报告器的私有方法 _attach，报告器在首次写附件时查找一次并缓存，
+每个 pytest 会话开始时重新查找；私有接口不存在或签名不兼容时退化为同步的 allure.attach。
+"""
+import gzip
+import hashlib
+import os
+import queue
+import threading
+import uuid
+from typing import Optional, Set, Tuple, Union
+
+import allure
+from allure_commons import plugin_manager
+
+from aomaker.log import logger
+
+GZIP_MIME_TYPE = "application/gzip"
+
+_STOP = object()
+_UNRESOLVED = object()
+
+
+def _find_allure_target() -> Optional[Tuple[object, str]]:
+    """查找当前激活的 allure 报告器与结果目录，未启用 allure（无 --alluredir）时返回 None"""
+    reporter = report_dir = None
+    for plugin in plugin_manager.get_plugins():
+        if reporter is None and hasattr(getattr(plugin, "allure_logger", None), "_attach"):
+            reporter = plugin.allure_logger
+        elif report_dir is None and isinstance(getattr(plugin, "_report_dir", None), str):
+            report_dir = plugin._report_dir
+    if reporter is None or report_dir is None:
+        return None
+    return reporter, report_dir
+
+
+class AttachmentWriter:
+    """后台线程 + 有界队列的 allure 附件写入器"""
+
+    def __init__(self, maxsize: int = 1000, dedup: bool = True, compress_size: int = 0):
+        self.maxsize = maxsize
+        self.dedup = dedup
+        self.compress_size = compress_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._written: Set[str] = set()
+        # (报告器, 结果目录)，None 表示未启用 allure 或私有接口不可用
+        self._target = _UNRESOLVED
+        self._active = _UNRESOLVED
+
+    def configure(self, dedup: Optional[bool] = None, compress_size: Optional[int] = None):
+        if dedup is not None:
+            self.dedup = dedup
+        if compress_size is not None:
+            if compress_size < 0:
+                raise ValueError(f"compress_size 不能为负数: {compress_size}")
+            self.compress_size = compress_size
+
+    def reset(self):
+        """丢弃缓存的 allure 报告器，下次写附件时重新查找（pytest 会话开始时调用）"""
+        self._target = _UNRESOLVED
+        self._active = _UNRESOLVED
+
+    def reporter_active(self) -> bool:
+        """是否有 allure 报告器接收附件；没有时附件会被丢弃，调用方可以跳过附件内容的生成"""
+        if self._active is _UNRESOLVED:
+            self._active = bool(plugin_manager.hook.attach_data.get_hookimpls())
+        return self._active
+
+    def attach(self, body: Union[str, bytes], name: str = None,
+               attachment_type: allure.attachment_type = allure.attachment_type.TEXT):
+        """
+        登记附件并异步写入；未找到 allure 报告器时退化为同步的 allure.attach
+        """
+        target = self._target
+        if target is _UNRESOLVED:
+            target = self._target = _find_allure_target()
+        if target is None:
+            allure.attach(body, name=name, attachment_type=attachment_type)
+            return
+        reporter, report_dir = target
+
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        compress = bool(self.compress_size) and len(data) >= self.compress_size
+        if compress:
+            mime_type, extension = GZIP_MIME_TYPE, f"{attachment_type.extension}.gz"
+        else:
+            mime_type, extension = attachment_type.mime_type, attachment_type.extension
+        prefix = hashlib.sha1(data).hexdigest() if self.dedup else uuid.uuid4()
+
+        try:
+            file_name = reporter._attach(prefix, name=name, attachment_type=mime_type, extension=extension)
+        except TypeError:
+            # 私有接口签名与预期不符，之后都使用公开接口
+            self._target = None
+            allure.attach(body, name=name, attachment_type=attachment_type)
+            return
+        self._ensure_started()
+        self._queue.put((os.path.join(report_dir, file_name), data, compress))
+
+    def flush(self):
+        """阻塞直到队列中的附件全部写完"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """写完剩余附件并停止后台线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self.reset()
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="allure-attachment-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.warning(f"Allure附件写入失败: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path: str, data: bytes, compress: bool):
+        if self.dedup and (path in self._written or os.path.exists(path)):
+            return
+        if compress:
+            data = gzip.compress(data)
+        # 先写临时文件再替换，避免多进程同时写同一个去重文件时读到半截内容
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self.dedup:
+            self._written.add(path)
+
+
+attachment_writer = AttachmentWriter()
@@ -1,11 +1,21 @@
 # --coding:utf-8--
 from __future__ import annotations
+import asyncio
+import copy
+import hashlib
+import json
+import os
 from enum import Enum
-from typing import Dict, List, Any, Optional, TypeVar, Generic, Callable, Union, Iterator, Tuple
+from typing import Dict, List, Any, Optional, TypeVar, Generic, Callable, Union, Iterator, AsyncIterator, Tuple, \
+    Type, get_type_hints, get_origin, get_args
 
-from attrs import define, field
+from attrs import define, field, has, fields
 
 from aomaker.core.http_client import CachedResponse
+from aomaker.core.json_stream import iter_json_items, parse_stream_path
+from aomaker.core.columnar import Columns, locate_rows
+from aomaker.core.extractor import extract
+from aomaker.core.sse import ServerSentEvent, SSEParser, iter_sse_events
 
 class HTTPMethod(str, Enum):
     GET = "GET"
@@ -56,6 +66,15 @@ class EndpointConfig:
     route: str = field(default="")
     method: HTTPMethod = field(default="")
     route_params: List[str] = field(factory=list)
+    tags: Tuple[str, ...] = field(factory=tuple)
+    # 响应缓存：True 使用缓存中间件的 default_ttl，数字表示新鲜期秒数（仅 GET 生效）
+    cache: Union[bool, float] = field(default=False)
+    # 合并同时进行的相同请求（仅 GET/HEAD 生效）
+    coalesce: bool = field(default=False)
+    # 传输层重试：None 时只重试幂等方法，True/False 对该接口强制开启/关闭
+    retry: Optional[bool] = field(default=None)
+    # 请求体压缩：True 使用压缩中间件的默认算法，也可指定 "gzip"/"deflate"/"br"/"zstd"；False 强制关闭
+    compress: Optional[Union[bool, str]] = field(default=None)
 
 
 @define(frozen=True)
@@ -73,25 +92,38 @@ RequestBodyT = TypeVar("RequestBodyT", bound=type)
 ResponseT = TypeVar("ResponseT")
 
 
+@define(frozen=True)
+class DownloadedFile:
+    path: str
+    size: int
+    checksum: str
+    algorithm: str
+
+
 @define
 class AoResponse(Generic[ResponseT]):
     cached_response: CachedResponse = field()
     response_model: Optional[ResponseT] = field(default=None)
     is_stream: bool = field(default=False)
+    response_type: Optional[Type[ResponseT]] = field(default=None)
+    converter: Any = field(default=None)
+    _indexes: Dict[Tuple[str, str], Dict[Any, List[Any]]] = field(factory=dict, init=False, repr=False, eq=False)
 
     def process_stream(self, 
                       stream_mode: Optional[str]=None, 
                       chunk_size: int = 512,
                       decode_unicode: bool = True,
-                      callback: Optional[Callable] = None) -> "AoResponse[ResponseT]":
+                      callback: Optional[Callable] = None,
+                      json_path: str = "[*]") -> "AoResponse[ResponseT]":
         """
         处理流式响应
         
         Args:
-            stream_mode: 流处理模式，可选值：None(原始流)、'lines'、'json'
+            stream_mode: 流处理模式，可选值：None(原始流)、'lines'、'json'、'sse'（回调接收 ServerSentEvent）
             chunk_size: 流式处理时每个数据块的大小
             decode_unicode: 是否解码流式响应
             callback: 回调函数，用于处理每个数据块
+            json_path: 'json' 模式下要增量解析的数组路径，例如 'data.items[*]'
             
         Returns:
             AoResponse[ResponseT]: 返回自身，支持链式调用
@@ -106,7 +138,10 @@ class AoResponse(Generic[ResponseT]):
             if stream_mode == 'lines':
                 self._process_stream_lines(chunk_size, decode_unicode, callback)
             elif stream_mode == 'json':
-                self._process_stream_json(chunk_size, decode_unicode, callback)
+                self._process_stream_json(chunk_size, json_path, callback)
+            elif stream_mode == 'sse':
+                for event in iter_sse_events(self.cached_response.raw_response.iter_content(chunk_size=chunk_size)):
+                    callback(event)
             else:
                 self._process_stream_content(chunk_size, decode_unicode, callback)
         finally:
@@ -119,21 +154,417 @@ class AoResponse(Generic[ResponseT]):
             if line:
                 callback(line)
     
-    def _process_stream_json(self, chunk_size, decode_unicode, callback):
-        for json_obj in self.cached_response.raw_response.iter_json(chunk_size=chunk_size, decode_unicode=decode_unicode):
-            if json_obj:
-                callback(json_obj)
+    def _process_stream_json(self, chunk_size, json_path, callback):
+        chunks = self.cached_response.raw_response.iter_content(chunk_size=chunk_size)
+        for json_obj in iter_json_items(chunks, json_path):
+            callback(json_obj)
     
     def _process_stream_content(self, chunk_size, decode_unicode, callback):
         for chunk in self.cached_response.raw_response.iter_content(chunk_size=chunk_size, decode_unicode=decode_unicode):
             if chunk:
                 callback(chunk)
 
-    def first(self) -> Optional[ResponseT]:
-        ...
+    def save_to(self,
+                path: Union[str, os.PathLike],
+                chunk_size: int = 1024 * 1024,
+                algorithm: str = "sha256",
+                expected_checksum: Optional[str] = None) -> DownloadedFile:
+        """
+        把响应体写入文件，边写边计算校验和
+
+        流式响应（send(stream=True)）按 chunk_size 从网络读取后立即写盘，内存占用与文件大小无关。
+        先写入同目录下的 .part 临时文件，完成且校验通过后再原子地替换为目标文件。
+
+        Args:
+            path: 目标文件路径，父目录不存在时自动创建
+            chunk_size: 每次读取写入的字节数
+            algorithm: hashlib 支持的摘要算法
+            expected_checksum: 期望的十六进制摘要，不一致时删除文件并抛出 ValueError
+
+        Returns:
+            DownloadedFile: 文件路径、字节数与校验和
+        """
+        path = os.fspath(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        digest = hashlib.new(algorithm)
+        size = 0
+        tmp_path = f"{path}.part"
+        raw_response = self.cached_response.raw_response
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in raw_response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            checksum = digest.hexdigest()
+            if expected_checksum is not None and checksum != expected_checksum.lower():
+                raise ValueError(f"文件校验失败: {path}，期望 {algorithm}={expected_checksum}，实际 {checksum}")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if self.is_stream:
+                raw_response.close()
+        return DownloadedFile(path=path, size=size, checksum=checksum, algorithm=algorithm)
+
+    def iter_json(self,
+                  path: str = "[*]",
+                  item_type: Optional[type] = None,
+                  chunk_size: int = 64 * 1024) -> Iterator[Any]:
+        """
+        增量解析流式 JSON 响应，逐个产出 path 指向数组中的元素
+
+        Args:
+            path: 数组路径，例如 'data.items[*]'，'[*]' 表示顶层数组
+            item_type: 元素结构化类型；为空时尝试从响应模型的字段注解推断，推断失败则产出原始数据
+            chunk_size: 每次从网络读取的字节数
+
+        Yields:
+            结构化后的元素（或原始 JSON 数据）
+        """
+        if not self.is_stream:
+            raise ValueError("这不是一个流式响应")
+
+        if item_type is None:
+            item_type = _resolve_stream_item_type(self.response_type, path)
+
+        raw_response = self.cached_response.raw_response
+        try:
+            chunks = raw_response.iter_content(chunk_size=chunk_size)
+            for item in iter_json_items(chunks, path):
+                if item_type is None:
+                    yield item
+                else:
+                    yield self._structure(item, item_type)
+        finally:
+            raw_response.close()
+
+    def iter_events(self,
+                    decode_json: bool = False,
+                    item_type: Optional[type] = None,
+                    stop_data: Optional[str] = "[DONE]",
+                    chunk_size: int = 8 * 1024,
+                    max_buffer_size: int = 1024 * 1024) -> Iterator[ServerSentEvent]:
+        """
+        按 Server-Sent Events 协议解析流式响应，逐个产出事件
+
+        数据按需从网络读取：消费方处理完当前事件前不会继续读取，内存中最多保留一个数据块的事件。
+
+        Args:
+            decode_json: 把每个事件的 data 解析为 JSON
+            item_type: data 的结构化类型，指定时隐含 decode_json；
+                为空且 decode_json 时使用接口声明的响应模型（SSE 接口的响应模型描述的是单个事件）
+            stop_data: data 等于该值时结束迭代（不产出该事件），默认兼容 LLM 接口的 '[DONE]'，None 表示读到流结束
+            chunk_size: 每次从网络读取的字节数
+            max_buffer_size: 单个事件（含未完成的行）允许缓冲的最大字符数，超出抛出 ValueError
+
+        Yields:
+            ServerSentEvent: data 为原始文本，或解析/结构化后的对象
+        """
+        if not self.is_stream:
+            raise ValueError("这不是一个流式响应")
+        item_type = self._event_item_type(decode_json, item_type)
+
+        raw_response = self.cached_response.raw_response
+        try:
+            chunks = raw_response.iter_content(chunk_size=chunk_size)
+            for event in iter_sse_events(chunks, max_buffer_size=max_buffer_size):
+                if stop_data is not None and event.data == stop_data:
+                    return
+                yield self._decode_event(event, decode_json, item_type)
+        finally:
+            raw_response.close()
+
+    async def aiter_events(self,
+                           decode_json: bool = False,
+                           item_type: Optional[type] = None,
+                           stop_data: Optional[str] = "[DONE]",
+                           chunk_size: int = 8 * 1024,
+                           max_buffer_size: int = 1024 * 1024) -> AsyncIterator[ServerSentEvent]:
+        """
+        iter_events 的异步版本，参数含义相同
+
+        阻塞的网络读取在默认线程池中执行，每次只读取一个数据块，事件循环不会被阻塞，
+        消费方处理慢时也不会在内存中堆积数据。
+        """
+        if not self.is_stream:
+            raise ValueError("这不是一个流式响应")
+        item_type = self._event_item_type(decode_json, item_type)
+
+        loop = asyncio.get_running_loop()
+        raw_response = self.cached_response.raw_response
+        parser = SSEParser(max_buffer_size=max_buffer_size)
+        try:
+            chunks = raw_response.iter_content(chunk_size=chunk_size)
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                events = parser.close() if chunk is None else parser.feed(chunk)
+                for event in events:
+                    if stop_data is not None and event.data == stop_data:
+                        return
+                    yield self._decode_event(event, decode_json, item_type)
+                if chunk is None:
+                    return
+        finally:
+            raw_response.close()
+
+    def _event_item_type(self, decode_json: bool, item_type: Optional[type]) -> Optional[type]:
+        if item_type is None and decode_json:
+            return self.response_type
+        return item_type
 
-    def filter(self, condition: Callable[[ResponseT], bool]) -> "AoResponse[ResponseT]":
-        ...
+    def _decode_event(self, event: ServerSentEvent, decode_json: bool, item_type: Optional[type]) -> ServerSentEvent:
+        if not decode_json and item_type is None:
+            return event
+        data = json.loads(event.data)
+        if item_type is not None:
+            data = self._structure(data, item_type)
+        return ServerSentEvent(data=data, event=event.event, id=event.id, retry=event.retry)
+
+    def _structure(self, data: Any, type_: type) -> Any:
+        if self.converter is not None:
+            return self.converter.structure(data, type_)
+        from aomaker.core.converters import RequestConverter
+        self.converter = RequestConverter()
+        return self.converter.structure(data, type_)
+
+    def columns(self, *fields: str, path: str = "data[*]", backend: str = "auto") -> Columns:
+        """
+        从列表型响应中按列提取字段，跳过逐行的 attrs 结构化
+
+        Args:
+            fields: 要提取的字段名，支持 'owner.id' 形式的嵌套字段
+            path: 行列表所在路径，例如 'data[*]'、'data.items[*]'、'[*]'
+            backend: 列存储后端：'auto'（装了 numpy 则用 numpy，否则 array）、'array'、'numpy'、'pyarrow'
+
+        Returns:
+            Columns: 支持 all / unique / is_sorted / sum 等整列断言
+        """
+        if self.is_stream:
+            raise ValueError("流式响应不支持列式提取，请使用 iter_json")
+        rows = locate_rows(self.cached_response.json(), path)
+        return Columns.from_rows(rows, fields, backend)
+
+    def extract(self, expr: str) -> List[Any]:
+        """按 jsonpath 表达式从原始响应 JSON 中提取，不依赖响应模型，例如 resp.extract("$.data[*].id")"""
+        if self.is_stream:
+            raise ValueError("流式响应不支持提取，请使用 iter_json")
+        return extract(self.cached_response, expr)
+
+    def items(self, path: Optional[str] = None) -> List[Any]:
+        """
+        返回结构化响应中的行列表；没有响应模型时从原始响应 JSON 中读取
+
+        Args:
+            path: 行列表所在路径，例如 'data[*]'、'data.items[*]'；
+                  为空时，响应本身是列表则取 '[*]'，否则取 'data[*]'
+        """
+        if self.is_stream:
+            raise ValueError("流式响应不支持查询，请使用 iter_json")
+        path = self._default_items_path(path)
+        current = self._query_source()
+        for key in parse_stream_path(path):
+            current = _get_member(current, key, _MISSING)
+            if current is _MISSING:
+                source = "响应模型" if self.response_model is not None else "响应"
+                raise ValueError(f"{source}中不存在路径: {path}")
+        if current is None:
+            return []
+        if not isinstance(current, (list, tuple)):
+            raise ValueError(f"路径 {path} 指向的不是数组，而是 {type(current).__name__}")
+        return current
+
+    def first(self, path: Optional[str] = None, **criteria: Any) -> Optional[Any]:
+        """返回第一行（或第一条满足 criteria 的行），没有则返回 None"""
+        if criteria:
+            matched = self.find(path, **criteria)
+            return matched[0] if matched else None
+        rows = self.items(path)
+        return rows[0] if rows else None
+
+    def filter(self, condition: Callable[[Any], bool], path: Optional[str] = None) -> "AoResponse[ResponseT]":
+        """
+        按条件过滤行，返回一个新的 AoResponse，其响应模型中只保留满足条件的行
+
+        原始的 cached_response 保持不变，支持 resp.filter(...).first() 这类链式调用
+        """
+        path = self._default_items_path(path)
+        rows = [row for row in self.items(path) if condition(row)]
+        model = _replace_at(self._query_source(), parse_stream_path(path), rows)
+        return AoResponse(cached_response=self.cached_response,
+                          response_model=model,
+                          is_stream=self.is_stream,
+                          response_type=self.response_type,
+                          converter=self.converter)
+
+    def exists(self, path: Optional[str] = None, **criteria: Any) -> bool:
+        """是否存在任意行（或任意满足 criteria 的行）"""
+        if criteria:
+            return bool(self.find(path, **criteria))
+        return bool(self.items(path))
+
+    def index_by(self, field_name: str, path: Optional[str] = None) -> Dict[Any, List[Any]]:
+        """
+        按字段值建立哈希索引：{字段值: [行, ...]}
+
+        索引在首次调用时构建并缓存在当前响应上，之后的查找都是 O(1)。
+        字段支持 'owner.id' 形式的嵌套字段，也可以使用接口原始字段名。
+        字段值不可哈希（如 list / dict）时抛出 TypeError，该结果同样会被缓存。
+        构建索引后请不要再修改响应模型中的行，否则索引会过期。
+        """
+        path = self._default_items_path(path)
+        key = (path, field_name)
+        index = self._indexes.get(key)
+        if index is _UNINDEXABLE:
+            raise TypeError(f"字段 {field_name} 的值不可哈希，无法建立索引")
+        if index is None:
+            parts = field_name.split(".")
+            index = {}
+            for row in self.items(path):
+                value = _get_nested(row, parts)
+                try:
+                    bucket = index.get(value)
+                except TypeError:
+                    self._indexes[key] = _UNINDEXABLE
+                    raise TypeError(f"字段 {field_name} 的值不可哈希，无法建立索引: {value!r}") from None
+                if bucket is None:
+                    index[value] = [row]
+                else:
+                    bucket.append(row)
+            self._indexes[key] = index
+        return index
+
+    def find(self, path: Optional[str] = None, **criteria: Any) -> List[Any]:
+        """
+        返回所有字段值与 criteria 完全相等的行
+
+        每个条件字段都会通过 index_by 建立（并复用）索引，
+        多个条件时取候选最少的索引桶再逐行比对其余条件。
+        条件值或字段值不可哈希（如 list / dict）时该条件无法建立索引，改为逐行比对。
+
+        Usage:
+            resp.find(status="running")
+            resp.find(path="data.items[*]", owner__id=1)  # owner__id 等价于 'owner.id'
+        """
+        if not criteria:
+            raise ValueError("至少需要指定一个查询条件")
+        buckets = []
+        for name, expected in criteria.items():
+            field_name = name.replace("__", ".")
+            parts = field_name.split(".")
+            try:
+                bucket = self.index_by(field_name, path).get(expected)
+            except TypeError:
+                bucket = [row for row in self.items(path) if _get_nested(row, parts) == expected]
+            if not bucket:
+                return []
+            buckets.append((bucket, parts, expected))
+        buckets.sort(key=lambda item: len(item[0]))
+        candidates = buckets[0][0]
+        rest = [(parts, expected) for _, parts, expected in buckets[1:]]
+        return [row for row in candidates
+                if all(_get_nested(row, parts) == expected for parts, expected in rest)]
+
+    def _query_source(self) -> Any:
+        """查询的数据来源：响应模型，没有响应模型时为原始响应 JSON"""
+        if self.response_model is not None:
+            return self.response_model
+        return self.cached_response.json()
+
+    def _default_items_path(self, path: Optional[str]) -> str:
+        if path is not None:
+            return path
+        return "[*]" if isinstance(self._query_source(), (list, tuple)) else "data[*]"
+
+
+_MISSING = object()
+# 字段值不可哈希、无法建立索引的 (路径, 字段)
+_UNINDEXABLE = object()
+# attrs 模型类 -> {属性名 / 别名 / 接口原始字段名: 属性名}
+_member_names: Dict[type, Dict[str, str]] = {}
+
+
+def _attr_names(cls: type) -> Dict[str, str]:
+    names = _member_names.get(cls)
+    if names is None:
+        names = {}
+        for attr in fields(cls):
+            for name in (attr.name, attr.alias, attr.metadata.get("original_name")):
+                if name:
+                    names.setdefault(name, attr.name)
+        _member_names[cls] = names
+    return names
+
+
+def _get_member(obj: Any, key: str, default: Any = None) -> Any:
+    """按字段名读取 dict 键或 attrs 属性，attrs 模型同时支持别名与接口原始字段名"""
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    cls = type(obj)
+    if has(cls):
+        name = _attr_names(cls).get(key)
+        return default if name is None else getattr(obj, name)
+    return getattr(obj, key, default)
+
+
+def _get_nested(obj: Any, parts: List[str]) -> Any:
+    for part in parts:
+        if obj is None:
+            return None
+        obj = _get_member(obj, part)
+    return obj
+
+
+def _replace_at(obj: Any, keys: List[str], value: Any) -> Any:
+    """返回 obj 的浅拷贝，其中 keys 路径处的值被替换为 value"""
+    if not keys:
+        return value
+    key, rest = keys[0], keys[1:]
+    if isinstance(obj, dict):
+        return {**obj, key: _replace_at(obj.get(key), rest, value)}
+    name = _attr_names(type(obj)).get(key) if has(type(obj)) else None
+    if name is not None:
+        clone = copy.copy(obj)
+        object.__setattr__(clone, name, _replace_at(getattr(obj, name), rest, value))
+        return clone
+    raise ValueError(f"响应模型中不存在字段: {key}")
+
+
+def _unwrap_optional(tp):
+    if get_origin(tp) is Union:
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return tp
+
+
+def _resolve_stream_item_type(response_type: Optional[type], path: str) -> Optional[type]:
+    """沿 path 在 attrs 响应模型中查找数组元素类型，无法确定时返回 None"""
+    if response_type is None:
+        return None
+    current = response_type
+    for key in parse_stream_path(path):
+        current = _unwrap_optional(current)
+        if not has(current):
+            return None
+        try:
+            hints = get_type_hints(current)
+        except Exception:
+            return None
+        for attr in fields(current):
+            if key in (attr.name, attr.alias, attr.metadata.get("original_name")):
+                current = hints.get(attr.name)
+                break
+        else:
+            return None
 
-    def exists(self) -> bool:
-        ...
+    current = _unwrap_optional(current)
+    if get_origin(current) not in (list, List):
+        return None
+    args = get_args(current)
+    if not args or args[0] is Any:
+        return None
+    return args[0]
@@ -0,0 +1,175 @@
+# --coding:utf-8--
+"""
+接口调用 JSONL 日志
+
+每次接口调用写一行紧凑的 JSON 记录，用于离线分析（如 aomaker show calls 计算各接口的延迟分位数）。
+每个进程写自己的文件（logs/calls/<进程名>.jsonl），避免多进程交错写同一个文件；
+写入带缓冲，并按时间间隔 flush + fsync。
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from multiprocessing import current_process
+from threading import current_thread
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aomaker.path import LOG_DIR
+from aomaker.core.latency import LatencyHistogram
+
+CALL_LOG_DIR = os.path.join(LOG_DIR, "calls")
+CALL_LOG_SUFFIX = ".jsonl"
+
+
+def current_worker() -> str:
+    """多进程下为进程名，多线程/单进程下为线程名"""
+    process_name = current_process().name
+    if process_name != "MainProcess":
+        return process_name
+    return current_thread().name
+
+
+def current_test_node() -> Optional[str]:
+    """当前正在执行的 pytest 用例 node id"""
+    current = os.environ.get("PYTEST_CURRENT_TEST")
+    if not current:
+        return None
+    return current.rsplit(" ", 1)[0]
+
+
+class CallLogWriter:
+    """带缓冲、定期 fsync 的 JSONL 写入器，线程安全"""
+
+    def __init__(self, path: str, fsync_interval: float = 1.0, buffer_size: int = 64 * 1024):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+        self._file = None
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8", buffering=self.buffer_size)
+            self._file.write(line)
+            now = time.monotonic()
+            if now - self._last_sync >= self.fsync_interval:
+                self._sync()
+                self._last_sync = now
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+_writers: Dict[Tuple[str, float], CallLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_call_log_writer(log_dir: str = CALL_LOG_DIR, fsync_interval: float = 1.0) -> CallLogWriter:
+    """获取当前进程的写入器（每个进程一个文件）"""
+    path = os.path.join(log_dir, f"{current_process().name}-{os.getpid()}{CALL_LOG_SUFFIX}")
+    key = (path, fsync_interval)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = CallLogWriter(path, fsync_interval=fsync_interval)
+    return writer
+
+
+def close_call_log_writers():
+    for writer in list(_writers.values()):
+        writer.close()
+
+
+atexit.register(close_call_log_writers)
+
+
+def clean_call_logs(log_dir: str = CALL_LOG_DIR):
+    """清理上一次运行留下的调用日志"""
+    close_call_log_writers()
+    _writers.clear()
+    for path in glob.glob(os.path.join(log_dir, f"*{CALL_LOG_SUFFIX}")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def call_log_files(path: str = CALL_LOG_DIR) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, f"*{CALL_LOG_SUFFIX}")))
+    return [path] if os.path.exists(path) else []
+
+
+def iter_call_records(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """逐行流式读取调用日志，跳过不完整的行（如进程中断时的最后一行）"""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+class EndpointStats:
+    """单个接口的流式统计"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.retries = 0
+        self.new_connections = 0
+        self.ttfb = LatencyHistogram()
+
+    @property
+    def count(self) -> int:
+        return self.histogram.count
+
+    def add(self, record: Dict[str, Any]):
+        elapsed = record.get("elapsed_ms")
+        if elapsed is not None:
+            self.histogram.add(elapsed)
+        status = record.get("status")
+        if status is None or status >= 400:
+            self.errors += 1
+        self.retries += record.get("retries") or 0
+        if record.get("reused") is False:
+            self.new_connections += 1
+        ttfb = record.get("ttfb_ms")
+        if ttfb is not None:
+            self.ttfb.add(ttfb)
+
+
+def summarize_calls(records: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str], EndpointStats]:
+    """按 (method, route) 聚合调用记录"""
+    summary: Dict[Tuple[str, str], EndpointStats] = {}
+    for record in records:
+        key = (str(record.get("method") or "").upper(), record.get("route") or record.get("class") or "")
+        stats = summary.get(key)
+        if stats is None:
+            stats = summary[key] = EndpointStats()
+        stats.add(record)
+    return summary
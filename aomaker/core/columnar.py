@@ -0,0 +1,222 @@
+# --coding:utf-8--
+"""
+列式响应提取
+
+从列表型响应（如 ``{"data": [{...}, ...], "total": N}``）中一次遍历抽取指定字段，
+按列存放到 array / numpy / pyarrow 中，不对每一行做 attrs 结构化，
+并提供面向整列的断言辅助（all / unique / is_sorted / sum）。
+
+numpy 后端只用于数值列；含 None、字符串、混合类型或嵌套值的列仍按 array 后端存放为 list。
+"""
+import importlib
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .json_stream import parse_stream_path
+
+BACKENDS = ("auto", "array", "numpy", "pyarrow")
+
+_MISSING = object()
+
+
+def _import_optional(name: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def _resolve_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的列存储后端: {backend}，可选值: {BACKENDS}")
+    if backend == "auto":
+        return "numpy" if _import_optional("numpy") is not None else "array"
+    if backend != "array" and _import_optional(backend) is None:
+        raise ImportError(f"列存储后端 {backend} 需要先安装: pip install {backend}")
+    return backend
+
+
+def locate_rows(data: Any, path: str) -> List[Any]:
+    """按 'data[*]' 形式的路径定位响应中的行列表"""
+    current = data
+    for key in parse_stream_path(path):
+        if not isinstance(current, dict) or key not in current:
+            raise ValueError(f"响应中不存在路径: {path}")
+        current = current[key]
+    if not isinstance(current, list):
+        raise ValueError(f"路径 {path} 指向的不是数组，而是 {type(current).__name__}")
+    return current
+
+
+def _to_array_column(values: List[Any]):
+    """全为 int / float 的列转为 array，其余保持 list"""
+    if not values:
+        return values
+    kinds = {type(v) for v in values}
+    if kinds == {int}:
+        try:
+            return array("q", values)
+        except OverflowError:
+            return values
+    if kinds <= {int, float}:
+        return array("d", values)
+    return values
+
+
+class Columns:
+    """
+    列式数据，按字段名访问整列
+
+    Usage:
+        cols = resp.columns("status", "size", path="data[*]")
+        assert cols.all("status", "ok")
+        assert cols.unique("id")
+        assert cols.sum("size") == 1024
+    """
+
+    def __init__(self, columns: Dict[str, Any], backend: str, length: int,
+                 backends: Optional[Dict[str, str]] = None):
+        self._columns = columns
+        self.backend = backend
+        self._length = length
+        # 各列实际使用的后端，numpy 后端下非数值列回退为 array
+        self._backends = backends or dict.fromkeys(columns, backend)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], fields: Sequence[str], backend: str = "auto") -> "Columns":
+        if not fields:
+            raise ValueError("至少需要指定一个字段")
+        backend = _resolve_backend(backend)
+        # 重复的字段只提取一次，否则会共用同一个缓冲区
+        fields = list(dict.fromkeys(fields))
+
+        simple = [f for f in fields if "." not in f]
+        nested = [(f, f.split(".")) for f in fields if "." in f]
+        buffers: Dict[str, List[Any]] = {f: [] for f in fields}
+        simple_buffers = [(f, buffers[f].append) for f in simple]
+        nested_buffers = [(parts, buffers[f].append) for f, parts in nested]
+
+        length = 0
+        for row in rows:
+            try:
+                get = row.get
+            except AttributeError:
+                raise ValueError(f"第 {length + 1} 行不是对象，而是 {type(row).__name__}，无法按字段提取") from None
+            length += 1
+            for name, append in simple_buffers:
+                append(get(name))
+            for parts, append in nested_buffers:
+                value = row
+                for part in parts:
+                    value = value.get(part) if isinstance(value, dict) else None
+                append(value)
+
+        columns, backends = {}, {}
+        for name, values in buffers.items():
+            columns[name], backends[name] = cls._convert(values, backend)
+        return cls(columns, backend, length, backends)
+
+    @staticmethod
+    def _convert(values: List[Any], backend: str):
+        """返回 (列, 实际使用的后端)"""
+        if backend == "pyarrow":
+            import pyarrow as pa
+            return pa.array(values), backend
+        column = _to_array_column(values)
+        if backend == "numpy" and isinstance(column, array):
+            import numpy as np
+            return np.asarray(column), backend
+        return column, "array"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getitem__(self, name: str):
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise KeyError(f"未提取字段: {name}，已提取: {list(self._columns)}") from None
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._columns)
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        return {name: self.to_list(name) for name in self._columns}
+
+    def backend_of(self, name: str) -> str:
+        """该列实际使用的后端"""
+        self[name]  # 未提取的字段抛出 KeyError
+        return self._backends[name]
+
+    def to_list(self, name: str) -> List[Any]:
+        column = self[name]
+        backend = self._backends[name]
+        if backend in ("numpy", "pyarrow"):
+            return column.tolist() if backend == "numpy" else column.to_pylist()
+        return list(column)
+
+    def all(self, name: str, expected: Any = _MISSING, predicate: Optional[Callable[[Any], bool]] = None) -> bool:
+        """整列是否都等于 expected，或都满足 predicate"""
+        if (expected is _MISSING) == (predicate is None):
+            raise ValueError("expected 与 predicate 必须且只能指定一个")
+        column = self[name]
+        if predicate is not None:
+            return all(predicate(v) for v in self.to_list(name))
+        backend = self._backends[name]
+        if backend == "numpy":
+            return bool((column == expected).all())
+        if backend == "pyarrow":
+            return column.to_pylist().count(expected) == self._length
+        return column.count(expected) == self._length
+
+    def unique(self, name: str) -> bool:
+        """整列取值是否互不相同"""
+        column = self[name]
+        backend = self._backends[name]
+        if backend == "numpy":
+            import numpy as np
+            return len(np.unique(column)) == self._length
+        if backend == "pyarrow":
+            import pyarrow.compute as pc
+            return pc.count_distinct(column, mode="all").as_py() == self._length
+        try:
+            return len(set(column)) == self._length
+        except TypeError:
+            # dict / list 等不可哈希的值逐个比较
+            seen = []
+            for value in column:
+                if value in seen:
+                    return False
+                seen.append(value)
+            return True
+
+    def is_sorted(self, name: str, reverse: bool = False) -> bool:
+        """整列是否有序（默认升序）"""
+        column = self[name]
+        if self._backends[name] == "numpy":
+            import numpy as np
+            if self._length < 2:
+                return True
+            pairs = (column[:-1] >= column[1:]) if reverse else (column[:-1] <= column[1:])
+            return bool(np.all(pairs))
+        values = self.to_list(name)
+        # timsort 对已有序数据是线性的
+        return values == sorted(values, reverse=reverse)
+
+    def sum(self, name: str):
+        """整列求和"""
+        column = self[name]
+        backend = self._backends[name]
+        if backend == "numpy":
+            return column.sum().item()
+        if backend == "pyarrow":
+            import pyarrow.compute as pc
+            return pc.sum(column).as_py()
+        return sum(column)
+
+    def __repr__(self):
+        return f"Columns(fields={self.fields}, rows={self._length}, backend={self.backend!r})"
@@ -5,6 +5,7 @@ from datetime import datetime, date, time
 from decimal import Decimal
 from enum import Enum
 from uuid import UUID
+from array import array
 import keyword
 import sys
 
@@ -50,48 +51,70 @@ def _get_keyword_alias_fields(cls):
             field_aliases[attr.name] = attr.metadata['original_name']
     return field_aliases
 
-def _auto_configure_field_alias_renaming(cls):
-    """自动为使用字段别名的attrs类配置cattrs重命名规则（包括Python关键字和非法字符字段名）"""
+# 字段别名注册表：attrs类 -> {字段名: 原始名}，每个类只解析一次
+_FIELD_ALIAS_REGISTRY: Dict[type, Dict[str, str]] = {}
+
+
+def get_field_aliases(cls) -> Dict[str, str]:
+    """获取（并缓存）attrs类的字段别名映射"""
+    try:
+        return _FIELD_ALIAS_REGISTRY[cls]
+    except (KeyError, TypeError):
+        pass
     field_aliases = _get_keyword_alias_fields(cls)
-    
-    if not field_aliases:
-        return  # 没有字段别名，无需配置
-    
-    # 准备cattrs.override参数
-    overrides = {}
-    for field_name, alias in field_aliases.items():
-        overrides[field_name] = cattrs.override(rename=alias)
-    
-    # 配置unstructure（对象 -> 字典）
-    cattrs_converter.register_unstructure_hook(
-        cls,
-        cattrs.gen.make_dict_unstructure_fn(
-            cls,
-            cattrs_converter,
-            **overrides
-        )
+    try:
+        _FIELD_ALIAS_REGISTRY[cls] = field_aliases
+    except TypeError:
+        # 不可哈希的类型注解，不缓存
+        pass
+    return field_aliases
+
+
+def _has_field_aliases(cls) -> bool:
+    return has(cls) and bool(get_field_aliases(cls))
+
+
+def _make_alias_overrides(cls) -> Dict[str, Any]:
+    return {name: cattrs.override(rename=alias) for name, alias in get_field_aliases(cls).items()}
+
+
+def register_field_alias_hooks(converter: CattrsConverter):
+    """
+    为使用字段别名的attrs类注册cattrs钩子工厂（包括Python关键字和非法字符字段名）
+
+    cattrs 在第一次遇到某个类型时调用工厂生成钩子并缓存，嵌套字段类型在生成钩子时
+    递归解析，因此请求路径上不再需要逐元素检查类型。
+    """
+    converter.register_unstructure_hook_factory(
+        _has_field_aliases,
+        lambda cls: cattrs.gen.make_dict_unstructure_fn(cls, converter, **_make_alias_overrides(cls))
     )
-    
-    # 配置structure（字典 -> 对象）
-    cattrs_converter.register_structure_hook(
-        cls,
-        cattrs.gen.make_dict_structure_fn(
-            cls,
-            cattrs_converter,
-            **overrides
-        )
+    converter.register_structure_hook_factory(
+        _has_field_aliases,
+        lambda cls: cattrs.gen.make_dict_structure_fn(cls, converter, **_make_alias_overrides(cls))
     )
 
-def _ensure_field_alias_configured(cls):
-    """确保指定类型的字段别名重命名已配置（包括Python关键字和非法字符字段名）"""
-    if cls is None:
-        return
-    
-    # 如果是attrs类且还没有配置过重命名规则
-    if has(cls) and not hasattr(cls, '_aomaker_field_alias_configured'):
-        _auto_configure_field_alias_renaming(cls)
-        # 标记已配置，避免重复配置
-        cls._aomaker_field_alias_configured = True
+
+# ===== 紧凑数组字段（aomaker gen models 的 compact_arrays 选项）=====
+
+def int_array(value):
+    """List[int] 字段转换为 array('q')，超出 int64 范围或含非整数时保留原值"""
+    if value is None or isinstance(value, array):
+        return value
+    try:
+        return array("q", value)
+    except (OverflowError, TypeError):
+        return value
+
+
+def float_array(value):
+    """List[float] 字段转换为 array('d')，含非数值元素时保留原值"""
+    if value is None or isinstance(value, array):
+        return value
+    try:
+        return array("d", value)
+    except TypeError:
+        return value
 
 
 # ===== 结构化钩子（将原始数据转换为对象）=====
@@ -243,6 +266,7 @@ cattrs_converter.register_structure_hook(UUID, lambda value, _: UUID(value))
 cattrs_converter.register_structure_hook(Decimal, lambda value, _: Decimal(str(value)))
 cattrs_converter.register_structure_hook(Enum, lambda value, cls: cls(value))
 _register_union_structure_hooks()
+register_field_alias_hooks(cattrs_converter)
 # ===== 反结构化钩子（将对象转换为可序列化数据）=====
 
 # 注册反结构化钩子
@@ -299,22 +323,10 @@ class RequestConverter:
 
     def unstructure(self, data: Any) -> Any:
         """结构化数据 -> 原始数据"""
-        if data is not None:
-            _ensure_field_alias_configured(type(data))
-
-            if isinstance(data, (list, tuple, set)):
-                for item in data:
-                    if has(item):
-                        _ensure_field_alias_configured(type(item))
-            elif isinstance(data, dict):
-                for v in data.values():
-                    if has(v):
-                        _ensure_field_alias_configured(type(v))
         return self._converter.unstructure(data)
 
     def structure(self, data: Any, type_: Type[T]) -> Any:
         """原始数据 -> 结构化数据"""
-        _ensure_field_alias_configured(type_)
         return self._converter.structure(data, type_)
 
     def get_request_builder(self) -> RequestBuilder:
@@ -347,12 +359,7 @@ class RequestConverter:
     def prepare(self) -> PreparedRequest:
         params = self.prepare_params()
         request_body = self.prepare_request_body()
-        
-        if params is not None:
-            _ensure_field_alias_configured(type(params))
-        if request_body is not None:
-            _ensure_field_alias_configured(type(request_body))
-            
+
         request_data = {
             "method": self.endpoint_config.method.value,
             "url": self.prepare_url(),
@@ -0,0 +1,66 @@
+# --coding:utf-8--
+"""
+进程内 DNS 缓存
+
+urllib3 每次新建连接都会调用 getaddrinfo，多个 worker 同时建连时同一域名会被重复解析。
+DNSCache 按 (host, port) 缓存解析结果 ttl 秒，同一域名并发解析时只有一个线程真正发起查询。
+解析失败不缓存；ttl <= 0 时不缓存（默认），由连接预热配置中的 dns_ttl 开启。
+"""
+import socket
+import threading
+import time
+from typing import Dict, List, Tuple
+
+DNSKey = Tuple[str, int]
+
+
+def resolve(host: str, port: int) -> List[str]:
+    """解析域名，按 getaddrinfo 的顺序返回去重后的地址"""
+    addresses = []
+    for _, _, _, _, sockaddr in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses
+
+
+class DNSCache:
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._entries: Dict[DNSKey, Tuple[float, List[str]]] = {}
+        self._locks: Dict[DNSKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        if not self.enabled:
+            return resolve(host, port)
+        key = (host, port)
+        addresses = self._get(key)
+        if addresses is not None:
+            return addresses
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # 等锁期间其他线程可能已经解析完成
+            addresses = self._get(key)
+            if addresses is None:
+                addresses = resolve(host, port)
+                self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def _get(self, key: DNSKey):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._locks.clear()
+
+
+dns_cache = DNSCache()
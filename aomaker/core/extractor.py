@@ -0,0 +1,199 @@
+# --coding:utf-8--
+"""
+编译缓存的 jsonpath 提取
+
+表达式解析一次后按 LRU 缓存，之后的提取只做遍历：
+
+- 纯键名/下标路径（``$.data.items[0].id``）编译为直接取值，不产生中间列表；
+- 通配（``[*]`` / ``.*``）、切片（``[1:3]``）、递归下降（``..id``）由编译好的步骤逐层展开；
+- 过滤表达式（``[?(@.x > 1)]``）等其他写法交给 jsonpath 包处理。
+
+extract() 可直接作用于 CachedResponse / AoResponse，只使用缓存的 json()，不会触发响应模型结构化。
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, List, Optional
+
+from jsonpath import jsonpath
+
+from aomaker.exceptions import JsonPathExtractFailed
+
+EXPR_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+_TOKEN = re.compile(r"""
+    \.\.(?P<descent_name>[A-Za-z_][\w-]*|\*)?
+  | \.(?P<name>[A-Za-z_][\w-]*|\*)
+  | \[(?P<index>-?\d+)\]
+  | \[(?P<slice>-?\d*:-?\d*(?::-?\d*)?)\]
+  | \[(?P<wildcard>\*)\]
+  | \[(?P<quote>['"])(?P<quoted>.*?)(?P=quote)\]
+""", re.VERBOSE)
+
+Step = Callable[[List[Any]], List[Any]]
+
+
+def _key_step(key: str) -> Step:
+    return lambda nodes: [node[key] for node in nodes if isinstance(node, dict) and key in node]
+
+
+def _index_step(index: int) -> Step:
+    return lambda nodes: [node[index] for node in nodes
+                          if isinstance(node, list) and -len(node) <= index < len(node)]
+
+
+def _slice_step(spec: str) -> Step:
+    bounds = slice(*(int(part) if part else None for part in spec.split(":")))
+    return lambda nodes: [item for node in nodes if isinstance(node, list) for item in node[bounds]]
+
+
+def _wildcard(nodes: List[Any]) -> List[Any]:
+    result = []
+    for node in nodes:
+        if isinstance(node, dict):
+            result.extend(node.values())
+        elif isinstance(node, list):
+            result.extend(node)
+    return result
+
+
+def _descend(nodes: List[Any]) -> List[Any]:
+    """节点自身及其所有后代，先序"""
+    result = []
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        result.append(node)
+        if isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return result
+
+
+class CompiledPath:
+    """编译后的 jsonpath 表达式"""
+
+    __slots__ = ("expr", "simple", "_keys", "_steps")
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self._keys: Optional[List[Any]] = None
+        self._steps: Optional[List[Step]] = None
+        self.simple = False
+        self._compile()
+
+    def _compile(self):
+        body = self.expr[1:]
+        keys: List[Any] = []
+        steps: List[Step] = []
+        pos = 0
+        while pos < len(body):
+            match = _TOKEN.match(body, pos)
+            if match is None:
+                # 过滤、脚本、联合等写法交给 jsonpath
+                return
+            pos = match.end()
+            token = match.groupdict()
+            if match.group(0).startswith(".."):
+                keys = None
+                steps.append(_descend)
+                # "..name" 之后直接跟键名；"..[0]" 的下标由下一个 token 处理
+                token = {"name": token["descent_name"]}
+            name = token.get("name")
+            if name is None:
+                name = token.get("quoted")
+            if name == "*" or token.get("wildcard"):
+                keys = None
+                steps.append(_wildcard)
+            elif name is not None:
+                if keys is not None:
+                    keys.append(name)
+                steps.append(_key_step(name))
+            elif token.get("index") is not None:
+                index = int(token["index"])
+                if keys is not None:
+                    keys.append(index)
+                steps.append(_index_step(index))
+            elif token.get("slice") is not None:
+                keys = None
+                steps.append(_slice_step(token["slice"]))
+        self._steps = steps
+        if keys is not None:
+            self._keys = keys
+            self.simple = True
+
+    def find(self, data: Any) -> List[Any]:
+        """返回所有匹配值，未匹配时为空列表"""
+        if self._keys is not None:
+            return self._walk(data)
+        if self._steps is None:
+            return jsonpath(data, self.expr) or []
+        nodes = [data]
+        for step in self._steps:
+            nodes = step(nodes)
+            if not nodes:
+                break
+        return nodes
+
+    def _walk(self, data: Any) -> List[Any]:
+        current = data
+        for key in self._keys:
+            if isinstance(key, int):
+                if not isinstance(current, list) or not -len(current) <= key < len(current):
+                    return []
+            elif not isinstance(current, dict) or key not in current:
+                return []
+            current = current[key]
+        return [current]
+
+    def __repr__(self):
+        return f"CompiledPath({self.expr!r}, simple={self.simple})"
+
+
+@lru_cache(maxsize=EXPR_CACHE_SIZE)
+def compile_jsonpath(expr: str) -> CompiledPath:
+    """编译表达式并缓存；省略 $ 时视为从根开始，如 'data.items[0]'"""
+    expr = expr.strip()
+    if not expr.startswith("$"):
+        expr = "$" + expr if expr.startswith("[") else "$." + expr
+    return CompiledPath(expr)
+
+
+def _json_of(source: Any) -> Any:
+    cached_response = getattr(source, "cached_response", None)
+    if cached_response is not None:
+        source = cached_response
+    if isinstance(source, (str, bytes)):
+        return json.loads(source)
+    if isinstance(source, (dict, list)):
+        return source
+    return source.json()
+
+
+def extract(source: Any, expr: str) -> List[Any]:
+    """
+    按 jsonpath 表达式提取所有匹配值
+
+    Args:
+        source: dict/list、JSON 字符串，或 CachedResponse / AoResponse / requests.Response
+        expr: jsonpath 表达式，如 "$.data[*].id"
+
+    Returns:
+        匹配值列表，未匹配时为空列表
+    """
+    return compile_jsonpath(expr).find(_json_of(source))
+
+
+def extract_one(source: Any, expr: str, index: int = 0, default: Any = _MISSING) -> Any:
+    """提取第 index 个匹配值；未匹配且没有 default 时抛出 JsonPathExtractFailed"""
+    data = _json_of(source)
+    values = compile_jsonpath(expr).find(data)
+    try:
+        return values[index]
+    except IndexError:
+        if default is not _MISSING:
+            return default
+        raise JsonPathExtractFailed(data, expr) from None
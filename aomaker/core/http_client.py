@@ -1,6 +1,6 @@
 # --coding:utf-8--
 from functools import partial
-from typing import List, Any, Type
+from typing import Any, Callable, Dict, List, Optional, Type
 from contextlib import contextmanager
 from copy import deepcopy
 
@@ -8,7 +8,10 @@ import requests
 
 from aomaker.storage import cache
 
-from .middlewares.registry import MiddlewareCallable, RequestType, ResponseType, registry, init_middlewares
+from .multipart import MultipartEncoder
+from .timing import RequestTiming, mount_timing_adapter
+from .middlewares.registry import (MiddlewareCallable, RequestType, ResponseType, ChainKey, chain_key, registry,
+                                  init_middlewares)
 
 
 class CachedResponse:
@@ -24,14 +27,21 @@ class CachedResponse:
             self._cached_json = self.raw_response.json(**kwargs)
         return self._cached_json  
 
+    @property
+    def timing(self) -> Optional[RequestTiming]:
+        """DNS/建连/TLS/首字节/下载的分阶段耗时，未经 TimingAdapter 发送的响应返回 None"""
+        timing = getattr(self.raw_response, "timing", None)
+        return timing if isinstance(timing, RequestTiming) else None
+
 
 class HTTPClient:
     def __init__(self, middlewares: List[MiddlewareCallable] = None):
-        self.session = requests.Session()
+        self.session = mount_timing_adapter(requests.Session())
         init_middlewares()
-        self.middlewares = registry.active_middlewares
-        if middlewares:
-            self.middlewares.extend(middlewares)
+        # 客户端额外指定的中间件，对所有请求生效，排在注册表中间件之后
+        self.middlewares = list(middlewares or [])
+        self._handlers: Dict[ChainKey, Callable[[RequestType], ResponseType]] = {}
+        self._handlers_version = registry.version
 
     def send_request(self, request: RequestType, override_headers: bool = False, **kwargs) -> ResponseType:
         if override_headers:
@@ -40,17 +50,40 @@ class HTTPClient:
             final_headers = {**self.session.headers, **request.get("headers", {})}
 
         merged_request = {**request, **kwargs, "headers": final_headers}
-
-        def send(req: RequestType) -> ResponseType:
-            req.pop("_api_meta")
+        handler = self._get_handler(merged_request.get("_api_meta"))
+        return handler(merged_request)
+
+    def _get_handler(self, api_meta: Optional[Dict[str, Any]]) -> Callable[[RequestType], ResponseType]:
+        """按接口类缓存组装好的中间件调用链，注册表变化后重新组装"""
+        if self._handlers_version != registry.version:
+            self._handlers = {}
+            self._handlers_version = registry.version
+        key = chain_key(api_meta)
+        handler = self._handlers.get(key)
+        if handler is None:
+            handler = self._send
+            for middleware in reversed(registry.get_chain(api_meta) + self.middlewares):
+                handler = partial(middleware, call_next=handler)
+            self._handlers[key] = handler
+        return handler
+
+    def _send(self, req: RequestType) -> ResponseType:
+        req.pop("_api_meta", None)
+        upload_progress = req.pop("upload_progress", None)
+        if not req.get("files"):
+            req.pop("files", None)
+            return CachedResponse(self.session.request(**req))
+
+        # 文件上传使用流式 multipart 编码，避免 requests 把整个请求体拼接在内存中
+        encoder = MultipartEncoder(req.pop("files"), req.pop("data", None), progress=upload_progress)
+        headers = {k: v for k, v in (req.get("headers") or {}).items() if k.lower() != "content-type"}
+        req["headers"] = {**headers, "Content-Type": encoder.content_type}
+        req["data"] = encoder
+        try:
             raw_response = self.session.request(**req)
-            return CachedResponse(raw_response)
-
-        call_next = send
-        for middleware in reversed(self.middlewares):
-            call_next = partial(middleware, call_next=call_next)
-
-        return call_next(merged_request)
+        finally:
+            encoder.close()
+        return CachedResponse(raw_response)
 
     @contextmanager
     def headers_override_scope(self, headers: dict):
@@ -0,0 +1,236 @@
+# --coding:utf-8--
+"""
+增量式 JSON 数组解析
+
+按路径（如 ``data.items[*]``）定位响应中的数组，边接收数据块边逐个产出数组元素，
+内存占用只与单个元素的大小相关，而不是整个响应体。
+解析器本身是 push 模式（feed/close），同步与异步传输层都可以驱动它。
+"""
+import codecs
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Union
+
+_NEED_MORE = object()
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SCALAR_END = re.compile(r"[,\]}\s]")
+
+Chunk = Union[bytes, str]
+
+
+def parse_stream_path(path: str) -> List[str]:
+    """
+    解析流式路径表达式，返回需要逐层进入的对象键
+
+    Examples:
+        "[*]"            -> []
+        "$.data[*]"      -> ["data"]
+        "data.items[*]"  -> ["data", "items"]
+    """
+    expr = path.strip()
+    if expr.startswith("$"):
+        expr = expr[1:].lstrip(".")
+    if not expr.endswith("[*]"):
+        raise ValueError(f"流式解析路径必须以 [*] 结尾: {path}")
+    expr = expr[:-3].rstrip(".")
+    if not expr:
+        return []
+    keys = expr.split(".")
+    for key in keys:
+        if not key or "[" in key or "]" in key:
+            raise ValueError(f"不支持的流式解析路径: {path}")
+    return keys
+
+
+class JSONArrayStreamParser:
+    """
+    push 模式的 JSON 数组增量解析器
+
+    Usage:
+        parser = JSONArrayStreamParser("data.items[*]")
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                ...
+        for item in parser.close():
+            ...
+    """
+
+    def __init__(self, path: str = "[*]", encoding: str = "utf-8"):
+        self.path = path
+        self._keys = parse_stream_path(path)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.done = False
+        self._steps = self._parse()
+
+    def feed(self, data: Chunk) -> List[Any]:
+        """喂入一个数据块，返回本次能够完整解析出的数组元素"""
+        if isinstance(data, (bytes, bytearray)):
+            data = self._decoder.decode(data)
+        if data and not self.done:
+            self._buf += data
+        return self._drain()
+
+    def close(self) -> List[Any]:
+        """标记数据结束，返回剩余元素；数据不完整时抛出 ValueError"""
+        tail = self._decoder.decode(b"", final=True)
+        if tail and not self.done:
+            self._buf += tail
+        self._eof = True
+        return self._drain()
+
+    def _drain(self) -> List[Any]:
+        items = []
+        if self.done:
+            return items
+        for step in self._steps:
+            if step is _NEED_MORE:
+                return items
+            items.append(step)
+        self.done = True
+        self._buf = ""
+        self._pos = 0
+        return items
+
+    def _parse(self):
+        for key in self._keys:
+            yield from self._consume("{")
+            while True:
+                char = yield from self._peek()
+                if char == "}":
+                    raise ValueError(f"响应中不存在路径: {self.path}")
+                name = json.loads((yield from self._scan_value(keep=True)))
+                yield from self._consume(":")
+                if name == key:
+                    break
+                yield from self._scan_value(keep=False)
+                char = yield from self._peek()
+                if char == ",":
+                    self._pos += 1
+                elif char != "}":
+                    raise ValueError(f"JSON 格式错误，位置 {self._pos} 处期望 ',' 或 '}}'，实际为 {char!r}")
+
+        yield from self._consume("[")
+        char = yield from self._peek()
+        if char == "]":
+            return
+        while True:
+            text = yield from self._scan_value(keep=True)
+            yield json.loads(text)
+            char = yield from self._peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON 格式错误，数组元素之间期望 ','，实际为 {char!r}")
+
+    def _peek(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if self._eof:
+                raise ValueError("JSON 数据不完整，流已提前结束")
+            # 等待更多数据前丢弃已消费的部分，每次 feed 至多截断一次缓冲区
+            self._buf = ""
+            self._pos = 0
+            yield _NEED_MORE
+
+    def _consume(self, expected: str):
+        char = yield from self._peek()
+        if char != expected:
+            raise ValueError(f"JSON 格式错误，期望 {expected!r}，实际为 {char!r}（路径: {self.path}）")
+        self._pos += 1
+
+    def _scan_value(self, keep: bool):
+        """扫描一个完整的 JSON 值；keep=True 时返回其文本，否则边扫描边丢弃"""
+        first = yield from self._peek()
+        start = self._pos
+
+        if first not in '{["':
+            while True:
+                match = _SCALAR_END.search(self._buf, start)
+                if match:
+                    end = match.start()
+                    break
+                if self._eof:
+                    end = len(self._buf)
+                    break
+                self._buf = self._buf[start:]
+                self._pos = start = 0
+                yield _NEED_MORE
+            self._pos = end
+            return self._buf[start:end] if keep else None
+
+        depth = 0
+        in_string = False
+        index = start
+        while True:
+            buf = self._buf
+            size = len(buf)
+            while index < size:
+                if in_string:
+                    index = _STRING_BODY.match(buf, index).end()
+                    if index < size and buf[index] == '"':
+                        in_string = False
+                        index += 1
+                        if depth == 0:
+                            break
+                    else:
+                        # 字符串未结束（或停在不完整的转义符上），等待更多数据
+                        break
+                else:
+                    match = _STRUCTURAL.search(buf, index)
+                    if match is None:
+                        index = size
+                        break
+                    char = match.group()
+                    index = match.end()
+                    if char == '"':
+                        in_string = True
+                    elif char in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            break
+
+            if depth == 0 and not in_string and index > start:
+                self._pos = index
+                return buf[start:index] if keep else None
+            if self._eof:
+                raise ValueError("JSON 数据不完整，流已提前结束")
+            # keep=True 时保留当前值已扫描的文本，否则连同已扫描部分一起丢弃
+            drop = start if keep else index
+            self._buf = buf[drop:]
+            self._pos = start = 0
+            index -= drop
+            yield _NEED_MORE
+
+
+def iter_json_items(chunks: Iterable[Chunk], path: str = "[*]", encoding: str = "utf-8") -> Iterator[Any]:
+    """从同步数据块迭代器中逐个产出 path 指向数组的元素"""
+    parser = JSONArrayStreamParser(path, encoding=encoding)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.close()
+
+
+async def aiter_json_items(chunks: AsyncIterable[Chunk], path: str = "[*]",
+                           encoding: str = "utf-8") -> AsyncIterator[Any]:
+    """从异步数据块迭代器中逐个产出 path 指向数组的元素"""
+    parser = JSONArrayStreamParser(path, encoding=encoding)
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            return
+    for item in parser.close():
+        yield item
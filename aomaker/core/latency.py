@@ -0,0 +1,110 @@
+# --coding:utf-8--
+"""
+延迟直方图
+
+对数分桶：第 i 个桶覆盖 (gamma^(i-1), gamma^i]，任一分位数的相对误差不超过 precision。
+内存只与桶数（即延迟的数量级跨度）有关，与样本数无关，可以流式累加、跨进程合并和持久化。
+"""
+import math
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_PRECISION = 0.01
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+# 小于该值（毫秒）的样本统一落在最低的桶里
+_MIN_VALUE = 1e-3
+
+
+class LatencyHistogram:
+    """
+    Usage:
+        hist = LatencyHistogram()
+        for ms in latencies:
+            hist.add(ms)
+        hist.quantile(0.99)
+    """
+
+    def __init__(self, precision: float = DEFAULT_PRECISION):
+        if not 0 < precision < 1:
+            raise ValueError(f"precision 必须在 (0, 1) 之间: {precision}")
+        self.precision = precision
+        self._gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float, count: int = 1):
+        index = math.ceil(math.log(max(value, _MIN_VALUE)) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """返回分位数 q（0~1）的估计值，没有样本时返回 None"""
+        if not 0 <= q <= 1:
+            raise ValueError(f"分位数必须在 [0, 1] 之间: {q}")
+        if not self.count:
+            return None
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float] = DEFAULT_QUANTILES) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        if other.precision != self.precision:
+            raise ValueError("精度不同的直方图无法合并")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "precision": self.precision,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        hist = cls(precision=data.get("precision", DEFAULT_PRECISION))
+        hist.buckets = {int(index): count for index, count in data.get("buckets", {}).items()}
+        hist.count = data.get("count", 0)
+        hist.total = data.get("total", 0.0)
+        hist.min = data["min"] if data.get("min") is not None else math.inf
+        hist.max = data.get("max", 0.0)
+        return hist
+
+    def __repr__(self):
+        return f"LatencyHistogram(count={self.count}, p50={self.quantile(0.5)}, p99={self.quantile(0.99)})"
@@ -0,0 +1,410 @@
+# --coding:utf-8--
+"""
+HTTP 响应缓存中间件
+
+只缓存幂等的 GET 请求，且需要接口显式开启（@router.get(path, cache=True / cache=秒数)），
+或在 middlewares.yaml 中设置 cache_all_get: true。
+
+遵循响应的 Cache-Control（no-store / no-cache / max-age）、Expires 和 Vary：
+    - 新鲜的缓存直接返回，不发请求
+    - 过期但带 ETag / Last-Modified 的缓存，以 If-None-Match / If-Modified-Since 重新验证，
+      服务端返回 304 时沿用缓存内容
+内存层为按条数和字节数限制的 LRU，可选磁盘层（disk_dir）在多次运行之间复用，靠验证器保证数据新鲜。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, fields
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from aomaker.log import logger
+from aomaker.core.http_client import CachedResponse
+from .registry import RequestType, CallNext, ResponseType, middleware, registry
+
+MIDDLEWARE_NAME = "cache_middleware"
+CACHEABLE_STATUS = (200, 203)
+# 标识调用方身份的请求头，参与缓存 key 的计算，避免不同账号/会话共用缓存
+DEFAULT_KEY_HEADERS = ("Authorization", "Cookie")
+
+
+@dataclass(frozen=True)
+class CacheOptions:
+    """
+    缓存中间件配置，在 middlewares.yaml 中设置：
+
+    cache_middleware:
+      options:
+        max_entries: 1024          # 内存中最多缓存的响应条数
+        max_bytes: 67108864        # 内存中缓存的响应体总字节数上限
+        disk_dir: .cache/http      # 磁盘缓存目录，不设置则只使用内存
+        default_ttl: 0             # 响应没有 Cache-Control/Expires 时的新鲜期（秒）
+        cache_all_get: false       # 对所有 GET 请求启用缓存，而不只是 router 上开启了 cache 的接口
+        key_headers: [Authorization, Cookie, X-Tenant-Id]  # 按这些请求头的取值隔离缓存
+    """
+    max_entries: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    disk_dir: Optional[str] = None
+    default_ttl: float = 0
+    cache_all_get: bool = False
+    key_headers: Tuple[str, ...] = DEFAULT_KEY_HEADERS
+
+    def __post_init__(self):
+        object.__setattr__(self, "key_headers", tuple(self.key_headers or ()))
+        if self.max_entries < 1:
+            raise ValueError(f"max_entries 必须大于等于 1: {self.max_entries}")
+        if self.max_bytes < 0:
+            raise ValueError(f"max_bytes 不能为负数: {self.max_bytes}")
+        if self.default_ttl < 0:
+            raise ValueError(f"default_ttl 不能为负数: {self.default_ttl}")
+
+    @classmethod
+    def from_dict(cls, options: Dict[str, Any]) -> "CacheOptions":
+        known = {f.name for f in fields(cls)}
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"缓存中间件不支持的配置项: {sorted(unknown)}，可选: {sorted(known)}")
+        return cls(**options)
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': None}"""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers, default_ttl: float, now: float) -> Optional[float]:
+    """响应可以直接复用的秒数；返回 None 表示不可缓存"""
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    if directives.get("max-age") is not None:
+        try:
+            max_age = int(directives["max-age"])
+        except ValueError:
+            return 0
+        try:
+            age = int(headers.get("Age") or 0)
+        except ValueError:
+            age = 0
+        return max(max_age - age, 0)
+    expires = headers.get("Expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        if expires_at is None:
+            return 0
+        date = _http_date(headers.get("Date")) or now
+        return max(expires_at - date, 0)
+    return default_ttl
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    encoding: Optional[str]
+    reason: Optional[str]
+    stored_at: float
+    ttl: float
+    vary: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return CaseInsensitiveDict(self.headers).get("ETag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return CaseInsensitiveDict(self.headers).get("Last-Modified")
+
+    def is_fresh(self, now: float) -> bool:
+        return now - self.stored_at < self.ttl
+
+    def matches_vary(self, request_headers: CaseInsensitiveDict) -> bool:
+        return all(request_headers.get(name) == value for name, value in self.vary.items())
+
+    def to_response(self) -> CachedResponse:
+        raw = requests.Response()
+        raw.status_code = self.status_code
+        raw.headers = CaseInsensitiveDict(self.headers)
+        raw._content = self.content
+        raw.encoding = self.encoding
+        raw.reason = self.reason
+        raw.url = self.url
+        raw.from_cache = True
+        return CachedResponse(raw)
+
+    def to_meta(self) -> Dict[str, Any]:
+        meta = asdict(self)
+        meta.pop("content")
+        return meta
+
+
+class ResponseCache:
+    """内存 LRU（条数 + 字节数上限）+ 可选磁盘层，线程安全"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._load_from_disk(key)
+        if entry is not None:
+            self._put_memory(key, entry)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        self._put_memory(key, entry)
+        self._save_to_disk(key, entry)
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+        if self.disk_dir:
+            for path in self._disk_paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.revalidated = 0
+
+    def count(self, counter: str):
+        """hits / misses / revalidated 计数加一，多线程并发时不丢失"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _put_memory(self, key: str, entry: CacheEntry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def _disk_paths(self, key: str) -> Tuple[str, str]:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.disk_dir, digest)
+        return f"{base}.json", f"{base}.body"
+
+    def _load_from_disk(self, key: str) -> Optional[CacheEntry]:
+        if not self.disk_dir:
+            return None
+        meta_path, body_path = self._disk_paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.pop("key", None) != key:
+            return None
+        try:
+            return CacheEntry(content=content, **meta)
+        except TypeError:
+            return None
+
+    def _save_to_disk(self, key: str, entry: CacheEntry):
+        if not self.disk_dir:
+            return
+        meta_path, body_path = self._disk_paths(key)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # 先写响应体再写元数据，读到元数据时响应体一定是完整的
+            _atomic_write(body_path, entry.content)
+            _atomic_write(meta_path, json.dumps({"key": key, **entry.to_meta()}, ensure_ascii=False).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"HTTP缓存写入磁盘失败: {str(e)}")
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+response_cache = ResponseCache()
+_UNRESOLVED = object()
+_resolved: Dict[str, Any] = {"source": _UNRESOLVED, "options": CacheOptions()}
+
+
+def validate_cache_options(options: Dict[str, Any]) -> CacheOptions:
+    """加载 middlewares.yaml 时校验缓存中间件配置"""
+    return CacheOptions.from_dict(options)
+
+
+def get_cache_options() -> CacheOptions:
+    """读取当前生效的缓存配置，配置变化时同步调整 response_cache 的容量"""
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    source = config.options if config is not None else None
+    if source is not _resolved["source"]:
+        options = CacheOptions.from_dict(source or {})
+        response_cache.max_entries = options.max_entries
+        response_cache.max_bytes = options.max_bytes
+        response_cache.disk_dir = options.disk_dir
+        _resolved["options"] = options
+        _resolved["source"] = source
+    return _resolved["options"]
+
+
+def cache_key(request: RequestType, key_headers: Sequence[str] = DEFAULT_KEY_HEADERS) -> str:
+    """GET + URL + 排序后的查询参数；带 key_headers 中的请求头（凭证、Cookie 等）时按其取值隔离"""
+    params = request.get("params") or {}
+    items = sorted(params.items()) if isinstance(params, dict) else sorted(params)
+    key = f"GET {request.get('url')}?{urlencode(items, doseq=True)}"
+    headers = CaseInsensitiveDict(request.get("headers") or {})
+    identity = [f"{name.lower()}={headers[name]}" for name in key_headers if headers.get(name)]
+    if identity:
+        digest = hashlib.sha1("\n".join(identity).encode("utf-8")).hexdigest()
+        key += f"#{digest[:16]}"
+    return key
+
+
+def _endpoint_ttl(endpoint_cache: Any, options: CacheOptions) -> Optional[float]:
+    """router 上 cache=True 使用 default_ttl，cache=秒数 使用该值；未开启返回 None"""
+    if endpoint_cache is True:
+        return options.default_ttl
+    if endpoint_cache and isinstance(endpoint_cache, (int, float)):
+        return float(endpoint_cache)
+    return options.default_ttl if options.cache_all_get else None
+
+
+def _build_entry(request: RequestType, response: ResponseType, request_headers: CaseInsensitiveDict,
+                 default_ttl: float, now: float) -> Optional[CacheEntry]:
+    headers = response.headers
+    ttl = freshness_lifetime(headers, default_ttl, now)
+    if ttl is None:
+        return None
+    vary_header = headers.get("Vary") or ""
+    vary_names = [name.strip() for name in vary_header.split(",") if name.strip()]
+    if "*" in vary_names:
+        return None
+    entry = CacheEntry(
+        url=getattr(response, "url", None) or request.get("url"),
+        status_code=response.status_code,
+        headers=dict(headers),
+        content=response.content or b"",
+        encoding=getattr(response, "encoding", None),
+        reason=getattr(response, "reason", None),
+        stored_at=now,
+        ttl=ttl,
+        vary={name: request_headers.get(name) for name in vary_names},
+    )
+    # 既不新鲜也无法重新验证的响应缓存了也用不上
+    if ttl <= 0 and not (entry.etag or entry.last_modified):
+        return None
+    return entry
+
+
+def _refresh_entry(entry: CacheEntry, not_modified: ResponseType, default_ttl: float, now: float) -> CacheEntry:
+    """304 响应：用新的头部更新缓存条目的新鲜期"""
+    headers = CaseInsensitiveDict(entry.headers)
+    for name, value in not_modified.headers.items():
+        if name.lower() not in ("content-length", "content-encoding", "transfer-encoding"):
+            headers[name] = value
+    ttl = freshness_lifetime(headers, default_ttl, now)
+    return CacheEntry(url=entry.url, status_code=entry.status_code, headers=dict(headers), content=entry.content,
+                      encoding=entry.encoding, reason=entry.reason, stored_at=now, ttl=ttl or 0, vary=entry.vary)
+
+
+@middleware(name=MIDDLEWARE_NAME, priority=500, options_validator=validate_cache_options)
+def cache_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
+    """GET 响应缓存：新鲜则直接返回，过期则带验证器重新请求，304 时复用缓存"""
+    if str(request.get("method", "")).upper() != "GET" or request.get("stream"):
+        return call_next(request)
+    options = get_cache_options()
+    default_ttl = _endpoint_ttl((request.get("_api_meta") or {}).get("cache"), options)
+    if default_ttl is None:
+        return call_next(request)
+
+    request_headers = CaseInsensitiveDict(request.get("headers") or {})
+    request_directives = parse_cache_control(request_headers.get("Cache-Control"))
+    if "no-store" in request_directives:
+        return call_next(request)
+
+    key = cache_key(request, options.key_headers)
+    now = time.time()
+    entry = response_cache.get(key)
+    if entry is not None and not entry.matches_vary(request_headers):
+        entry = None
+    if entry is not None and entry.is_fresh(now) and "no-cache" not in request_directives:
+        response_cache.count("hits")
+        return entry.to_response()
+    response_cache.count("misses")
+
+    if entry is not None and (entry.etag or entry.last_modified):
+        conditional = dict(request.get("headers") or {})
+        if entry.etag:
+            conditional["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            conditional["If-Modified-Since"] = entry.last_modified
+        request = {**request, "headers": conditional}
+
+    response = call_next(request)
+    now = time.time()
+    if entry is not None and response.status_code == 304:
+        entry = _refresh_entry(entry, response, default_ttl, now)
+        response_cache.set(key, entry)
+        response_cache.count("revalidated")
+        return entry.to_response()
+
+    if response.status_code in CACHEABLE_STATUS:
+        new_entry = _build_entry(request, response, request_headers, default_ttl, now)
+        if new_entry is not None:
+            response_cache.set(key, new_entry)
+        elif entry is not None:
+            response_cache.delete(key)
+    return response
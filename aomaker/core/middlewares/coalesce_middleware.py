@@ -0,0 +1,104 @@
+# --coding:utf-8--
+"""
+相同请求合并中间件
+
+多个线程同时发出完全相同的 GET 请求（方法、URL、查询参数、请求头都一致）时，
+只有第一个线程真正发送，其余线程等待并共享它的结果；异常同样传递给所有等待者。
+接口通过 @router.get(path, coalesce=True) 开启，或在 middlewares.yaml 中设置 coalesce_all_get: true。
+"""
+import hashlib
+import json
+import threading
+from typing import Dict, Optional
+
+from .registry import RequestType, CallNext, ResponseType, middleware, registry
+
+MIDDLEWARE_NAME = "coalesce_middleware"
+COALESCE_METHODS = ("GET", "HEAD")
+
+
+class _InFlight:
+    __slots__ = ("event", "response", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response: Optional[ResponseType] = None
+        self.error: Optional[BaseException] = None
+
+
+class RequestCoalescer:
+    """按请求指纹合并同时进行的请求"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self.coalesced = 0
+
+    def execute(self, key: str, request: RequestType, call_next: CallNext) -> ResponseType:
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _InFlight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.response)
+
+        try:
+            call.response = call_next(request)
+            return call.response
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # 先移除再唤醒，之后到达的请求会重新发送，而不是拿到已经结束的结果
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.event.set()
+
+
+def _share(response: ResponseType) -> ResponseType:
+    """等待者共享同一个底层响应，但各自包一层 CachedResponse，json() 的解析结果互不影响"""
+    raw_response = getattr(response, "raw_response", None)
+    if raw_response is None:
+        return response
+    return type(response)(raw_response)
+
+
+def request_fingerprint(request: RequestType) -> str:
+    """方法 + URL + 排序后的查询参数和请求头"""
+    params = request.get("params") or {}
+    headers = request.get("headers") or {}
+    material = {
+        "method": str(request.get("method", "")).upper(),
+        "url": request.get("url"),
+        "params": sorted(params.items()) if isinstance(params, dict) else sorted(params),
+        "headers": sorted((str(k).lower(), str(v)) for k, v in headers.items()),
+    }
+    encoded = json.dumps(material, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def _enabled_for(request: RequestType) -> bool:
+    endpoint_coalesce = (request.get("_api_meta") or {}).get("coalesce")
+    if endpoint_coalesce:
+        return True
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    return bool(config is not None and config.options.get("coalesce_all_get", False))
+
+
+coalescer = RequestCoalescer()
+
+
+@middleware(name=MIDDLEWARE_NAME, priority=400)
+def coalesce_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
+    """合并同时进行的相同 GET 请求"""
+    if (str(request.get("method", "")).upper() not in COALESCE_METHODS or request.get("stream")
+            or not _enabled_for(request)):
+        return call_next(request)
+    return coalescer.execute(request_fingerprint(request), request, call_next)
@@ -0,0 +1,183 @@
+# --coding:utf-8--
+"""
+请求体压缩中间件
+
+接口通过 @router.post(path, compress=True)（使用配置的默认算法）或 compress="br" 开启请求体压缩，
+也可以在 middlewares.yaml 中设置 compress_all: true 对所有带请求体的接口生效。
+json/data 请求体序列化后超过 min_size 才压缩，压缩后以 Content-Encoding 标明算法；
+multipart 上传、文件对象等流式请求体不压缩。
+
+响应方向：requests 的默认会话头已带有当前环境能解码的 Accept-Encoding（gzip/deflate，装了 brotli、zstandard 时
+还包括 br、zstd）；请求头被整体覆盖（override_headers / headers_override_scope）时可开启 accept_encoding 自动补上。
+响应由 urllib3 边读边解压，流式响应（stream=True）同样按块解压，不会先缓存压缩数据。
+"""
+import gzip
+import importlib
+import json
+import zlib
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Optional
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .registry import RequestType, CallNext, ResponseType, middleware, registry
+
+MIDDLEWARE_NAME = "compression_middleware"
+
+
+def _import_optional(name: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+# 可选的压缩库在导入时解析一次，压缩请求时不再重复导入
+_brotli = _import_optional("brotli") or _import_optional("brotlicffi")
+_zstandard = _import_optional("zstandard")
+
+
+def _brotli_compress(body: bytes, level: Optional[int]) -> bytes:
+    return _brotli.compress(body) if level is None else _brotli.compress(body, quality=level)
+
+
+def _zstd_compress(body: bytes, level: Optional[int]) -> bytes:
+    return _zstandard.ZstdCompressor(level=3 if level is None else level).compress(body)
+
+
+CODECS: Dict[str, Callable[[bytes, Optional[int]], bytes]] = {
+    "gzip": lambda body, level: gzip.compress(body, 6 if level is None else level),
+    "deflate": lambda body, level: zlib.compress(body, -1 if level is None else level),
+    "br": _brotli_compress,
+    "zstd": _zstd_compress,
+}
+# 当前环境可用的压缩算法
+AVAILABLE_CODECS = tuple(name for name, module in (("gzip", gzip), ("deflate", zlib), ("br", _brotli),
+                                                   ("zstd", _zstandard)) if module is not None)
+_REQUIRED_PACKAGES = {"br": "brotli", "zstd": "zstandard"}
+
+
+def codec_available(encoding: str) -> bool:
+    return encoding in AVAILABLE_CODECS
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding not in AVAILABLE_CODECS:
+        raise ValueError(f"不支持的压缩算法: {encoding}，当前可用: {list(AVAILABLE_CODECS)}")
+    return CODECS[encoding](body, level)
+
+
+@dataclass(frozen=True)
+class CompressionOptions:
+    """
+    压缩中间件配置，在 middlewares.yaml 中设置：
+
+    compression_middleware:
+      options:
+        encoding: gzip          # 默认压缩算法：gzip / deflate / br / zstd
+        level: null             # 压缩级别，不设置使用各算法的默认值
+        min_size: 1024          # 请求体小于该字节数时不压缩
+        compress_all: false     # 对所有带请求体的接口压缩，而不只是 router 上开启了 compress 的接口
+        accept_encoding: false  # 请求缺少 Accept-Encoding 时自动补上
+    """
+    encoding: str = "gzip"
+    level: Optional[int] = None
+    min_size: int = 1024
+    compress_all: bool = False
+    accept_encoding: bool = False
+
+    def __post_init__(self):
+        if self.encoding not in CODECS:
+            raise ValueError(f"不支持的压缩算法: {self.encoding}，可选: {sorted(CODECS)}")
+        if self.encoding not in AVAILABLE_CODECS:
+            raise ValueError(f"压缩算法 {self.encoding} 需要安装 {_REQUIRED_PACKAGES[self.encoding]}，"
+                             f"当前可用: {list(AVAILABLE_CODECS)}")
+        if self.min_size < 0:
+            raise ValueError(f"min_size 不能为负数: {self.min_size}")
+
+    @classmethod
+    def from_dict(cls, options: Dict[str, Any]) -> "CompressionOptions":
+        known = {f.name for f in fields(cls)}
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"压缩中间件不支持的配置项: {sorted(unknown)}，可选: {sorted(known)}")
+        return cls(**options)
+
+
+_UNRESOLVED = object()
+_resolved: Dict[str, Any] = {"source": _UNRESOLVED, "options": CompressionOptions()}
+
+
+def validate_compression_options(options: Dict[str, Any]) -> CompressionOptions:
+    """加载 middlewares.yaml 时校验压缩中间件配置"""
+    return CompressionOptions.from_dict(options)
+
+
+def get_compression_options() -> CompressionOptions:
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    source = config.options if config is not None else None
+    if source is not _resolved["source"]:
+        _resolved["options"] = CompressionOptions.from_dict(source or {})
+        _resolved["source"] = source
+    return _resolved["options"]
+
+
+def _encoding_for(request: RequestType, options: CompressionOptions) -> Optional[str]:
+    endpoint_compress = (request.get("_api_meta") or {}).get("compress")
+    if isinstance(endpoint_compress, str):
+        return endpoint_compress
+    if endpoint_compress or (endpoint_compress is None and options.compress_all):
+        return options.encoding
+    return None
+
+
+def _serialize_body(request: RequestType) -> Optional[bytes]:
+    """把 json/data 请求体序列化为 bytes；表单字典、文件和流式请求体返回 None"""
+    if request.get("files"):
+        return None
+    if request.get("json") is not None:
+        # 与 requests 的 json 序列化保持一致
+        return json.dumps(request["json"], allow_nan=False).encode("utf-8")
+    data = request.get("data")
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    return None
+
+
+def _header_names(headers: Dict[str, Any]) -> set:
+    return {str(name).lower() for name in headers}
+
+
+@middleware(name=MIDDLEWARE_NAME, priority=350, options_validator=validate_compression_options)
+def compression_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
+    """压缩请求体，协商 Accept-Encoding"""
+    options = get_compression_options()
+    encoding = _encoding_for(request, options)
+    if encoding is None and not options.accept_encoding:
+        return call_next(request)
+
+    headers = dict(request.get("headers") or {})
+    names = _header_names(headers)
+    changed = False
+
+    if options.accept_encoding and "accept-encoding" not in names:
+        headers["Accept-Encoding"] = ACCEPT_ENCODING
+        changed = True
+
+    body = None
+    if encoding is not None and "content-encoding" not in names:
+        body = _serialize_body(request)
+    if body is not None and len(body) >= options.min_size:
+        had_json = request.get("json") is not None
+        request = {key: value for key, value in request.items() if key != "json"}
+        request["data"] = compress(body, encoding, options.level)
+        headers["Content-Encoding"] = encoding
+        if had_json and "content-type" not in names:
+            headers["Content-Type"] = "application/json"
+        changed = True
+
+    if changed:
+        request = {**request, "headers": headers}
+    return call_next(request)
@@ -0,0 +1,218 @@
+# --coding:utf-8--
+"""
+接口延迟直方图中间件
+
+每个线程在自己的直方图上累加（热路径上没有跨线程竞争），按 (接口类, 状态码) 分桶。
+定期（由后台写入线程执行，不占用请求线程）以及测试结束时把各线程的增量合并后写入 aomaker 数据库，
+多进程下各 worker 分行存储，
+读取时再合并，供 HTML 报告和 service.py 展示 p50/p90/p99/max。
+响应带有分阶段计时（见 aomaker.core.timing）时，同时按 (接口类, 阶段) 累加 DNS/建连/TLS/首字节/下载直方图。
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from aomaker.log import logger
+from aomaker.core.latency import LatencyHistogram
+from aomaker.core.call_log import current_worker
+from aomaker.core.timing import RequestTiming
+from .registry import RequestType, CallNext, ResponseType, middleware, registry
+
+MIDDLEWARE_NAME = "latency_middleware"
+DEFAULT_FLUSH_INTERVAL = 5.0
+# 请求异常（无响应）时记录的状态码
+ERROR_STATUS = 0
+
+HistKey = Tuple[str, int]
+
+
+class _ThreadStore:
+    def __init__(self, worker: str):
+        self.worker = worker
+        self.lock = threading.Lock()
+        self.hists: Dict[HistKey, LatencyHistogram] = {}
+        # 接口 -> [重试次数, 每次调用因重试增加的耗时]
+        self.retries: Dict[str, list] = {}
+        # (接口, 阶段) -> 直方图
+        self.phases: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+
+class LatencyRecorder:
+    """按线程分片的直方图集合"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._stores: List[_ThreadStore] = []
+        self._stores_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # 后台写入线程所在的进程号；fork 出的子进程没有父进程的线程，需要重新启动
+        self._writer_pid = None
+        self._flush_requested = threading.Event()
+
+    def _store(self) -> _ThreadStore:
+        store = getattr(self._local, "store", None)
+        if store is None:
+            store = self._local.store = _ThreadStore(current_worker())
+            with self._stores_lock:
+                self._stores.append(store)
+        return store
+
+    def record(self, api_name: str, status: int, elapsed_ms: float):
+        store = self._store()
+        key = (api_name, status)
+        with store.lock:
+            hist = store.hists.get(key)
+            if hist is None:
+                hist = store.hists[key] = LatencyHistogram()
+            hist.add(elapsed_ms)
+
+    def record_retry(self, api_name: str, retries: int, added_ms: float):
+        """记录一次发生了重试的调用"""
+        store = self._store()
+        with store.lock:
+            tally = store.retries.get(api_name)
+            if tally is None:
+                tally = store.retries[api_name] = [0, LatencyHistogram()]
+            tally[0] += retries
+            tally[1].add(added_ms)
+
+    def record_timing(self, api_name: str, timing: RequestTiming):
+        """记录一次请求的分阶段耗时；复用连接的请求没有 dns/connect/tls 阶段"""
+        store = self._store()
+        with store.lock:
+            for phase, elapsed_ms in timing.phases().items():
+                hist = store.phases.get((api_name, phase))
+                if hist is None:
+                    hist = store.phases[(api_name, phase)] = LatencyHistogram()
+                hist.add(elapsed_ms)
+
+    def drain_phases(self) -> Dict[Tuple[str, str, str], LatencyHistogram]:
+        """取出并清空所有线程的分阶段统计，返回 {(worker, api_name, phase): 直方图}"""
+        with self._stores_lock:
+            stores = list(self._stores)
+        drained: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        for store in stores:
+            with store.lock:
+                hists, store.phases = store.phases, {}
+            for (api_name, phase), hist in hists.items():
+                key = (store.worker, api_name, phase)
+                if key in drained:
+                    drained[key].merge(hist)
+                else:
+                    drained[key] = hist
+        return drained
+
+    def drain_retries(self) -> Dict[Tuple[str, str], Tuple[int, LatencyHistogram]]:
+        """取出并清空所有线程的重试统计，返回 {(worker, api_name): (重试次数, 增加耗时直方图)}"""
+        with self._stores_lock:
+            stores = list(self._stores)
+        drained: Dict[Tuple[str, str], Tuple[int, LatencyHistogram]] = {}
+        for store in stores:
+            with store.lock:
+                tallies, store.retries = store.retries, {}
+            for api_name, (retries, hist) in tallies.items():
+                key = (store.worker, api_name)
+                if key in drained:
+                    retries += drained[key][0]
+                    hist = drained[key][1].merge(hist)
+                drained[key] = (retries, hist)
+        return drained
+
+    def drain(self) -> Dict[Tuple[str, str, int], LatencyHistogram]:
+        """取出并清空所有线程的增量，返回 {(worker, api_name, status): 直方图}"""
+        with self._stores_lock:
+            stores = list(self._stores)
+        drained: Dict[Tuple[str, str, int], LatencyHistogram] = {}
+        for store in stores:
+            with store.lock:
+                hists, store.hists = store.hists, {}
+            for (api_name, status), hist in hists.items():
+                key = (store.worker, api_name, status)
+                if key in drained:
+                    drained[key].merge(hist)
+                else:
+                    drained[key] = hist
+        return drained
+
+    def flush(self):
+        """把增量合并写入数据库"""
+        with self._flush_lock:
+            self._flush()
+
+    def maybe_flush(self, interval: float):
+        """距上次写库超过 interval 秒时通知后台线程写库，请求线程不做数据库操作"""
+        if time.monotonic() - self._last_flush < interval:
+            return
+        self._last_flush = time.monotonic()
+        self._ensure_writer()
+        self._flush_requested.set()
+
+    def _ensure_writer(self):
+        if self._writer_pid == os.getpid():
+            return
+        with self._stores_lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+            self._flush_requested = threading.Event()
+            threading.Thread(target=self._run_writer, args=(self._flush_requested,),
+                             name="aomaker-latency-writer", daemon=True).start()
+
+    def _run_writer(self, requested: threading.Event):
+        while True:
+            requested.wait()
+            requested.clear()
+            self.flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        drained = self.drain()
+        retries = self.drain_retries()
+        phases = self.drain_phases()
+        if not drained and not retries and not phases:
+            return
+        from aomaker.storage import latency, retry_stats, phase_timing
+        try:
+            for (worker, api_name, status), hist in drained.items():
+                latency.merge(api_name, status, worker, hist)
+            for (worker, api_name), (count, hist) in retries.items():
+                retry_stats.merge(api_name, worker, count, hist)
+            for (worker, api_name, phase), hist in phases.items():
+                phase_timing.merge(api_name, phase, worker, hist)
+        except Exception as e:
+            logger.warning(f"接口延迟统计写入失败: {str(e)}")
+
+
+recorder = LatencyRecorder()
+
+
+def flush_latency():
+    recorder.flush()
+
+
+def _flush_interval() -> float:
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    if config is None:
+        return DEFAULT_FLUSH_INTERVAL
+    return float(config.options.get("flush_interval", DEFAULT_FLUSH_INTERVAL))
+
+
+@middleware(name=MIDDLEWARE_NAME, priority=-1000)
+def latency_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
+    """记录接口延迟直方图；优先级最低，尽量贴近真实发送，不计入其他中间件的耗时"""
+    api_meta = request.get("_api_meta", {})
+    api_name = api_meta.get("class_name") or api_meta.get("route") or request.get("url", "")
+    status = ERROR_STATUS
+    start = time.perf_counter()
+    try:
+        response = call_next(request)
+        status = response.status_code
+        timing = getattr(response, "timing", None)
+        if isinstance(timing, RequestTiming):
+            recorder.record_timing(api_name, timing)
+        return response
+    finally:
+        recorder.record(api_name, status, (time.perf_counter() - start) * 1000)
+        recorder.maybe_flush(_flush_interval())
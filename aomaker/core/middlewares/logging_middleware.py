@@ -1,8 +1,10 @@
 # --coding:utf-8--
 import json
+import itertools
+import time
 import traceback
 from json import JSONDecodeError
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Optional, Dict, Any
 
 from jinja2 import Template
@@ -10,7 +12,10 @@ import allure
 from emoji import emojize
 
 from aomaker.log import logger, aomaker_logger
-from .registry import RequestType, CallNext, ResponseType, middleware
+from aomaker.core.attachment_writer import attachment_writer
+from aomaker.core.call_log import CALL_LOG_DIR, current_test_node, current_worker, get_call_log_writer
+from aomaker.core.timing import RequestTiming
+from .registry import RequestType, CallNext, ResponseType, middleware, registry
 
 TEMPLATE = """
 {{tag}}
@@ -43,6 +48,111 @@ TEMPLATE = """
 {{tag}}
 """
 
+# 模板只编译一次，emoji 也只转换一次
+_FULL_TEMPLATE = Template(TEMPLATE)
+_TAG = "=" * 100
+_EMOJI_API = emojize(":A_button_(blood_type):")
+_EMOJI_REQ = emojize(":rocket:")
+_EMOJI_REP = emojize(":check_mark_button:")
+_EMOJI_REP_STREAM = emojize(":down_arrow:")
+
+DEBUG_LEVEL = 10
+INFO_LEVEL = 20
+
+LOG_FORMATS = ("full", "compact")
+MIDDLEWARE_NAME = "logging_middleware"
+
+STREAMING_BODY = "[流式响应] 内容将分块传输，无法预先记录"
+_TEXT_CONTENT_TYPES = ("json", "xml", "javascript", "x-www-form-urlencoded", "yaml", "html")
+
+
+@dataclass(frozen=True)
+class LogOptions:
+    """
+    日志中间件配置，在 middlewares.yaml 中设置：
+
+    logging_middleware:
+      priority: 1000
+      enabled: true
+      options:
+        format: compact        # full / compact
+        max_body_size: 4096    # 请求/响应体超过该字节数时只保留首尾，0 表示不限制
+        skip_binary: true      # 二进制内容只记录类型和大小
+        sample_rate: 10        # 成功的请求每 10 次记录 1 次（日志和 allure 附件），失败的请求总是完整记录
+        async_attach: true     # allure 附件交给后台线程写入
+        attach_dedup: true     # 相同内容的附件只写一次
+        attach_compress_size: 0  # 超过该字节数的附件 gzip 压缩存储，0 表示不压缩
+        call_log: true         # 每次调用额外写一行 JSONL 记录（logs/calls/），供 aomaker show calls 分析
+        call_log_fsync_interval: 1.0  # JSONL 记录 fsync 的间隔秒数
+    """
+    format: str = "full"
+    max_body_size: int = 0
+    skip_binary: bool = True
+    sample_rate: int = 1
+    async_attach: bool = True
+    attach_dedup: bool = True
+    attach_compress_size: int = 0
+    call_log: bool = False
+    call_log_dir: str = CALL_LOG_DIR
+    call_log_fsync_interval: float = 1.0
+
+    def __post_init__(self):
+        if self.format not in LOG_FORMATS:
+            raise ValueError(f"不支持的日志格式: {self.format}，可选值: {LOG_FORMATS}")
+        if self.max_body_size < 0:
+            raise ValueError(f"max_body_size 不能为负数: {self.max_body_size}")
+        if self.sample_rate < 1:
+            raise ValueError(f"sample_rate 必须大于等于 1: {self.sample_rate}")
+        if self.attach_compress_size < 0:
+            raise ValueError(f"attach_compress_size 不能为负数: {self.attach_compress_size}")
+        if self.call_log_fsync_interval < 0:
+            raise ValueError(f"call_log_fsync_interval 不能为负数: {self.call_log_fsync_interval}")
+
+    @classmethod
+    def from_dict(cls, options: Dict[str, Any]) -> "LogOptions":
+        known = {f.name for f in fields(cls)}
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"日志中间件不支持的配置项: {sorted(unknown)}，可选: {sorted(known)}")
+        return cls(**options)
+
+
+# 代码中的覆盖项（如 set_log_format），优先级高于 middlewares.yaml
+_overrides: Dict[str, Any] = {}
+# 解析后的配置按来源缓存，配置变化时才重新构建；未配置 options 时来源为 None，同样缓存
+_UNRESOLVED = object()
+_resolved: Dict[str, Any] = {"source": _UNRESOLVED, "options": LogOptions()}
+_sample_counter = itertools.count()
+
+
+def set_log_format(log_format: str):
+    """
+    设置接口日志格式
+    full: 多行完整格式（默认）
+    compact: 单行紧凑格式，适合大批量请求
+    """
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"不支持的日志格式: {log_format}，可选值: {LOG_FORMATS}")
+    _overrides["format"] = log_format
+    _resolved["source"] = _UNRESOLVED
+
+
+def validate_log_options(options: Dict[str, Any]) -> LogOptions:
+    """加载 middlewares.yaml 时校验日志中间件配置"""
+    return LogOptions.from_dict({**options, **_overrides})
+
+
+def get_log_options() -> LogOptions:
+    """读取当前生效的日志配置，配置已在加载中间件时校验过"""
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    source = config.options if config is not None else None
+    if source is not _resolved["source"]:
+        options = LogOptions.from_dict({**(source or {}), **_overrides})
+        attachment_writer.configure(dedup=options.attach_dedup, compress_size=options.attach_compress_size)
+        _resolved["options"] = options
+        _resolved["source"] = source
+    return _resolved["options"]
+
 
 @dataclass
 class LogData:
@@ -54,54 +164,128 @@ class LogData:
     error: Optional[Dict[str, Any]] = None
 
 
-@middleware(name="logging_middleware", priority=900)
+@middleware(name=MIDDLEWARE_NAME, priority=900, options_validator=validate_log_options)
 def structured_logging_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
     """支持多输出的结构化日志中间件"""
     api_meta = request.get("_api_meta", {})
     is_streaming = api_meta.get("is_streaming", False)
+    options = get_log_options()
     
     log_data = LogData(request=request, class_name=api_meta.get("class_name",""), class_doc=api_meta.get("class_doc",""))
     response = None
+    route = api_meta.get("route")
+    start = time.perf_counter()
 
     try:
         response = call_next(request)
-        
-        # 处理流式响应和普通响应的日志记录差异
-        if is_streaming:
-            log_data.response = {
-                "status_code": response.status_code,
-                "elapsed": response.elapsed.total_seconds() if response.elapsed else None,
-                "response_body": "[流式响应] 内容将分块传输，无法预先记录" 
-            }
-        else:
-            log_data.response = _parse_response(response)
-            
-        log_data.success = True
+        # 响应体在真正输出日志或附件时才解析，见 _ensure_response_parsed
+        log_data.success = response.status_code < 400
 
     except Exception as e:
         log_data.error = _parse_exception(e)
         raise
     finally:
-        _process_log_outputs(log_data, request, response, is_streaming)
+        if options.call_log:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _write_call_record(log_data, request, response, route, elapsed_ms, is_streaming, options, api_meta)
+        _process_log_outputs(log_data, request, response, is_streaming, options)
 
     return response
 
 
-def _parse_response(response: ResponseType) -> Dict[str, Any]:
+def _write_call_record(log_data: LogData, request: RequestType, response: Optional[ResponseType],
+                       route: Optional[str], elapsed_ms: float, is_streaming: bool, options: LogOptions,
+                       api_meta: Optional[Dict[str, Any]] = None):
+    """写一行 JSONL 调用记录，失败只告警，不影响请求"""
+    record = {
+        "ts": round(time.time(), 3),
+        "class": log_data.class_name,
+        "method": request.get("method"),
+        "route": route,
+        "url": request.get("url"),
+        "status": response.status_code if response is not None else None,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "req_bytes": _request_size(response),
+        "resp_bytes": _response_size(response, is_streaming),
+        "worker": current_worker(),
+        "node": current_test_node(),
+    }
+    if log_data.error is not None:
+        record["error"] = log_data.error["type"]
+    # retry_middleware 在 api_meta 上记录的重试次数和增加的耗时
+    retries = (api_meta or {}).get("retries")
+    if retries:
+        record["retries"] = retries
+        record["retry_ms"] = api_meta.get("retry_delay_ms")
+    timing = getattr(response, "timing", None)
+    if isinstance(timing, RequestTiming):
+        record["reused"] = timing.reused
+        for phase, elapsed in timing.phases().items():
+            record[f"{phase}_ms"] = round(elapsed, 3)
+    try:
+        get_call_log_writer(options.call_log_dir, options.call_log_fsync_interval).write(record)
+    except Exception as e:
+        logger.warning(f"接口调用记录写入失败: {str(e)}")
+
+
+def _request_size(response: Optional[ResponseType]) -> Optional[int]:
+    prepared = getattr(response, "request", None)
+    headers = getattr(prepared, "headers", None)
+    if not headers:
+        return None
+    size = headers.get("Content-Length")
+    return int(size) if size is not None and str(size).isdigit() else 0
+
+
+def _response_size(response: Optional[ResponseType], is_streaming: bool) -> Optional[int]:
+    if response is None:
+        return None
+    if is_streaming:
+        size = (getattr(response, "headers", None) or {}).get("Content-Length")
+        return int(size) if size is not None and str(size).isdigit() else None
+    return len(response.content or b"")
+
+
+def _ensure_response_parsed(log_data: LogData, response: Optional[ResponseType], is_streaming: bool,
+                            options: LogOptions) -> Dict[str, Any]:
+    """解析响应并缓存在 log_data 上，日志和 allure 附件共用一次解析结果"""
+    if response is None or log_data.response:
+        return log_data.response
+    # 处理流式响应和普通响应的日志记录差异
+    if is_streaming:
+        log_data.response = {
+            "status_code": response.status_code,
+            "elapsed": response.elapsed.total_seconds() if response.elapsed else None,
+            "response_body": STREAMING_BODY
+        }
+    else:
+        log_data.response = _parse_response(response, options, full=not log_data.success)
+    return log_data.response
+
+
+def _parse_response(response: ResponseType, options: LogOptions = LogOptions(), full: bool = False) -> Dict[str, Any]:
     """解析响应数据"""
     return {
         "status_code": response.status_code,
         "elapsed": response.elapsed.total_seconds() if response.elapsed else None,
-        "response_body": _parse_response_body(response)
+        "response_body": _parse_response_body(response, options, full)
     }
 
 
-def _parse_response_body(response: ResponseType) -> Any:
-    """自动解析响应体"""
-    if not response.content:
+def _parse_response_body(response: ResponseType, options: LogOptions = LogOptions(), full: bool = False) -> Any:
+    """自动解析响应体；full=False 时按配置跳过二进制内容、截断超长内容"""
+    content = response.content
+    if not content:
         logger.warning("该接口response内容为空")
         return None
 
+    if options.skip_binary and _is_binary(response, content):
+        return _binary_marker(_content_type(response), len(content))
+
+    if not full and options.max_body_size and len(content) > options.max_body_size:
+        # 超长响应不做 JSON 解析，直接截取首尾字节
+        return _truncate_bytes(content, options.max_body_size)
+
     try:
         return response.json()
     except JSONDecodeError:
@@ -109,6 +293,54 @@ def _parse_response_body(response: ResponseType) -> Any:
         return response.text
 
 
+def _content_type(response: ResponseType) -> str:
+    headers = getattr(response, "headers", None) or {}
+    return headers.get("Content-Type", "") or ""
+
+
+def _is_binary(response: ResponseType, content: bytes) -> bool:
+    content_type = _content_type(response).lower()
+    if content_type:
+        if content_type.startswith("text/"):
+            return False
+        return not any(t in content_type for t in _TEXT_CONTENT_TYPES)
+    return b"\x00" in content[:1024]
+
+
+def _binary_marker(content_type: str, size: int) -> str:
+    return f"[二进制内容] {content_type or '未知类型'}, {size} 字节"
+
+
+def _truncate_bytes(content: bytes, limit: int) -> str:
+    """保留首尾各一半，中间以省略的字节数标记"""
+    head_size = limit // 2
+    tail_size = limit - head_size
+    omitted = len(content) - head_size - tail_size
+    head = content[:head_size].decode("utf-8", errors="replace")
+    tail = content[-tail_size:].decode("utf-8", errors="replace") if tail_size else ""
+    return f"{head}...[已省略 {omitted} 字节]...{tail}"
+
+
+def _shrink_payload(value: Any, options: LogOptions) -> Any:
+    """按配置处理请求体：二进制/文件只记录标记，超长内容截断"""
+    if value is None:
+        return None
+    if hasattr(value, "read"):
+        return "[文件流]"
+    if isinstance(value, (bytes, bytearray)):
+        if options.skip_binary:
+            return _binary_marker("", len(value))
+        return _truncate_bytes(bytes(value), options.max_body_size) \
+            if options.max_body_size and len(value) > options.max_body_size else value
+    if not options.max_body_size:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    raw = text.encode("utf-8")
+    if len(raw) <= options.max_body_size:
+        return value
+    return _truncate_bytes(raw, options.max_body_size)
+
+
 def _parse_exception(e: Exception) -> Dict[str, Any]:
     """解析异常信息"""
     return {
@@ -118,53 +350,105 @@ def _parse_exception(e: Exception) -> Dict[str, Any]:
     }
 
 
-def _process_log_outputs(log_data: LogData, request: RequestType, response: Optional[ResponseType], is_streaming: bool = False):
+def _process_log_outputs(log_data: LogData, request: RequestType, response: Optional[ResponseType],
+                         is_streaming: bool = False, options: LogOptions = LogOptions()):
     """处理三路输出"""
+    full = log_data.error is not None or not log_data.success
+    # 成功的请求按 1/N 采样输出到日志和附件，失败的请求总是输出
+    sampled = full or options.sample_rate == 1 or next(_sample_counter) % options.sample_rate == 0
+    if not sampled:
+        return
     log_current_level = aomaker_logger.get_level()
+    emit_level = DEBUG_LEVEL if log_current_level == DEBUG_LEVEL else INFO_LEVEL
 
-    render_data = {
-        "tag": "=" * 100,
-        "emoji_api": emojize(":A_button_(blood_type):"),
-        "emoji_req": emojize(":rocket:"),
-        "emoji_rep": emojize(":check_mark_button:" if not is_streaming else ":down_arrow:"),
-        **log_data.request,
-        **log_data.response,
-        "class_name": log_data.class_name,
-        "class_doc": log_data.class_doc,
-        "log_level": log_current_level
-    }
+    # 请求体的截断视图只在确实输出日志或附件时生成
+    request_view = None
+    # 没有任何 sink 会输出时，跳过日志渲染
+    if aomaker_logger.is_enabled(emit_level):
+        request_view = _request_view(request, full, options)
+        render_data = {
+            **log_data.request,
+            **request_view,
+            **_ensure_response_parsed(log_data, response, is_streaming, options),
+            "class_name": log_data.class_name,
+            "class_doc": log_data.class_doc,
+            "log_level": log_current_level
+        }
+        if options.format == "compact":
+            formatted_log = _render_compact(render_data)
+        else:
+            render_data.update(
+                tag=_TAG,
+                emoji_api=_EMOJI_API,
+                emoji_req=_EMOJI_REQ,
+                emoji_rep=_EMOJI_REP_STREAM if is_streaming else _EMOJI_REP,
+            )
+            formatted_log = _FULL_TEMPLATE.render(render_data)
 
-    formatted_log = Template(TEMPLATE).render(render_data)
+        # 控制台输出（根据日志级别）
+        if emit_level == DEBUG_LEVEL:
+            logger.debug(formatted_log)
+        else:
+            logger.info(formatted_log)
+
+    # 没有 allure 报告器接收附件时，跳过响应解析和附件序列化
+    if attachment_writer.reporter_active():
+        if request_view is None:
+            request_view = _request_view(request, full, options)
+        _attach_allure_report(log_data, request, response, is_streaming, request_view, options)
+
+
+def _request_view(request: RequestType, full: bool, options: LogOptions) -> Dict[str, Any]:
+    """日志和附件中展示的请求体：失败的请求完整输出，成功的请求按 max_body_size 截断"""
+    if full:
+        return {"data": request.get("data"), "json": request.get("json")}
+    return {"data": _shrink_payload(request.get("data"), options),
+            "json": _shrink_payload(request.get("json"), options)}
 
-    # 控制台输出（根据日志级别）
-    if log_current_level == 10:
-        logger.debug(formatted_log)
-    else:
-        logger.info(formatted_log)
 
-    _attach_allure_report(log_data, request, response, is_streaming)
+def _render_compact(render_data: Dict[str, Any]) -> str:
+    """单行格式：<API> 类名 | 方法 URL | 请求参数 | 状态码 耗时 | 响应体"""
+    parts = [f"<API>: {render_data['class_name']}",
+             f"{render_data.get('method') or ''} {render_data.get('url')}".strip()]
+    if render_data["log_level"] == DEBUG_LEVEL and render_data.get("headers"):
+        parts.append(f"headers={render_data['headers']}")
+    for key in ("params", "data", "json"):
+        if render_data.get(key):
+            parts.append(f"{key}={render_data[key]}")
+    status_code = render_data.get("status_code")
+    elapsed = render_data.get("elapsed")
+    if status_code is not None:
+        parts.append(f"{status_code} {elapsed}s" if elapsed else str(status_code))
+    parts.append(f"body={render_data.get('response_body')}")
+    return " | ".join(parts)
 
 
-def _attach_allure_report(log_data: LogData, request: RequestType, response: Optional[ResponseType], is_streaming: bool = False):
+def _attach_allure_report(log_data: LogData, request: RequestType, response: Optional[ResponseType],
+                          is_streaming: bool = False, request_view: Optional[Dict[str, Any]] = None,
+                          options: LogOptions = LogOptions()):
     """生成Allure附件"""
+    request_view = request_view or {}
     allure_info = {
         "request": {
             "url": request["url"],
             "method": request.get("method"),
             "params": request.get("params"),
-            "data": request.get("data"),
-            "json": request.get("json")
+            "data": request_view.get("data", request.get("data")),
+            "json": request_view.get("json", request.get("json"))
         }
     }
 
     if response is not None:
         allure_info["response"] = {
             "status_code": response.status_code,
-            "body": "[流式响应]" if is_streaming else log_data.response.get("response_body")
+            "body": "[流式响应]" if is_streaming else
+            _ensure_response_parsed(log_data, response, is_streaming, options).get("response_body")
         }
 
     try:
-        allure.attach(
+        # 文件写入交给后台线程，请求线程只负责序列化和登记附件
+        attach = attachment_writer.attach if options.async_attach else allure.attach
+        attach(
             json.dumps(allure_info, indent=2, ensure_ascii=False),
             name=f"{log_data.class_name}",
             attachment_type=allure.attachment_type.JSON
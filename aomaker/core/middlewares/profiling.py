@@ -0,0 +1,125 @@
+# --coding:utf-8--
+"""
+中间件耗时分析
+
+开启后注册表会给每个中间件包一层计时：中间件自身耗时 = 总耗时 - 在 call_next 中的耗时，
+即只统计中间件自己的逻辑（签名、脱敏、日志渲染等），不包含后续中间件和真实请求。
+各进程按中间件名累加到直方图，测试结束时写入数据库并汇总展示。
+"""
+import threading
+import time
+from functools import wraps
+from typing import Dict, List
+
+from aomaker.log import logger
+from aomaker.core.latency import LatencyHistogram
+from aomaker.core.call_log import current_worker
+
+PROFILING_CONFIG_KEY = "profile_middlewares"
+
+
+class MiddlewareTimer:
+    """按中间件名累加自身耗时（毫秒）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hists: Dict[str, LatencyHistogram] = {}
+
+    def record(self, name: str, elapsed_ms: float):
+        with self._lock:
+            hist = self._hists.get(name)
+            if hist is None:
+                hist = self._hists[name] = LatencyHistogram()
+            hist.add(elapsed_ms)
+
+    def drain(self) -> Dict[str, LatencyHistogram]:
+        with self._lock:
+            hists, self._hists = self._hists, {}
+        return hists
+
+    def snapshot(self) -> Dict[str, LatencyHistogram]:
+        with self._lock:
+            return {name: LatencyHistogram().merge(hist) for name, hist in self._hists.items()}
+
+
+timer = MiddlewareTimer()
+
+
+def profiled(name: str, func):
+    """包装中间件，记录其扣除 call_next 后的耗时"""
+
+    @wraps(func)
+    def wrapper(request, call_next):
+        inner = 0.0
+
+        def timed_call_next(req):
+            nonlocal inner
+            start_inner = time.perf_counter()
+            try:
+                return call_next(req)
+            finally:
+                inner += time.perf_counter() - start_inner
+
+        start = time.perf_counter()
+        try:
+            return func(request, call_next=timed_call_next)
+        finally:
+            timer.record(name, (time.perf_counter() - start - inner) * 1000)
+
+    wrapper.__wrapped_middleware__ = func
+    return wrapper
+
+
+def summarize(hists: Dict[str, LatencyHistogram]) -> List[dict]:
+    """按总耗时降序的汇总，单位毫秒"""
+    result = []
+    for name, hist in hists.items():
+        result.append({
+            "name": name,
+            "count": hist.count,
+            "total": round(hist.total, 2),
+            "mean": _round_ms(hist.mean),
+            "p50": _round_ms(hist.quantile(0.5)),
+            "p99": _round_ms(hist.quantile(0.99)),
+            "max": _round_ms(hist.max if hist.count else None),
+        })
+    result.sort(key=lambda item: item["total"], reverse=True)
+    return result
+
+
+def _round_ms(value):
+    return None if value is None else round(value, 3)
+
+
+def flush_middleware_timings():
+    """把本进程的增量写入数据库"""
+    hists = timer.drain()
+    if not hists:
+        return
+    from aomaker.storage import middleware_timing
+    worker = current_worker()
+    try:
+        for name, hist in hists.items():
+            middleware_timing.merge(name, worker, hist)
+    except Exception as e:
+        logger.warning(f"中间件耗时统计写入失败: {str(e)}")
+
+
+def print_middleware_timings():
+    """测试结束时打印各中间件自身耗时"""
+    from rich.console import Console
+    from rich.table import Table
+    from aomaker.storage import middleware_timing
+
+    rows = summarize(middleware_timing.get_histograms())
+    if not rows:
+        return
+    table = Table(show_header=True, header_style="bold magenta", title="Middleware Self Time (ms)", show_edge=True,
+                  border_style="green")
+    table.add_column("Middleware", style="cyan", no_wrap=True)
+    for column in ("Calls", "Total", "Mean", "p50", "p99", "Max"):
+        table.add_column(column, justify="right")
+    for row in rows:
+        table.add_row(row["name"], str(row["count"]),
+                      *("-" if row[key] is None else f"{row[key]:.3f}" for key in ("total", "mean", "p50", "p99", "max")))
+    Console().print(table)
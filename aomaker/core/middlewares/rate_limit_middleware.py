@@ -0,0 +1,293 @@
+# --coding:utf-8--
+"""
+限流与并发控制中间件
+
+按 host 和接口设置预算，在 middlewares.yaml 中配置：
+
+    rate_limit_middleware:
+      options:
+        shared: true                 # 在多进程（--mp）之间共享预算；false 只在本进程内生效
+        hosts:
+          api.example.com: {rate: 50, burst: 10, concurrency: 20}
+        endpoints:                   # key 为接口类名或路由模板，均支持 glob
+          CreateOrder: {rate: 5}
+          /api/v1/report/*: {concurrency: 2}
+
+rate 为每秒请求数，burst 为允许的突发请求数，concurrency 为同时进行的请求上限，0 表示不限制。
+速率限制采用 GCRA：每个请求原子地预约下一个时间片并等待到该时刻，请求被均匀地摊开，
+而不是先撞到上限再睡眠重试。一个请求命中多个预算时，按固定顺序在同一时刻预约，
+某个预算要求更晚时整体顺延到该时刻重新预约，不会在较宽松的预算上提前占用时间片。
+
+共享模式下，多进程 runner 在启动 worker 前为各预算创建进程间共享的理论到达时间和信号量
+（见 create_shared_state），预约和并发名额都在内存中完成，不经过数据库；
+单进程和多线程模式下使用进程内的状态。
+"""
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .registry import RequestType, CallNext, ResponseType, middleware, registry, chain_key
+
+MIDDLEWARE_NAME = "rate_limit_middleware"
+# runner 创建、经进程池 initializer 传给各 worker 的共享状态：预算名 -> 理论到达时间 / 并发信号量
+_tats: Dict[str, Any] = {}
+_semaphores: Dict[str, Any] = {}
+
+
+@dataclass(frozen=True)
+class Budget:
+    rate: float = 0
+    burst: int = 1
+    concurrency: int = 0
+
+    def __post_init__(self):
+        if self.rate < 0 or self.concurrency < 0:
+            raise ValueError(f"rate/concurrency 不能为负数: {self}")
+        if self.burst < 1:
+            raise ValueError(f"burst 必须大于等于 1: {self.burst}")
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+
+def _gcra(tat: float, interval: float, burst: int, at: float) -> Tuple[float, Optional[float]]:
+    """
+    在 at 时刻预约一个时间片
+
+    可以放行时返回 (新的理论到达时间, None)，否则返回 (原理论到达时间, 最早可放行的时刻)
+    """
+    earliest = tat - (burst - 1) * interval
+    if earliest > at:
+        return tat, earliest
+    return max(tat, at) + interval, None
+
+
+class LocalBackend:
+    """进程内的限流状态"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tat: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        self._released = threading.Condition(self._lock)
+
+    def try_reserve(self, budget: str, interval: float, burst: int, at: float) -> Optional[float]:
+        """在 at 时刻可以放行则占用时间片并返回 None，否则不占用，返回最早可放行的时刻"""
+        with self._lock:
+            self._tat[budget], later = _gcra(self._tat.get(budget, at), interval, burst, at)
+        return later
+
+    def refund(self, budget: str, interval: float):
+        """退还 try_reserve 占用的时间片"""
+        with self._lock:
+            self._tat[budget] -= interval
+
+    def acquire(self, budget: str, limit: int):
+        with self._released:
+            while self._in_use.get(budget, 0) >= limit:
+                self._released.wait()
+            self._in_use[budget] = self._in_use.get(budget, 0) + 1
+
+    def release(self, budget: str):
+        with self._released:
+            self._in_use[budget] -= 1
+            self._released.notify_all()
+
+    def clear(self):
+        with self._lock:
+            self._tat.clear()
+            self._in_use.clear()
+
+
+class SharedBackend:
+    """跨进程限流状态：使用 runner 创建的进程间共享值和信号量，没有创建的预算只在本进程内生效"""
+
+    def __init__(self):
+        # 单进程/多线程模式下没有共享状态，退化为进程内限流
+        self._local = LocalBackend()
+
+    def try_reserve(self, budget: str, interval: float, burst: int, at: float) -> Optional[float]:
+        tat = _tats.get(budget)
+        if tat is None:
+            return self._local.try_reserve(budget, interval, burst, at)
+        with tat.get_lock():
+            tat.value, later = _gcra(tat.value, interval, burst, at)
+        return later
+
+    def refund(self, budget: str, interval: float):
+        tat = _tats.get(budget)
+        if tat is None:
+            self._local.refund(budget, interval)
+            return
+        with tat.get_lock():
+            tat.value -= interval
+
+    def acquire(self, budget: str, limit: int):
+        semaphore = _semaphores.get(budget)
+        if semaphore is None:
+            self._local.acquire(budget, limit)
+        else:
+            semaphore.acquire()
+
+    def release(self, budget: str):
+        semaphore = _semaphores.get(budget)
+        if semaphore is None:
+            self._local.release(budget)
+        else:
+            semaphore.release()
+
+    def clear(self):
+        self._local.clear()
+
+
+class RateLimiter:
+    def __init__(self, hosts: Dict[str, Budget] = None, endpoints: Dict[str, Budget] = None, backend=None):
+        self.hosts = hosts or {}
+        self.endpoints = endpoints or {}
+        self.backend = backend or LocalBackend()
+        self._resolved: Dict[Tuple, List[Tuple[str, Budget]]] = {}
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any]) -> "RateLimiter":
+        unknown = set(options) - {"shared", "hosts", "endpoints"}
+        if unknown:
+            raise ValueError(f"限流中间件不支持的配置项: {sorted(unknown)}")
+        hosts = {host: Budget(**budget) for host, budget in (options.get("hosts") or {}).items()}
+        endpoints = {pattern: Budget(**budget) for pattern, budget in (options.get("endpoints") or {}).items()}
+        backend = SharedBackend() if options.get("shared", True) else LocalBackend()
+        return cls(hosts=hosts, endpoints=endpoints, backend=backend)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.hosts or self.endpoints)
+
+    def all_budgets(self) -> List[Tuple[str, Budget]]:
+        budgets = [(f"host:{pattern}", budget) for pattern, budget in self.hosts.items()]
+        return budgets + [(f"endpoint:{pattern}", budget) for pattern, budget in self.endpoints.items()]
+
+    def budgets_for(self, request: RequestType) -> List[Tuple[str, Budget]]:
+        """对该请求生效的预算，按 (接口, host) 缓存"""
+        key = chain_key(request.get("_api_meta")) + (urlsplit(str(request.get("url", ""))).netloc,)
+        budgets = self._resolved.get(key)
+        if budgets is None:
+            class_name, route, _, _ = key[:4]
+            host = key[-1]
+            budgets = [(f"host:{pattern}", budget) for pattern, budget in self.hosts.items()
+                       if fnmatchcase(host, pattern)]
+            budgets += [(f"endpoint:{pattern}", budget) for pattern, budget in self.endpoints.items()
+                        if fnmatchcase(class_name, pattern) or (route and fnmatchcase(route, pattern))]
+            # 固定的获取顺序，避免多个预算之间互相等待
+            budgets.sort(key=lambda item: item[0])
+            self._resolved[key] = budgets
+        return budgets
+
+    def reserve(self, budgets: List[Tuple[str, Budget]], now: float) -> float:
+        """
+        在所有预算上预约同一个时刻，返回该时刻
+
+        依次在 at 时刻预约，某个预算要求更晚时退还已占用的时间片，顺延到该预算放行的时刻重新预约
+        """
+        at = now
+        while True:
+            taken = []
+            for name, budget in budgets:
+                if not budget.rate:
+                    continue
+                later = self.backend.try_reserve(name, budget.interval, budget.burst, at)
+                if later is not None:
+                    for taken_name, taken_budget in taken:
+                        self.backend.refund(taken_name, taken_budget.interval)
+                    at = later
+                    break
+                taken.append((name, budget))
+            else:
+                return at
+
+    def acquire(self, budgets: List[Tuple[str, Budget]]) -> List[str]:
+        """按速率等待并占用并发名额，返回需要释放的预算"""
+        now = time.time()
+        wait = self.reserve(budgets, now) - now
+        if wait > 0:
+            time.sleep(wait)
+        held = []
+        try:
+            for name, budget in budgets:
+                if budget.concurrency:
+                    self.backend.acquire(name, budget.concurrency)
+                    held.append(name)
+        except BaseException:
+            self.release(held)
+            raise
+        return held
+
+    def release(self, held: List[str]):
+        for name in reversed(held):
+            self.backend.release(name)
+
+
+_resolved: Dict[str, Any] = {"source": None, "limiter": RateLimiter()}
+
+
+def validate_rate_limit_options(options: Dict[str, Any]) -> RateLimiter:
+    """加载 middlewares.yaml 时校验限流中间件配置"""
+    return RateLimiter.from_options(options)
+
+
+def get_rate_limiter() -> RateLimiter:
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    source = config.options if config is not None else None
+    if source is not _resolved["source"]:
+        _resolved["limiter"] = RateLimiter.from_options(source or {}) if source else RateLimiter()
+        _resolved["source"] = source
+    return _resolved["limiter"]
+
+
+def create_shared_state(limiter: Optional[RateLimiter] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    多进程 runner 在启动 worker 前调用，为共享模式下的预算创建进程间共享状态：
+    设置了 rate 的预算创建共享的理论到达时间，设置了 concurrency 的预算创建信号量
+
+    返回值作为进程池 initializer 的参数传给各 worker，由 install_shared_state 安装
+    """
+    if limiter is None:
+        from .registry import init_middlewares
+        init_middlewares()
+        limiter = get_rate_limiter()
+    if not isinstance(limiter.backend, SharedBackend):
+        return {"tats": {}, "semaphores": {}}
+    budgets = limiter.all_budgets()
+    return {
+        "tats": {name: multiprocessing.Value("d", 0.0) for name, budget in budgets if budget.rate},
+        "semaphores": {name: multiprocessing.BoundedSemaphore(budget.concurrency) for name, budget in budgets
+                       if budget.concurrency},
+    }
+
+
+def install_shared_state(state: Optional[Dict[str, Dict[str, Any]]]):
+    """在 worker 进程中安装 runner 创建的共享状态"""
+    state = state or {}
+    _tats.clear()
+    _tats.update(state.get("tats") or {})
+    _semaphores.clear()
+    _semaphores.update(state.get("semaphores") or {})
+
+
+@middleware(name=MIDDLEWARE_NAME, priority=100, options_validator=validate_rate_limit_options)
+def rate_limit_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
+    """按 host / 接口预算限速和限制并发"""
+    limiter = get_rate_limiter()
+    if not limiter.enabled:
+        return call_next(request)
+    budgets = limiter.budgets_for(request)
+    if not budgets:
+        return call_next(request)
+    held = limiter.acquire(budgets)
+    try:
+        return call_next(request)
+    finally:
+        limiter.release(held)
@@ -1,15 +1,19 @@
 # --coding:utf-8--
-from typing import Callable, Dict, List, Any, TypeVar, Optional, Union
+from typing import Callable, Dict, List, Any, TypeVar, Optional, Tuple, Union
+from fnmatch import fnmatchcase
 from importlib import import_module
 import inspect
 import pkgutil
 import os
+import json
+import threading
 from functools import wraps
 from pathlib import Path
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
-from aomaker.path import MIDDLEWARE_CONFIG_PATH, MIDDLEWARES_DIR
+from aomaker.path import MIDDLEWARE_CONFIG_PATH, MIDDLEWARES_DIR, MIDDLEWARE_MANIFEST_PATH
+from .profiling import PROFILING_CONFIG_KEY, profiled, summarize, timer
 
 RequestType = Dict[str, Any]
 ResponseType = TypeVar('ResponseType')
@@ -18,6 +22,68 @@ CallNext = Callable[[RequestType], ResponseType]
 MiddlewareCallable = Callable[[RequestType, CallNext], ResponseType]
 
 
+ChainKey = Tuple[str, str, str, Tuple[str, ...]]
+
+
+class MiddlewareMatch(BaseModel):
+    """
+    中间件生效范围：各字段之间为"且"，同一字段的多个值为"或"，全部为空时对所有接口生效。
+
+    middlewares.yaml 示例：
+        sign_middleware:
+          match:
+            route: /api/v1/pay/*   # 路由模板 glob
+            method: [POST, PUT]
+    """
+    api: List[str] = Field(default_factory=list)
+    """接口类名，支持 glob"""
+    route: List[str] = Field(default_factory=list)
+    """路由模板，支持 glob，如 /api/v1/orders/*"""
+    method: List[str] = Field(default_factory=list)
+    tag: List[str] = Field(default_factory=list)
+    """router 装饰器上声明的 tags"""
+
+    @field_validator("api", "route", "method", "tag", mode="before")
+    @classmethod
+    def _to_list(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [value]
+        return list(value)
+
+    @field_validator("method")
+    @classmethod
+    def _upper_method(cls, value: List[str]) -> List[str]:
+        return [method.upper() for method in value]
+
+    @property
+    def is_global(self) -> bool:
+        return not (self.api or self.route or self.method or self.tag)
+
+    def matches(self, key: ChainKey) -> bool:
+        class_name, route, method, tags = key
+        if self.api and not any(fnmatchcase(class_name, pattern) for pattern in self.api):
+            return False
+        if self.route and not any(fnmatchcase(route, pattern) for pattern in self.route):
+            return False
+        if self.method and method not in self.method:
+            return False
+        if self.tag and not set(self.tag).intersection(tags):
+            return False
+        return True
+
+
+def chain_key(api_meta: Optional[Dict[str, Any]]) -> ChainKey:
+    """同一个接口类的请求得到相同的 key，用于缓存其中间件链"""
+    api_meta = api_meta or {}
+    method = api_meta.get("method") or ""
+    return (api_meta.get("class_name") or "",
+            api_meta.get("route") or "",
+            str(getattr(method, "value", method)).upper(),
+            tuple(api_meta.get("tags") or ()))
+
+
 class MiddlewareConfig(BaseModel):
     """中间件配置信息"""
     name: str
@@ -25,6 +91,9 @@ class MiddlewareConfig(BaseModel):
     enabled: bool = False
     priority: int = 0
     options: Dict[str, Any] = Field(default_factory=dict)
+    match: MiddlewareMatch = Field(default_factory=MiddlewareMatch)
+    options_validator: Optional[Callable[[Dict[str, Any]], Any]] = None
+    """加载配置时校验 options，配置有误时抛出 ValueError，避免到请求时才报错"""
     
     # pydantic 模型配置
     class Config:
@@ -37,21 +106,33 @@ class MiddlewareRegistry:
     def __init__(self):
         self.middleware_configs: Dict[str, MiddlewareConfig] = {}
         self.active_middlewares: List[MiddlewareCallable] = []
+        self.profiling = False
+        # 每次重建中间件列表时递增，客户端据此判断缓存的调用链是否失效
+        self.version = 0
+        self._active_matches: List[MiddlewareMatch] = []
+        self._chains: Dict[ChainKey, List[MiddlewareCallable]] = {}
+        # init_middlewares 是否已在本进程执行过
+        self.initialized = False
         
     def register(self, middleware: MiddlewareCallable, *, 
                 name: Optional[str] = None, 
                 enabled: bool = True,
                 priority: int = 0, 
-                options: Dict[str, Any] = None) -> MiddlewareCallable:
-        """注册一个中间件"""
+                options: Dict[str, Any] = None,
+                match: Union[MiddlewareMatch, Dict[str, Any], None] = None,
+                options_validator: Optional[Callable[[Dict[str, Any]], Any]] = None) -> MiddlewareCallable:
+        """注册一个中间件，match 为空时对所有接口生效"""
         middleware_name = name or middleware.__name__
+        _validate_options(middleware_name, options_validator, options)
         # 创建 MiddlewareConfig 实例
         self.middleware_configs[middleware_name] = MiddlewareConfig(
             name=middleware_name,
             middleware=middleware,
             enabled=enabled,
             priority=priority,
-            options=options or {}
+            options=options or {},
+            match=MiddlewareMatch.model_validate(match or {}),
+            options_validator=options_validator
         )
         self._rebuild_active_middlewares()
         return middleware
@@ -92,7 +173,9 @@ class MiddlewareRegistry:
                     name=config.get("name", name),
                     enabled=config.get("enabled", True),
                     priority=config.get("priority", 0),
-                    options=config.get("options", {})
+                    options=config.get("options", {}),
+                    match=config.get("match"),
+                    options_validator=config.get("options_validator")
                 )
     
     def _rebuild_active_middlewares(self):
@@ -103,8 +186,34 @@ class MiddlewareRegistry:
             key=lambda c: c.priority,
             reverse=True  # 高优先级先执行
         )
-        self.active_middlewares = [config.middleware for config in active_configs]
+        if self.profiling:
+            self.active_middlewares = [profiled(config.name, config.middleware) for config in active_configs]
+        else:
+            self.active_middlewares = [config.middleware for config in active_configs]
+        self._active_matches = [config.match for config in active_configs]
+        self._chains = {}
+        self.version += 1
+
+    def get_chain(self, api_meta: Optional[Dict[str, Any]] = None) -> List[MiddlewareCallable]:
+        """返回对该接口生效的中间件（已按优先级排序），每个接口类只计算一次"""
+        key = chain_key(api_meta)
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = [middleware for middleware, match in zip(self.active_middlewares, self._active_matches)
+                     if match.is_global or match.matches(key)]
+            self._chains[key] = chain
+        return chain
     
+    def enable_profiling(self, enabled: bool = True):
+        """开启/关闭中间件耗时分析：统计每个中间件扣除 call_next 后的自身耗时"""
+        if self.profiling != enabled:
+            self.profiling = enabled
+            self._rebuild_active_middlewares()
+
+    def get_timings(self) -> List[Dict[str, Any]]:
+        """当前进程内各中间件的自身耗时汇总（毫秒）"""
+        return summarize(timer.snapshot())
+
     def get_middlewares(self) -> List[MiddlewareCallable]:
         """获取所有活动中间件"""
         return self.active_middlewares
@@ -114,6 +223,11 @@ class MiddlewareRegistry:
         for name, settings in config_dict.items():
             if name in self.middleware_configs:
                 config = self.middleware_configs[name]
+                if "match" in settings:
+                    # model_copy 不做校验，这里先把 yaml 中的字典转换为 MiddlewareMatch
+                    settings = {**settings, "match": MiddlewareMatch.model_validate(settings["match"] or {})}
+                if "options" in settings:
+                    _validate_options(name, config.options_validator, settings["options"])
                 # 使用 Pydantic 模型的 copy 和 update 方法更新配置
                 updated_config = config.model_copy(update=settings)
                 self.middleware_configs[name] = updated_config
@@ -142,13 +256,28 @@ class MiddlewareRegistry:
             self._rebuild_active_middlewares()
 
 
+def _validate_options(name: str, validator: Optional[Callable[[Dict[str, Any]], Any]],
+                      options: Optional[Dict[str, Any]]):
+    if validator is None:
+        return
+    try:
+        validator(options or {})
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"中间件 {name} 的 options 配置有误: {e}") from e
+
+
 # 创建全局注册表实例
 registry = MiddlewareRegistry()
 
 
-def middleware(name: Optional[str] = None, enabled: bool = True, 
-              priority: int = 0, **options):
-    """用于标记和配置中间件的装饰器"""
+def middleware(name: Optional[str] = None, enabled: bool = True,
+              priority: int = 0, match: Optional[Dict[str, Any]] = None,
+              options_validator: Optional[Callable[[Dict[str, Any]], Any]] = None, **options):
+    """
+    用于标记和配置中间件的装饰器，match 用于限定生效的接口，见 MiddlewareMatch
+
+    options_validator 在注册和应用 middlewares.yaml 时校验 options
+    """
     def decorator(func: MiddlewareCallable) -> MiddlewareCallable:
         # 将配置保存到函数属性中
         func.middleware_config = {
@@ -157,6 +286,10 @@ def middleware(name: Optional[str] = None, enabled: bool = True,
             "priority": priority,
             "options": options
         }
+        if match is not None:
+            func.middleware_config["match"] = match
+        if options_validator is not None:
+            func.middleware_config["options_validator"] = options_validator
         return func
     return decorator
 
@@ -172,18 +305,130 @@ def apply_middleware_config(config: Dict[str, Any]):
         registry.apply_config(config)
 
 def register_internal_middlewares():
-    from aomaker.core.middlewares import logging_middleware
-    registry.register(logging_middleware.structured_logging_middleware)
+    from aomaker.core.middlewares import (logging_middleware, latency_middleware, cache_middleware,
+                                          coalesce_middleware, rate_limit_middleware, retry_middleware,
+                                          compression_middleware)
+    for internal in (logging_middleware.structured_logging_middleware, latency_middleware.latency_middleware,
+                     cache_middleware.cache_middleware, coalesce_middleware.coalesce_middleware,
+                     rate_limit_middleware.rate_limit_middleware, retry_middleware.retry_middleware,
+                     compression_middleware.compression_middleware):
+        # 使用装饰器上声明的名称注册，middlewares.yaml 中的同名配置才能生效
+        registry.register(internal, **getattr(internal, "middleware_config", {}))
 
-def init_middlewares():
-    """初始化中间件系统"""
+def init_middlewares(force: bool = False):
+    """
+    初始化中间件系统
+
+    每个进程只执行一次（注册表被清空或 force=True 时重新执行）。
+    项目中间件的扫描结果和 middlewares.yaml 缓存在 manifest 中，以文件 mtime 为 key，
+    文件未变化时新进程直接按 manifest 导入中间件，跳过包扫描和 yaml 解析。
+    """
+    if registry.initialized and registry.middleware_configs and not force:
+        return
+    with _init_lock:
+        if registry.initialized and registry.middleware_configs and not force:
+            return
+        _init_middlewares()
+
+
+_init_lock = threading.Lock()
+
+
+def _init_middlewares():
     register_internal_middlewares()
+    internal_names = set(registry.middleware_configs)
 
-    if os.path.exists(MIDDLEWARES_DIR):
-        registry.scan_middlewares("middlewares")
+    signature = _middlewares_signature()
+    manifest = _read_manifest(signature) if signature else None
+    if manifest is not None and _register_from_manifest(manifest["middlewares"]):
+        custom_middleware_config = manifest["config"]
+    else:
+        if os.path.exists(MIDDLEWARES_DIR):
+            registry.scan_middlewares("middlewares")
+        custom_middleware_config = load_middleware_config()
+        if signature:
+            discovered = [config for name, config in registry.middleware_configs.items() if name not in internal_names]
+            _write_manifest(signature, discovered, custom_middleware_config)
 
-    custom_middleware_config = load_middleware_config()
     apply_middleware_config(custom_middleware_config)
+    registry.enable_profiling(_profiling_requested())
+    registry.initialized = True
+
+
+def _middlewares_signature() -> List[List[Any]]:
+    """middlewares 目录下 .py/.yaml 文件的 (相对路径, mtime, 大小)，目录不存在时为空"""
+    signature = []
+    for root, dirs, files in os.walk(MIDDLEWARES_DIR):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for file_name in sorted(files):
+            if file_name.endswith((".py", ".yaml", ".yml")):
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature.append([os.path.relpath(path, MIDDLEWARES_DIR), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def _read_manifest(signature: List[List[Any]]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(MIDDLEWARE_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("signature") != signature:
+        return None
+    return manifest
+
+
+def _write_manifest(signature: List[List[Any]], configs: List[MiddlewareConfig], config: Dict[str, Any]):
+    entries = [{
+        "module": item.middleware.__module__,
+        "attr": item.middleware.__name__,
+        "name": item.name,
+        "enabled": item.enabled,
+        "priority": item.priority,
+        "options": item.options,
+        "match": item.match.model_dump(),
+    } for item in configs]
+    manifest = {"signature": signature, "middlewares": entries, "config": config}
+    tmp_path = f"{MIDDLEWARE_MANIFEST_PATH}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(MIDDLEWARE_MANIFEST_PATH), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        # 多个 worker 同时写时保证读到的是完整文件
+        os.replace(tmp_path, MIDDLEWARE_MANIFEST_PATH)
+    except (OSError, TypeError, ValueError):
+        # options 中有无法序列化的值时不缓存，下次照常扫描
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _register_from_manifest(entries: List[Dict[str, Any]]) -> bool:
+    """按 manifest 导入并注册中间件，任一条目失效时返回 False 以回退到完整扫描"""
+    resolved = []
+    for entry in entries:
+        try:
+            func = getattr(import_module(entry["module"]), entry["attr"])
+        except Exception:
+            return False
+        resolved.append((func, entry))
+    for func, entry in resolved:
+        registry.register(func, name=entry["name"], enabled=entry["enabled"], priority=entry["priority"],
+                          options=entry["options"], match=entry["match"],
+                          options_validator=getattr(func, "middleware_config", {}).get("options_validator"))
+    return True
+
+
+def _profiling_requested() -> bool:
+    """aomaker run --profile-middlewares 写入 config 表，多进程的 worker 也能读到"""
+    try:
+        from aomaker.storage import config
+        return bool(config.get(PROFILING_CONFIG_KEY))
+    except Exception:
+        return False
 
 
 
@@ -0,0 +1,204 @@
+# --coding:utf-8--
+"""
+传输层重试中间件
+
+连接错误、超时以及可配置的状态码（默认 429/502/503/504）会被重试，间隔为带全抖动的指数退避，
+响应带有 Retry-After 时按服务端要求的时间等待。
+默认只重试幂等方法（GET/HEAD/OPTIONS/PUT/DELETE/TRACE），其他方法需要接口通过
+@router.post(path, retry=True) 显式开启；retry=False 则对该接口关闭重试。
+
+全局重试预算防止后端不可用时重试放大流量：每个原始请求为预算存入 budget_ratio 个令牌，
+每次重试消耗 1 个，预算耗尽时直接返回最后一次的结果。
+重试次数和因重试增加的耗时按接口写入统计，在 HTML 报告和 service 的 /latency 接口中展示。
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from aomaker.log import logger
+from aomaker.core.multipart import file_offsets, rewind_files
+from .cache_middleware import _http_date
+from .latency_middleware import recorder
+from .registry import RequestType, CallNext, ResponseType, middleware, registry
+
+MIDDLEWARE_NAME = "retry_middleware"
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+RETRYABLE_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+
+@dataclass(frozen=True)
+class RetryOptions:
+    """
+    重试中间件配置，在 middlewares.yaml 中设置：
+
+    retry_middleware:
+      options:
+        max_retries: 3               # 单个请求最多重试次数，0 表示不重试
+        statuses: [429, 502, 503, 504]
+        backoff_base: 0.1            # 第 n 次重试的等待上限为 backoff_base * 2^(n-1) 秒，实际等待在 [0, 上限] 内随机
+        backoff_max: 10              # 退避等待上限（秒）
+        respect_retry_after: true    # 响应带 Retry-After 时按其等待
+        max_retry_after: 30          # Retry-After 超过该秒数时不再重试
+        budget_ratio: 0.1            # 每个请求为重试预算存入的令牌数，即重试流量最多约为正常流量的 10%
+        budget_min: 10               # 预算初始及上限令牌数，保证低流量时也能重试
+    """
+    max_retries: int = 0
+    statuses: Tuple[int, ...] = (429, 502, 503, 504)
+    backoff_base: float = 0.1
+    backoff_max: float = 10.0
+    respect_retry_after: bool = True
+    max_retry_after: float = 30.0
+    budget_ratio: float = 0.1
+    budget_min: int = 10
+
+    def __post_init__(self):
+        if self.max_retries < 0:
+            raise ValueError(f"max_retries 不能为负数: {self.max_retries}")
+        if self.backoff_base < 0 or self.backoff_max < 0 or self.max_retry_after < 0:
+            raise ValueError(f"退避时间不能为负数: {self}")
+        if self.budget_ratio < 0 or self.budget_min < 0:
+            raise ValueError(f"重试预算不能为负数: {self}")
+        object.__setattr__(self, "statuses", tuple(int(status) for status in self.statuses))
+
+    @classmethod
+    def from_dict(cls, options: Dict[str, Any]) -> "RetryOptions":
+        known = {f.name for f in fields(cls)}
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"重试中间件不支持的配置项: {sorted(unknown)}，可选: {sorted(known)}")
+        return cls(**options)
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（全抖动）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """令牌桶形式的重试预算，所有线程共享"""
+
+    def __init__(self, ratio: float = 0.1, minimum: int = 10):
+        self.ratio = ratio
+        self.minimum = minimum
+        self._lock = threading.Lock()
+        self._tokens = float(minimum)
+        self.exhausted = 0
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, float(self.minimum))
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def reset(self, ratio: float, minimum: int):
+        with self._lock:
+            self.ratio = ratio
+            self.minimum = minimum
+            self._tokens = float(minimum)
+            self.exhausted = 0
+
+
+def parse_retry_after(value: Optional[str], now: float) -> Optional[float]:
+    """Retry-After 为秒数或 HTTP 日期，返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    at = _http_date(value)
+    if at is None:
+        return None
+    return max(at - now, 0.0)
+
+
+def _retry_allowed(request: RequestType) -> bool:
+    endpoint_retry = (request.get("_api_meta") or {}).get("retry")
+    if endpoint_retry is not None:
+        return bool(endpoint_retry)
+    return str(request.get("method", "")).upper() in IDEMPOTENT_METHODS
+
+
+budget = RetryBudget()
+_UNRESOLVED = object()
+_resolved: Dict[str, Any] = {"source": _UNRESOLVED, "options": RetryOptions()}
+
+
+def validate_retry_options(options: Dict[str, Any]) -> RetryOptions:
+    """加载 middlewares.yaml 时校验重试中间件配置"""
+    return RetryOptions.from_dict(options)
+
+
+def get_retry_options() -> RetryOptions:
+    """读取当前生效的重试配置，配置变化时重置重试预算"""
+    config = registry.middleware_configs.get(MIDDLEWARE_NAME)
+    source = config.options if config is not None else None
+    if source is not _resolved["source"]:
+        options = RetryOptions.from_dict(source or {})
+        budget.reset(options.budget_ratio, options.budget_min)
+        _resolved["options"] = options
+        _resolved["source"] = source
+    return _resolved["options"]
+
+
+def _delay_for(options: RetryOptions, attempt: int, response: ResponseType) -> Optional[float]:
+    """下一次重试前的等待秒数；返回 None 表示服务端要求的等待过长，放弃重试"""
+    if options.respect_retry_after:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"), time.time())
+        if retry_after is not None:
+            return retry_after if retry_after <= options.max_retry_after else None
+    return options.backoff(attempt)
+
+
+@middleware(name=MIDDLEWARE_NAME, priority=300, options_validator=validate_retry_options)
+def retry_middleware(request: RequestType, call_next: CallNext) -> ResponseType:
+    """连接错误和指定状态码按退避策略重试"""
+    options = get_retry_options()
+    if not options.max_retries or request.get("stream") or not _retry_allowed(request):
+        return call_next(request)
+
+    budget.deposit()
+    api_meta = request.get("_api_meta") or {}
+    # 上传的文件在每次发送前回到第一次发送前的位置
+    offsets = file_offsets(request.get("files"))
+    attempt = 0
+    start = attempt_start = time.perf_counter()
+    try:
+        while True:
+            rewind_files(offsets)
+            try:
+                # 内层会修改请求（如移除 _api_meta），每次发送独立的副本
+                response = call_next(dict(request))
+            except RETRYABLE_EXCEPTIONS as e:
+                if attempt >= options.max_retries or not budget.withdraw():
+                    raise
+                delay = options.backoff(attempt + 1)
+                reason = type(e).__name__
+            else:
+                if response.status_code not in options.statuses or attempt >= options.max_retries:
+                    return response
+                delay = _delay_for(options, attempt + 1, response)
+                if delay is None or not budget.withdraw():
+                    return response
+                reason = f"status {response.status_code}"
+            attempt += 1
+            logger.warning(f"{api_meta.get('class_name') or request.get('url')} 第{attempt}次重试（{reason}），"
+                           f"等待 {delay:.3f}s")
+            time.sleep(delay)
+            attempt_start = time.perf_counter()
+    finally:
+        if attempt:
+            # 重试增加的耗时：从第一次发送到最后一次发送开始
+            added_ms = (attempt_start - start) * 1000
+            api_meta["retries"] = attempt
+            api_meta["retry_delay_ms"] = round(added_ms, 3)
+            api_name = api_meta.get("class_name") or api_meta.get("route") or request.get("url", "")
+            recorder.record_retry(api_name, attempt, added_ms)
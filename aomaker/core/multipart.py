@@ -0,0 +1,236 @@
+# --coding:utf-8--
+"""
+流式 multipart/form-data 编码
+
+requests 处理 files 参数时会把整个 multipart 请求体拼接在内存中，上传大文件时 worker 内存随文件大小增长。
+MultipartEncoder 只在发送时按块生成请求体：
+
+- 文件对象和 pathlib.Path 按块读取，较大的普通文件通过 mmap 映射后按切片发送；
+- 请求体总长度预先计算，以 Content-Length 发送，不使用 chunked 编码；
+- 每发送一块调用一次 progress(已发送字节数, 总字节数)；
+- 同一个编码器重新迭代时文件回到初始位置；重试时每次发送都新建编码器，
+  由 retry_middleware 通过 file_offsets/rewind_files 把文件恢复到第一次发送前的位置。
+
+files 的写法与 requests 一致：{name: fileobj} 或 {name: (filename, fileobj|bytes|str, content_type, headers)}，
+也可以是 (name, value) 元组的列表。
+"""
+import io
+import mmap
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# 小于该大小的文件直接按块读取，mmap 的开销不划算
+MMAP_THRESHOLD = 1024 * 1024
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _items(value: Union[Dict[str, Any], List[Tuple[str, Any]], None]) -> List[Tuple[str, Any]]:
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return list(value.items())
+    return list(value)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "%0D").replace("\n", "%0A")
+
+
+class _Part:
+    """一个表单字段：头部 + 内容（bytes 或可 seek 的二进制文件）"""
+
+    def __init__(self, headers: bytes, content: Union[bytes, io.IOBase], size: int):
+        self.headers = headers
+        self.content = content
+        self.size = size
+        self.start = content.tell() if not isinstance(content, bytes) else 0
+
+    def iter_content(self, chunk_size: int) -> Iterator[Union[bytes, memoryview]]:
+        if isinstance(self.content, bytes):
+            for offset in range(0, len(self.content), chunk_size):
+                yield self.content[offset:offset + chunk_size]
+            return
+        self.content.seek(self.start)
+        if self.size >= MMAP_THRESHOLD and _has_fileno(self.content):
+            yield from self._iter_mmap(chunk_size)
+            return
+        remaining = self.size
+        while remaining > 0:
+            chunk = self.content.read(min(chunk_size, remaining))
+            if not chunk:
+                raise IOError(f"上传过程中文件被截断: {getattr(self.content, 'name', self.content)}")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _iter_mmap(self, chunk_size: int) -> Iterator[memoryview]:
+        # mmap 的 offset 必须按页对齐，从对齐位置映射后跳过前面的字节
+        aligned = self.start - self.start % mmap.ALLOCATIONGRANULARITY
+        skip = self.start - aligned
+        with mmap.mmap(self.content.fileno(), skip + self.size, access=mmap.ACCESS_READ, offset=aligned) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(skip, skip + self.size, chunk_size):
+                    chunk = view[offset:min(offset + chunk_size, skip + self.size)]
+                    try:
+                        yield chunk
+                    finally:
+                        # 消费方在取下一块前已发送完当前块，释放切片后 mmap 才能关闭
+                        chunk.release()
+            finally:
+                view.release()
+
+
+def file_offsets(files: Union[Dict[str, Any], List[Tuple[str, Any]], None]) -> List[Tuple[Any, int]]:
+    """
+    记录 files 中文件对象的当前位置
+
+    每次发送都会新建 MultipartEncoder，并以文件对象的当前位置作为起点；
+    重试前需用 rewind_files 恢复到第一次发送前的位置，否则重发的文件内容为空或被截断。
+    """
+    offsets = []
+    for _, value in _items(files):
+        if isinstance(value, (tuple, list)):
+            value = value[1] if len(value) > 1 else None
+        if hasattr(value, "seek") and hasattr(value, "tell"):
+            offsets.append((value, value.tell()))
+    return offsets
+
+
+def rewind_files(offsets: List[Tuple[Any, int]]):
+    for fileobj, offset in offsets:
+        fileobj.seek(offset)
+
+
+def _guess_filename(fileobj) -> Optional[str]:
+    name = getattr(fileobj, "name", None)
+    if isinstance(name, str) and not (name.startswith("<") and name.endswith(">")):
+        return os.path.basename(name)
+    return None
+
+
+def _has_fileno(fileobj) -> bool:
+    try:
+        fileobj.fileno()
+        return True
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+
+def _binary_size(fileobj) -> int:
+    """从当前位置到文件末尾的字节数"""
+    if _has_fileno(fileobj):
+        return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+    position = fileobj.tell()
+    end = fileobj.seek(0, io.SEEK_END)
+    fileobj.seek(position)
+    return end - position
+
+
+class MultipartEncoder:
+    """
+    按需生成 multipart/form-data 请求体，可作为 requests 的 data 参数
+
+    requests 通过 len() 得到 Content-Length，urllib3 迭代编码器逐块发送，
+    同一时刻内存中最多只有一个块（mmap 切片不复制数据）。
+    """
+
+    def __init__(self,
+                 files: Union[Dict[str, Any], List[Tuple[str, Any]], None] = None,
+                 fields: Union[Dict[str, Any], List[Tuple[str, Any]], None] = None,
+                 boundary: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 progress: Optional[ProgressCallback] = None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._opened: List[io.IOBase] = []
+        self._parts: List[_Part] = []
+        for name, value in _items(fields):
+            self._add_field(name, value)
+        for name, value in _items(files):
+            self._add_file(name, value)
+        self._closing = f"--{self.boundary}--\r\n".encode()
+        self.len = sum(len(part.headers) + part.size + 2 for part in self._parts) + len(self._closing)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self.len
+
+    def _part_headers(self, name: str, filename: Optional[str] = None, content_type: Optional[str] = None,
+                      extra: Optional[Dict[str, str]] = None) -> bytes:
+        disposition = f'form-data; name="{_quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_quote(filename)}"'
+        lines = [f"--{self.boundary}", f"Content-Disposition: {disposition}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        lines.extend(f"{key}: {value}" for key, value in (extra or {}).items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+    def _add_field(self, name: str, value: Any):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if item is None:
+                continue
+            content = item if isinstance(item, bytes) else str(item).encode("utf-8")
+            self._parts.append(_Part(self._part_headers(name), content, len(content)))
+
+    def _add_file(self, name: str, value: Any):
+        filename, content_type, extra = None, None, None
+        if isinstance(value, (tuple, list)):
+            spec = tuple(value) + (None,) * (4 - len(value))
+            filename, value, content_type, extra = spec[:4]
+        if isinstance(value, Path):
+            # 文件路径：由编码器打开，close() 时关闭
+            if filename is None:
+                filename = value.name
+            value = open(value, "rb")
+            self._opened.append(value)
+        if filename is None:
+            filename = _guess_filename(value) or name
+
+        if isinstance(value, str):
+            content = value.encode("utf-8")
+        elif isinstance(value, (bytes, bytearray)):
+            content = bytes(value)
+        elif isinstance(value, io.TextIOBase) or "b" not in getattr(value, "mode", "b"):
+            # 文本模式打开的文件无法按字节预先计算长度，读出后按 utf-8 编码
+            content = value.read().encode("utf-8")
+        else:
+            content = value
+        size = len(content) if isinstance(content, bytes) else _binary_size(content)
+        self._parts.append(_Part(self._part_headers(name, filename, content_type, extra), content, size))
+
+    def __iter__(self) -> Iterator[Union[bytes, memoryview]]:
+        """完整地生成一次请求体；每次迭代都从头开始"""
+        sent = 0
+        for chunk in self._iter_chunks():
+            sent += len(chunk)
+            yield chunk
+            if self.progress is not None:
+                self.progress(sent, self.len)
+
+    def _iter_chunks(self) -> Iterator[Union[bytes, memoryview]]:
+        for part in self._parts:
+            yield part.headers
+            yield from part.iter_content(self.chunk_size)
+            yield b"\r\n"
+        yield self._closing
+
+    def to_bytes(self) -> bytes:
+        return b"".join(bytes(chunk) for chunk in self._iter_chunks())
+
+    def close(self):
+        for fileobj in self._opened:
+            fileobj.close()
+        self._opened.clear()
+
+    def __repr__(self):
+        return f"<MultipartEncoder parts={len(self._parts)} len={self.len}>"
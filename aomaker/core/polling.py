@@ -0,0 +1,159 @@
+# --coding:utf-8--
+"""
+异步任务轮询
+
+wait_until(api_obj, condition) 反复发送 api_obj，直到响应中 condition.expr 取到的值等于 condition.expected_value：
+
+- expr 在开始轮询前编译一次（见 extractor.compile_jsonpath），每次轮询只做遍历；
+- 轮询间隔从 initial_interval 开始按 backoff 倍数增长到 max_interval，刚提交的任务能很快拿到结果，
+  长任务也不会被频繁请求；
+- 超过 timeout 仍未满足条件时抛出 WaitTimeoutError；
+- 所有轮询由一个调度线程统一计时，到期的请求交给共享线程池发送，等待期间不占用线程。
+  poller.submit() 返回 Future，可以先提交多个任务再统一等待。
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Union
+
+from aomaker.exceptions import WaitTimeoutError
+from aomaker.models import ExecuteAsyncJobCondition
+from .extractor import compile_jsonpath
+
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_INITIAL_INTERVAL = 0.2
+DEFAULT_MAX_INTERVAL = 5.0
+DEFAULT_BACKOFF = 1.5
+DEFAULT_MAX_WORKERS = 8
+
+class _PollTask:
+    def __init__(self, api_obj, condition: ExecuteAsyncJobCondition, timeout: float,
+                 initial_interval: float, max_interval: float, backoff: float):
+        self.api_obj = api_obj
+        self.condition = condition
+        self.path = compile_jsonpath(condition.expr)
+        self.deadline = time.monotonic() + timeout
+        self.timeout = timeout
+        self.interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.future: Future = Future()
+        self.started = False
+        self.attempts = 0
+        self.last_value: Any = None
+        self.last_response = None
+
+    def poll(self) -> bool:
+        self.attempts += 1
+        # 轮询时不做响应模型结构化，满足条件后只结构化最后一次响应
+        self.last_response = self.api_obj.send(structure=False)
+        values = self.path.find(self.last_response.cached_response.json())
+        self.last_value = values[0] if values else None
+        return bool(values) and values[0] == self.condition.expected_value
+
+    def next_interval(self) -> float:
+        interval = self.interval
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+        return interval
+
+    def result(self):
+        return self.api_obj._handle_response(self.last_response.cached_response)
+
+
+class JobPoller:
+    """多个轮询任务共用一个调度线程和一个发送线程池"""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, api_obj, condition: Union[ExecuteAsyncJobCondition, Dict[str, Any]],
+               timeout: float = DEFAULT_TIMEOUT,
+               initial_interval: float = DEFAULT_INITIAL_INTERVAL,
+               max_interval: float = DEFAULT_MAX_INTERVAL,
+               backoff: float = DEFAULT_BACKOFF) -> Future:
+        """提交一个轮询任务，Future 的结果为满足条件的那次响应（AoResponse）"""
+        if isinstance(condition, dict):
+            condition = ExecuteAsyncJobCondition(**condition)
+        if timeout <= 0 or initial_interval <= 0 or max_interval < initial_interval or backoff < 1:
+            raise ValueError("timeout/initial_interval 必须大于 0，max_interval 不能小于 initial_interval，"
+                             "backoff 不能小于 1")
+        task = _PollTask(api_obj, condition, timeout, initial_interval, max_interval, backoff)
+        # 第一次立即发送
+        self._schedule(task, time.monotonic())
+        return task.future
+
+    def _schedule(self, task: _PollTask, at: float):
+        with self._cond:
+            heapq.heappush(self._heap, (at, next(self._seq), task))
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="aomaker-poll")
+                self._thread = threading.Thread(target=self._run, name="aomaker-poll-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                _, _, task = heapq.heappop(self._heap)
+            self._executor.submit(self._poll, task)
+
+    def _poll(self, task: _PollTask):
+        if not task.started:
+            task.started = True
+            if not task.future.set_running_or_notify_cancel():
+                return
+        try:
+            if task.poll():
+                task.future.set_result(task.result())
+                return
+        except BaseException as e:
+            task.future.set_exception(e)
+            return
+        now = time.monotonic()
+        if now >= task.deadline:
+            task.future.set_exception(WaitTimeoutError(task.condition.expr, task.condition.expected_value,
+                                                       task.last_value, task.timeout, task.attempts))
+            return
+        # 最后一次轮询对齐到截止时间，避免超时判断被退避间隔拖后
+        self._schedule(task, min(now + task.next_interval(), task.deadline))
+
+
+poller = JobPoller()
+
+
+def wait_until(api_obj, condition: Union[ExecuteAsyncJobCondition, Dict[str, Any]],
+               timeout: float = DEFAULT_TIMEOUT,
+               initial_interval: float = DEFAULT_INITIAL_INTERVAL,
+               max_interval: float = DEFAULT_MAX_INTERVAL,
+               backoff: float = DEFAULT_BACKOFF):
+    """
+    轮询 api_obj 直到满足条件
+
+    Args:
+        api_obj: 查询任务状态的接口对象，每次轮询调用其 send()
+        condition: ExecuteAsyncJobCondition 或 {"expr": ..., "expected_value": ...}
+        timeout: 总超时时间（秒）
+        initial_interval: 第一次与第二次轮询之间的间隔（秒）
+        max_interval: 轮询间隔上限（秒）
+        backoff: 每次轮询后间隔的增长倍数
+
+    Returns:
+        满足条件的那次响应（AoResponse）
+
+    Raises:
+        WaitTimeoutError: 超时仍未满足条件
+    """
+    return poller.submit(api_obj, condition, timeout=timeout, initial_interval=initial_interval,
+                         max_interval=max_interval, backoff=backoff).result()
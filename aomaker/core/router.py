@@ -14,6 +14,11 @@ class APIRouter:
                 route=path,
                 method=method,
                 route_params=route_params,
+                tags=tuple(kwargs.get("tags") or ()),
+                cache=kwargs.get("cache", False),
+                coalesce=kwargs.get("coalesce", False),
+                retry=kwargs.get("retry"),
+                compress=kwargs.get("compress"),
             )
 
             setattr(cls, '_endpoint_config', endpoint_config)
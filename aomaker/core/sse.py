@@ -0,0 +1,140 @@
+# --coding:utf-8--
+"""
+Server-Sent Events（text/event-stream）增量解析
+
+按 WHATWG HTML 规范解析事件流：
+- 行以 \\r\\n、\\r 或 \\n 结尾，块边界落在 \\r\\n 中间时不会多出空行；
+- 以 ':' 开头的行是注释；字段名与值以第一个 ':' 分隔，值开头的一个空格会被去掉；
+- 空行分发当前事件，data 为空的事件不分发；多行 data 以 \\n 拼接；
+- id 在后续事件中保持（包含 \\0 的 id 被忽略），retry 仅接受纯数字；
+- 流结束时未以空行结尾的事件被丢弃。
+
+解析器只保存未完成的一行和当前事件的 data 行，两者总长超过 max_buffer_size 时抛出 ValueError，
+避免异常的服务端让内存无限增长。
+"""
+import codecs
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Union
+
+from attrs import define
+
+Chunk = Union[bytes, bytearray, str]
+
+DEFAULT_MAX_BUFFER_SIZE = 1024 * 1024
+_LINE_END = re.compile(r"\r\n|\r|\n")
+
+
+@define(frozen=True, slots=True)
+class ServerSentEvent:
+    """一个已分发的事件；data 为原始文本，或按需解析/结构化后的对象"""
+    data: object
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+
+class SSEParser:
+    """
+    push 模式的事件流解析器
+
+    Usage:
+        parser = SSEParser()
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self, encoding: str = "utf-8", max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE):
+        # 规范要求忽略流开头的 BOM
+        if codecs.lookup(encoding).name == "utf-8":
+            encoding = "utf-8-sig"
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.max_buffer_size = max_buffer_size
+        self._pending = ""
+        self._event = ""
+        self._data: List[str] = []
+        self._data_size = 0
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, data: Chunk) -> List[ServerSentEvent]:
+        """喂入一个数据块，返回本次能够完整分发的事件"""
+        if isinstance(data, (bytes, bytearray)):
+            data = self._decoder.decode(data)
+        if not data:
+            return []
+        text = self._pending + data
+        # 结尾的 \r 可能是 \r\n 的前半部分，留到下一块再判断
+        hold = "\r" if text[-1] == "\r" else ""
+        lines = _LINE_END.split(text[:-1] if hold else text)
+        self._pending = lines.pop() + hold
+
+        events: List[ServerSentEvent] = []
+        for line in lines:
+            self._process_line(line, events)
+        if len(self._pending) + self._data_size > self.max_buffer_size:
+            raise ValueError(f"SSE 事件超过缓冲上限 {self.max_buffer_size} 字符")
+        return events
+
+    def close(self) -> List[ServerSentEvent]:
+        """标记数据结束；未以空行结尾的事件按规范丢弃"""
+        tail = self._decoder.decode(b"", final=True)
+        pending = self._pending + tail
+        events: List[ServerSentEvent] = []
+        for line in _LINE_END.split(pending)[:-1]:
+            self._process_line(line, events)
+        self._pending = ""
+        self._reset()
+        return events
+
+    def _reset(self):
+        self._event = ""
+        self._data = []
+        self._data_size = 0
+
+    def _process_line(self, line: str, events: List[ServerSentEvent]):
+        if not line:
+            data = "\n".join(self._data)
+            # 按规范，数据为空（包括只有一行空的 data:）时不分发事件
+            if data:
+                events.append(ServerSentEvent(data=data, event=self._event or "message",
+                                              id=self.last_event_id, retry=self.retry))
+            self._reset()
+            return
+        if line[0] == ":":
+            return
+        name, sep, value = line.partition(":")
+        if sep and value[:1] == " ":
+            value = value[1:]
+        if name == "data":
+            self._data.append(value)
+            self._data_size += len(value) + 1
+        elif name == "event":
+            self._event = value
+        elif name == "id":
+            if "\0" not in value:
+                self.last_event_id = value
+        elif name == "retry":
+            if value.isascii() and value.isdigit():
+                self.retry = int(value)
+
+
+def iter_sse_events(chunks: Iterable[Chunk], encoding: str = "utf-8",
+                    max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE) -> Iterator[ServerSentEvent]:
+    """从同步数据块迭代器中逐个产出事件；按需拉取数据块，不预读"""
+    parser = SSEParser(encoding=encoding, max_buffer_size=max_buffer_size)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_sse_events(chunks: AsyncIterable[Chunk], encoding: str = "utf-8",
+                           max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE) -> AsyncIterator[ServerSentEvent]:
+    """从异步数据块迭代器中逐个产出事件"""
+    parser = SSEParser(encoding=encoding, max_buffer_size=max_buffer_size)
+    async for chunk in chunks:
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
@@ -0,0 +1,166 @@
+# --coding:utf-8--
+"""
+请求分阶段计时
+
+requests 的 response.elapsed 只统计到收到响应头为止，无法区分是客户端频繁建连还是服务端慢。
+TimingAdapter 替换 urllib3 的连接类，在一次请求内分别记录：
+
+- dns_ms: 域名解析
+- connect_ms: TCP 建连
+- tls_ms: TLS 握手（经 HTTPS 代理隧道时包含建立隧道的耗时）
+- ttfb_ms: 连接就绪后，从发出请求到收到响应头
+- download_ms: 读取响应体；流式响应（stream=True）由调用方边读边处理，不记录
+- reused: 是否复用了连接池中的连接，复用时 dns/connect/tls 均为 None
+
+计时结果挂在 requests.Response.timing 上，通过 CachedResponse.timing 读取。
+域名解析经过进程内 DNS 缓存（见 aomaker.core.dns_cache），命中缓存时 dns_ms 接近 0。
+"""
+import socket
+import threading
+import time
+from typing import Optional
+
+import requests
+from attrs import define
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from .dns_cache import dns_cache
+
+PHASES = ("dns", "connect", "tls", "ttfb", "download")
+
+_local = threading.local()
+
+
+@define(slots=True)
+class RequestTiming:
+    dns_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None
+    download_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    reused: bool = True
+
+    def phases(self) -> dict:
+        """{阶段: 毫秒}，只包含本次请求实际经历的阶段"""
+        result = {}
+        for phase in PHASES:
+            value = getattr(self, f"{phase}_ms")
+            if value is not None:
+                result[phase] = value
+        return result
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """当前线程正在发送的请求的计时对象，不在 TimingAdapter 发送过程中时返回 None"""
+    return getattr(_local, "timing", None)
+
+
+def _ms(start: float, end: float) -> float:
+    return (end - start) * 1000
+
+
+class _TimedConnectionMixin:
+    """
+    先单独解析域名，再逐个地址建连，分别计时
+
+    不在计时请求中（如连接预热）且未开启 DNS 缓存时保持 urllib3 原有行为
+    """
+
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None and not dns_cache.enabled:
+            return super()._new_conn()
+
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = dns_cache.resolve(host, self.port)
+        except socket.gaierror:
+            # 交给 urllib3 再解析一次，抛出它原有的异常类型
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        if timing is not None:
+            timing.reused = False
+            timing.dns_ms = _ms(start, resolved)
+
+        try:
+            for index, address in enumerate(addresses):
+                # _dns_host 只用于建连，TLS 的 SNI 和证书校验仍使用原域名
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+            if timing is not None:
+                timing.connect_ms = _ms(resolved, time.perf_counter())
+
+    def connect(self):
+        timing = current_timing()
+        start = time.perf_counter()
+        super().connect()
+        if timing is not None and isinstance(self, HTTPSConnection) and timing.connect_ms is not None:
+            timing.tls_ms = max(_ms(start, time.perf_counter()) - (timing.dns_ms or 0) - timing.connect_ms, 0.0)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+_POOL_CLASSES = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+class TimingAdapter(HTTPAdapter):
+    """记录分阶段耗时的传输适配器，挂载方式与 HTTPAdapter 相同"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = _POOL_CLASSES
+        return manager
+
+    def send(self, request, stream=False, **kwargs) -> requests.Response:
+        timing = _local.timing = RequestTiming()
+        start = time.perf_counter()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+        finally:
+            _local.timing = None
+        headers_at = time.perf_counter()
+        setup_ms = (timing.dns_ms or 0) + (timing.connect_ms or 0) + (timing.tls_ms or 0)
+        timing.ttfb_ms = max(_ms(start, headers_at) - setup_ms, 0.0)
+        if not stream:
+            # Session 随后读取 content 时直接使用已读取的内容
+            response.content
+            timing.download_ms = _ms(headers_at, time.perf_counter())
+        timing.total_ms = _ms(start, time.perf_counter())
+        response.timing = timing
+        return response
+
+
+def mount_timing_adapter(session: requests.Session) -> requests.Session:
+    adapter = TimingAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
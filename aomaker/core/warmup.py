@@ -0,0 +1,194 @@
+# --coding:utf-8--
+"""
+连接预热
+
+测试开始时各 worker 同时发出第一批请求，每个请求都要完整地建连和 TLS 握手，
+既拉高了首批请求的延迟统计，也容易触发服务端的连接数限制。
+在环境配置（conf/config.yaml）中开启后，每个 worker 在 pytest 会话开始时
+（Session.set_session_vars 登录完成之后）向 base_url 及额外配置的地址预先建立若干条
+keep-alive 连接（HTTPS 完成 TLS 握手）放入连接池，后续请求直接复用：
+
+mock:
+  base_url: 'http://127.0.0.1:9999'
+  warmup:
+    connections: 4        # 每个地址预建的连接数，不超过连接池大小（默认 10）；0 表示不预热
+    hosts: []             # base_url 之外需要预热的地址，如 https://auth.example.com
+    dns_ttl: 0            # 进程内 DNS 缓存秒数，默认 0 不缓存；与 connections 相互独立
+    timeout: 5            # 单条连接的建连超时（秒）
+
+预热失败只记录告警，不影响测试执行。
+预建连接通过 urllib3 连接池的私有方法 _get_conn / _put_conn 放入连接池（urllib3 1.x、2.x 均提供），
+当前 urllib3 不提供时跳过预热。
+"""
+import os
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from urllib3.util.wait import wait_for_read
+
+from aomaker.log import logger
+from .dns_cache import dns_cache
+
+WARMUP_CONFIG_KEY = "warmup"
+# 等待 TLS 1.3 服务端在握手后发送 session ticket 的时间（秒）
+TICKET_WAIT = 0.1
+
+
+@dataclass(frozen=True)
+class WarmupOptions:
+    connections: int = 0
+    hosts: Tuple[str, ...] = ()
+    dns_ttl: float = 0
+    timeout: float = 5
+
+    def __post_init__(self):
+        if self.connections < 0:
+            raise ValueError(f"connections 不能为负数: {self.connections}")
+        if self.dns_ttl < 0:
+            raise ValueError(f"dns_ttl 不能为负数: {self.dns_ttl}")
+        if self.timeout <= 0:
+            raise ValueError(f"timeout 必须大于 0: {self.timeout}")
+        object.__setattr__(self, "hosts", tuple(self.hosts or ()))
+
+    @classmethod
+    def from_dict(cls, options: Dict[str, Any]) -> "WarmupOptions":
+        known = {f.name for f in fields(cls)}
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"连接预热不支持的配置项: {sorted(unknown)}，可选: {sorted(known)}")
+        return cls(**options)
+
+
+def _connection_pool(session: requests.Session, url: str):
+    """取得 session 发送该 url 时实际使用的连接池（包括代理和证书校验设置）"""
+    adapter = session.get_adapter(url)
+    settings = session.merge_environment_settings(url, {}, None, None, None)
+    verify, cert, proxies = settings["verify"], settings["cert"], settings["proxies"]
+    if hasattr(adapter, "get_connection_with_tls_context"):
+        request = requests.Request("GET", url).prepare()
+        pool = adapter.get_connection_with_tls_context(request, verify, proxies=proxies, cert=cert)
+    else:
+        pool = adapter.get_connection(url, proxies)
+    adapter.cert_verify(pool, url, verify, cert)
+    return pool
+
+
+def _drain_tickets(sock) -> bool:
+    """
+    读掉 TLS 1.3 握手后服务端发送的 session ticket
+
+    否则空闲连接上有可读数据，连接池取出时会把它当作已断开的连接丢弃。
+    连接被关闭或收到了应用数据时返回 False，这样的连接不能放回连接池。
+    """
+    if not isinstance(sock, ssl.SSLSocket):
+        return True
+    timeout = sock.gettimeout()
+    wait = TICKET_WAIT
+    try:
+        while wait_for_read(sock, timeout=wait):
+            sock.setblocking(False)
+            try:
+                sock.recv(1)
+                return False
+            except ssl.SSLWantReadError:
+                wait = 0.01
+            finally:
+                sock.settimeout(timeout)
+    except OSError:
+        return False
+    return True
+
+
+def _connect(conn, timeout: float) -> bool:
+    if getattr(conn, "sock", None) is not None:
+        return True
+    original = conn.timeout
+    # 请求复用连接时 urllib3 会按请求的超时重新设置
+    conn.timeout = timeout
+    try:
+        conn.connect()
+        if _drain_tickets(conn.sock):
+            return True
+        logger.warning(f"<AoMaker> 预热连接被服务端关闭: {conn.host}:{conn.port}")
+    except Exception as e:
+        logger.warning(f"<AoMaker> 预热连接失败: {conn.host}:{conn.port}, {type(e).__name__}: {e}")
+    finally:
+        conn.timeout = original
+    conn.close()
+    return False
+
+
+def warmup_host(session: requests.Session, url: str, connections: int, timeout: float = 5) -> int:
+    """向 url 所在地址预建 connections 条连接放回连接池，返回成功建立（或已存在）的连接数"""
+    pool = _connection_pool(session, url)
+    if not (hasattr(pool, "_get_conn") and hasattr(pool, "_put_conn")):
+        logger.warning(f"<AoMaker> 当前 urllib3 版本的连接池不支持预热，已跳过: {url}")
+        return 0
+    count = min(connections, pool.pool.maxsize if pool.pool is not None else 0)
+    conns = [pool._get_conn() for _ in range(count)]
+    try:
+        with ThreadPoolExecutor(max_workers=max(count, 1), thread_name_prefix="aomaker-warmup") as executor:
+            results = list(executor.map(lambda conn: _connect(conn, timeout), conns))
+    finally:
+        for conn in conns:
+            # 建连失败的连接放回空位，保持连接池容量不变
+            pool._put_conn(conn if getattr(conn, "sock", None) is not None else None)
+    return sum(results)
+
+
+def warmup_connections(session: requests.Session, base_url: Optional[str], options: WarmupOptions) -> Dict[str, int]:
+    """按配置预热 base_url 及 hosts，返回 {地址: 连接数}"""
+    # 只在配置了 dns_ttl 时开启进程内 DNS 缓存
+    if options.dns_ttl:
+        dns_cache.ttl = options.dns_ttl
+    urls = [url for url in (base_url, *options.hosts) if url]
+    opened = {}
+    if not options.connections:
+        return opened
+    for url in dict.fromkeys(urls):
+        try:
+            opened[url] = warmup_host(session, url, options.connections, options.timeout)
+        except Exception as e:
+            logger.warning(f"<AoMaker> 连接预热失败: {url}, {type(e).__name__}: {e}")
+    return opened
+
+
+_warmed_pid: Optional[int] = None
+_warmup_lock = threading.Lock()
+
+
+def warmup_http_client():
+    """
+    读取环境配置，对当前 worker 的 HTTPClient 预热连接
+
+    多线程模式下各线程共享同一个 HTTPClient，每个进程只预热一次，其他线程等待预热完成后再开始执行用例；
+    多进程模式下在各 worker 进程内执行，不会把父进程的连接带入子进程。
+    """
+    global _warmed_pid
+    with _warmup_lock:
+        if _warmed_pid == os.getpid():
+            return
+        _warmed_pid = os.getpid()
+        _warmup_http_client()
+
+
+def _warmup_http_client():
+    from aomaker.storage import config
+    raw = config.get(WARMUP_CONFIG_KEY)
+    if not raw:
+        return
+    try:
+        options = WarmupOptions.from_dict(raw)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"<AoMaker> 连接预热配置有误: {e}")
+        return
+
+    from .http_client import get_http_client
+    session = get_http_client().session
+    opened = warmup_connections(session, config.get("base_url"), options)
+    if opened:
+        logger.info(f"<AoMaker> 连接预热完成: {opened}")
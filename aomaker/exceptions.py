@@ -53,6 +53,19 @@ class HttpRequestError(AoMakerException):
         return f'请求失败，状态码：{self.status_code}'
 
 
+class WaitTimeoutError(AoMakerException):
+    def __init__(self, expr, expected_value, last_value, timeout, attempts):
+        self.expr = expr
+        self.expected_value = expected_value
+        self.last_value = last_value
+        self.timeout = timeout
+        self.attempts = attempts
+
+    def __str__(self):
+        return (f'等待超时（{self.timeout}s，共轮询{self.attempts}次）\n 取值表达式：{self.expr}\n'
+                f' 期望值：{self.expected_value}\n 最后一次取值：{self.last_value}')
+
+
 class JsonPathExtractFailed(AoMakerException):
     def __init__(self, res, jsonpath_expr):
         self.res = res
@@ -2,6 +2,9 @@
 import os
 import sys
 import logging
+import queue
+import threading
+import multiprocessing
 from loguru import logger as uru_logger
 
 from aomaker.path import LOG_DIR
@@ -12,6 +15,27 @@ flag = 0
 handler_id = 1
 file_log_handler_flag = 0
 allure_log_handler_flag = 0
+file_handler_id = None
+file_handler_level = Log.DEFAULT_LEVEL
+file_handler_path = log_path
+queue_handler_id = None
+aggregate_handler_id = None
+
+FILE_LOG_FORMAT = ("{time:YYYY-MM-DD HH:mm:ss} "
+                   "[{process.name}]-"
+                   "[{thread.name}]-"
+                   "[{module}.{function}:{line}]-[{level}]:{message}")
+# 多进程汇总时以 worker 名标记每条日志
+WORKER_LOG_FORMAT = ("{time:YYYY-MM-DD HH:mm:ss} "
+                     "[{extra[worker]}]-"
+                     "[{thread.name}]-"
+                     "[{module}.{function}:{line}]-[{level}]:{message}")
+LOG_ROTATION = "10 MB"
+
+
+def _not_aggregated(record) -> bool:
+    """汇总线程转发的日志只写入汇总文件，不再输出到控制台等其他 sink"""
+    return "aggregated" not in record["extra"]
 
 
 class AllureHandler(logging.Handler):
@@ -21,6 +45,10 @@ class AllureHandler(logging.Handler):
 
 class AoMakerLogger:
     logger = uru_logger
+    # sink -> levelno，避免每次查询都遍历 loguru 内部结构
+    _level_cache = {}
+    # loguru 每次 add/remove 都会整体替换 handlers 字典，字典变化时缓存失效
+    _cached_handlers = None
 
     # log level: TRACE < DEBUG < INFO < SUCCESS < WARNING < ERROR < CRITICAL
     def __init__(self, level: str = Log.DEFAULT_LEVEL, log_file_path=log_path):
@@ -39,6 +67,7 @@ class AoMakerLogger:
         self.logger.remove()
         h_id = self.logger.add(sys.stdout,
                                level=level.upper(),
+                               filter=_not_aggregated,
                                format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> "  # 颜色>时间
                                       "<m>[{process.name}]</m>-"  # 进程名
                                       "<m>[{thread.name}]</m>-"  # 进程名
@@ -53,16 +82,15 @@ class AoMakerLogger:
 
     def file_handler(self, level, log_file_path):
         """配置日志文件"""
-        global file_log_handler_flag
+        global file_log_handler_flag, file_handler_id, file_handler_level, file_handler_path
         # 控制只添加一个file_handler
         if file_log_handler_flag == 0:
-            self.logger.add(log_file_path, level=level.upper(),
-                                 format="{time:YYYY-MM-DD HH:mm:ss} "
-                                        "[{process.name}]-"
-                                        "[{thread.name}]-"
-                                        "[{module}.{function}:{line}]-[{level}]:{message}",
-                                 rotation="10 MB",
-                                 encoding="utf-8")
+            file_handler_id = self.logger.add(log_file_path, level=level.upper(),
+                                              format=FILE_LOG_FORMAT,
+                                              rotation=LOG_ROTATION,
+                                              encoding="utf-8")
+            file_handler_level = level
+            file_handler_path = log_file_path
             file_log_handler_flag += 1
 
     def allure_handler(self, level, is_processes=False):
@@ -75,25 +103,39 @@ class AoMakerLogger:
 
             self.logger.add(AllureHandler(),
                                  level=level.upper(),
+                                 filter=_not_aggregated,
                                  format=_format)
             allure_log_handler_flag += 1
 
     @classmethod
     def change_level(cls, level):
         """更改stdout_handler级别"""
+        global handler_id
         # 清除stdout_handler配置
         logger.remove(handler_id=handler_id)
         # 重新载入配置
-        cls.logger.add(sys.stdout,
-                       level=level.upper(),
-                       format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> "  # 颜色>时间
-                              "<m>[{process.name}]</m>-"  # 进程名
-                              "<m>[{thread.name}]</m>-"  # 进程名
-                              "<cyan>[{module}</cyan>.<cyan>{function}</cyan>"  # 模块名.方法名
-                              ":<cyan>{line}]</cyan>-"  # 行号
-                              "<level>[{level}]</level>: "  # 等级
-                              "<level>{message}</level>",  # 日志内容
-                       )
+        handler_id = cls.logger.add(sys.stdout,
+                                    level=level.upper(),
+                                    filter=_not_aggregated,
+                                    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> "  # 颜色>时间
+                                           "<m>[{process.name}]</m>-"  # 进程名
+                                           "<m>[{thread.name}]</m>-"  # 进程名
+                                           "<cyan>[{module}</cyan>.<cyan>{function}</cyan>"  # 模块名.方法名
+                                           ":<cyan>{line}]</cyan>-"  # 行号
+                                           "<level>[{level}]</level>: "  # 等级
+                                           "<level>{message}</level>",  # 日志内容
+                                    )
+        cls._sync_level_cache()
+        cls._level_cache["<stdout>"] = cls.logger.level(level.upper()).no
+
+    @classmethod
+    def _sync_level_cache(cls) -> dict:
+        """handler 有增删时清空级别缓存，返回当前的 handlers"""
+        handlers: dict = cls.logger.__dict__['_core'].__dict__['handlers']
+        if handlers is not cls._cached_handlers:
+            cls._level_cache.clear()
+            cls._cached_handlers = handlers
+        return handlers
 
     @classmethod
     def get_level(cls, sink="<stdout>") -> int:
@@ -110,11 +152,155 @@ class AoMakerLogger:
             40: error
             50: critical
         """
-        logger_handlers: dict = cls.logger.__dict__['_core'].__dict__['handlers']
+        logger_handlers = cls._sync_level_cache()
+        level = cls._level_cache.get(sink)
+        if level is not None:
+            return level
         for _, h_info in logger_handlers.items():
-            if h_info._name == sink:
+            # 文件 sink 在 loguru 中以路径的 repr 命名
+            if h_info._name in (sink, repr(sink)):
+                cls._level_cache[sink] = h_info._levelno
                 return h_info._levelno
 
+    @classmethod
+    def is_enabled(cls, level: int) -> bool:
+        """是否有任意 sink 会输出该级别的日志，用于在格式化日志前提前退出"""
+        min_level = getattr(cls.logger.__dict__['_core'], 'min_level', None)
+        return min_level is None or level >= min_level
+
+
+class QueueSink:
+    """把格式化后的日志发送到多进程队列，由父进程的 LogAggregator 统一写入"""
+
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+
+    def write(self, message):
+        self.log_queue.put(str(message))
+
+
+def install_queue_sink(log_queue, level: str = None, worker: str = None) -> int:
+    """
+    用队列 sink 替换当前进程直接写日志文件的 sink
+    父进程启动汇总时调用，worker 进程在初始化时调用
+    """
+    global file_handler_id, queue_handler_id
+    worker = worker or multiprocessing.current_process().name
+    uru_logger.configure(extra={"worker": worker})
+    if file_handler_id is not None:
+        uru_logger.remove(file_handler_id)
+        file_handler_id = None
+    if queue_handler_id is not None:
+        uru_logger.remove(queue_handler_id)
+    queue_handler_id = uru_logger.add(QueueSink(log_queue),
+                                      level=(level or file_handler_level).upper(),
+                                      format=WORKER_LOG_FORMAT,
+                                      filter=_not_aggregated)
+    return queue_handler_id
+
+
+def init_worker_logging(log_queue, per_worker_file: bool = False, log_dir: str = LOG_DIR):
+    """
+    多进程 worker 的日志初始化（作为进程池的 initializer）
+
+    per_worker_file: 额外为每个 worker 写一份独立的日志文件 logs/<worker>.log
+    """
+    global aggregate_handler_id
+    worker = multiprocessing.current_process().name
+    if aggregate_handler_id is not None:
+        # fork 出来的 worker 会继承父进程的汇总文件 sink，worker 中不需要
+        uru_logger.remove(aggregate_handler_id)
+        aggregate_handler_id = None
+    install_queue_sink(log_queue, worker=worker)
+    if per_worker_file:
+        uru_logger.add(os.path.join(log_dir, f"{worker}.log"),
+                       level=file_handler_level.upper(),
+                       format=WORKER_LOG_FORMAT,
+                       filter=_not_aggregated,
+                       rotation=LOG_ROTATION,
+                       encoding="utf-8")
+
+
+class LogAggregator:
+    """
+    多进程日志汇总
+
+    父进程持有唯一的日志文件 sink，各 worker 把格式化后的日志通过队列发给父进程，
+    父进程的监听线程批量取出并一次写入，避免多个进程同时写、同时滚动同一个日志文件。
+
+    Usage:
+        aggregator = LogAggregator()
+        aggregator.start()
+        with Pool(n, initializer=init_worker_logging, initargs=(aggregator.queue,)) as pool:
+            ...
+            pool.close()
+            pool.join()
+        aggregator.stop()
+    """
+
+    def __init__(self, log_file_path: str = log_path, batch_size: int = 500):
+        self.log_file_path = log_file_path
+        self.batch_size = batch_size
+        self.queue = multiprocessing.Queue()
+        self._thread = None
+        self._had_file_handler = False
+
+    def start(self):
+        global aggregate_handler_id
+        if self._thread is not None:
+            return
+        aggregate_handler_id = uru_logger.add(self.log_file_path,
+                                              level=0,
+                                              format="{message}",
+                                              filter=lambda record: record["extra"].get("aggregated", False),
+                                              rotation=LOG_ROTATION,
+                                              encoding="utf-8")
+        self._had_file_handler = file_handler_id is not None
+        install_queue_sink(self.queue)
+        self._thread = threading.Thread(target=self._listen, name="log-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """写完队列中剩余的日志，恢复父进程直接写文件的 sink"""
+        global queue_handler_id, aggregate_handler_id, file_handler_id
+        if self._thread is None:
+            return
+        if queue_handler_id is not None:
+            uru_logger.remove(queue_handler_id)
+            queue_handler_id = None
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if aggregate_handler_id is not None:
+            uru_logger.remove(aggregate_handler_id)
+            aggregate_handler_id = None
+        if self._had_file_handler:
+            file_handler_id = uru_logger.add(file_handler_path,
+                                             level=file_handler_level.upper(),
+                                             format=FILE_LOG_FORMAT,
+                                             rotation=LOG_ROTATION,
+                                             encoding="utf-8")
+
+    def _listen(self):
+        writer = uru_logger.bind(aggregated=True).opt(raw=True)
+        while True:
+            record = self.queue.get()
+            stopped = record is None
+            batch = [] if stopped else [record]
+            while not stopped and len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopped = True
+                else:
+                    batch.append(record)
+            if batch:
+                writer.log("INFO", "".join(batch))
+            if stopped:
+                return
+
 
 aomaker_logger = AoMakerLogger()
 logger = aomaker_logger.logger
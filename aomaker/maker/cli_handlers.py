@@ -18,6 +18,16 @@ from aomaker.maker.generator import Generator
 from aomaker._printer import print_message
 
 
+# aomaker.yaml 中 openapi 节点下可配置的模型生成选项
+MODEL_OPTION_KEYS = (
+    "compact_models",
+    "model_slots",
+    "model_frozen",
+    "model_weakref_slot",
+    "model_cache_hash",
+    "compact_arrays",
+)
+
 custom_theme = Theme({
     "primary": "#7B61FF",
     "secondary": "#00C7BE",
@@ -78,6 +88,7 @@ def _resolve_gen_models_config(
         "final_custom_strategy": final_custom_strategy,
         "final_base_api_class": base_api_class if base_api_class is not None else openapi_config.get('base_api_class'),
         "final_base_api_class_alias": base_api_class_alias if base_api_class_alias is not None else openapi_config.get('base_api_class_alias'),
+        "final_model_options": {k: openapi_config[k] for k in MODEL_OPTION_KEYS if openapi_config.get(k) is not None},
         "warnings": warnings
     }
 
@@ -144,6 +155,7 @@ def handle_gen_models(spec: Optional[str],
     final_base_api_class = final_config['final_base_api_class']
     final_base_api_class_alias = final_config['final_base_api_class_alias']
     final_custom_strategy = final_config['final_custom_strategy']
+    final_model_options = final_config.get('final_model_options', {})
 
     default_base = "aomaker.core.api_object.BaseAPIObject"
     console = Console(theme=custom_theme)
@@ -163,6 +175,8 @@ def handle_gen_models(spec: Optional[str],
     table.add_row("custom_strategy", cs)
     table.add_row("base_api_class", base)
     table.add_row("base_api_class_alias", alias)
+    for key, value in final_model_options.items():
+        table.add_row(key, str(value))
 
     console.print(table)
 
@@ -188,6 +202,7 @@ def handle_gen_models(spec: Optional[str],
         config_kwargs["base_api_class_alias"] = final_base_api_class_alias
     if final_custom_strategy:
         config_kwargs["custom_strategy"] = final_custom_strategy
+    config_kwargs.update(final_model_options)
 
     config = OpenAPIConfig(**config_kwargs)
 
@@ -130,8 +130,23 @@ class OpenAPIConfig:
     base_api_class: str = field(default="aomaker.core.api_object.BaseAPIObject")  # 默认基类路径
     base_api_class_alias: Optional[str] = field(default=None)  # 自定义别名
     custom_strategy: Optional[str] = field(default=None)  # 自定义命名策略路径
-   
+    # 生成模型类的 attrs 选项
+    model_slots: bool = field(default=True)  # 使用 __slots__，实例不再携带 __dict__
+    model_frozen: bool = field(default=False)  # 不可变实例
+    model_weakref_slot: bool = field(default=True)  # 保留 __weakref__ 槽位，关闭可为每个实例节省一个指针
+    model_cache_hash: bool = field(default=False)  # 缓存哈希值，仅 frozen 模型可用
+    compact_arrays: bool = field(default=False)  # List[int]/List[float] 字段以 array.array 存储
+    compact_models: bool = field(default=False)  # 一键开启紧凑模型：slots + 无 weakref 槽位 + compact_arrays
+
     def __attrs_post_init__(self):
+        if self.compact_models:
+            self.model_slots = True
+            self.model_weakref_slot = False
+            self.compact_arrays = True
+
+        if self.model_cache_hash and not self.model_frozen:
+            raise ValueError("model_cache_hash 需要同时开启 model_frozen")
+
         if self.custom_strategy:
             custom_func = load_custom_strategy(self.custom_strategy)
             if custom_func:
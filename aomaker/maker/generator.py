@@ -1,6 +1,6 @@
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Collection, Dict, List, Optional, Set
 
 import black
 from jinja2 import Environment, FileSystemLoader
@@ -10,6 +10,68 @@ from .parser import APIGroup, Endpoint
 from .config import OpenAPIConfig
 from .models import Import, DataModelField, DataModel, DataType, FileField
 
+COMPACT_ARRAY_MODULE = "aomaker.core.converters"
+# 基础类型列表元素类型 -> array 转换函数
+COMPACT_ARRAY_CONVERTERS = {
+    "int": "int_array",
+    "float": "float_array",
+}
+
+
+def _primitive_list_item_type(field: DataModelField):
+    """List[int] / List[float] 字段返回元素类型，其他字段返回 None"""
+    data_type = field.data_type
+    if not data_type.is_list or not data_type.data_types:
+        return None
+    return data_type.data_types[0].type_hint
+
+
+def _add_compact_array_imports(manager: "ImportManager", fields: List[DataModelField]):
+    converters = sorted({
+        COMPACT_ARRAY_CONVERTERS[item_type]
+        for field in fields
+        if (item_type := _primitive_list_item_type(field)) in COMPACT_ARRAY_CONVERTERS
+    })
+    if converters:
+        manager.add_import(Import(from_=COMPACT_ARRAY_MODULE, import_=", ".join(converters)))
+
+
+def _reachable_models(roots: List[DataModel], models: Dict[str, DataModel]) -> Set[str]:
+    """从 roots 出发，沿字段类型可达的模型名（包含 roots 中属于 models 的模型）"""
+    reachable = set()
+    stack = []
+
+    def visit(model: DataModel):
+        if model.name in models and model.name not in reachable:
+            reachable.add(model.name)
+            stack.append(models[model.name])
+
+    def walk_datatype(dt: DataType):
+        for child in dt.data_types or ():
+            walk_datatype(child)
+        if dt.is_custom_type and dt.type in models:
+            visit(models[dt.type])
+
+    for root in roots:
+        visit(root)
+        for f in root.fields:
+            walk_datatype(f.data_type)
+    while stack:
+        for f in stack.pop().fields:
+            walk_datatype(f.data_type)
+    return reachable
+
+
+def collect_compact_array_models(endpoints: List[Endpoint], models: Dict[str, DataModel]) -> Set[str]:
+    """
+    compact_arrays 生效的模型：从接口响应可达、且不会作为请求体发送的模型
+
+    请求体按原样序列化，请求体中用到的模型（包括与响应共用的模型）不转换为 array
+    """
+    responses = [endpoint.response for endpoint in endpoints if endpoint.response is not None]
+    request_bodies = [endpoint.request_body for endpoint in endpoints if endpoint.request_body is not None]
+    return _reachable_models(responses, models) - _reachable_models(request_bodies, models)
+
 
 class ImportManager:
     def __init__(self):
@@ -39,12 +101,19 @@ def collect_apis_imports(endpoints: List[Endpoint], config: OpenAPIConfig) -> Im
     for endpoint in endpoints:
         for imp in endpoint.imports:
             manager.add_import(imp)
+
     return manager
 
 
-def collect_models_imports(models: List[DataModel]) -> ImportManager:
+def collect_models_imports(models: List[DataModel], config: OpenAPIConfig = None,
+                           compact_models: Optional[Collection[str]] = None) -> ImportManager:
+    """compact_models 为 compact_arrays 生效的模型名，None 表示全部模型"""
     manager = ImportManager()
     manager.add_import(Import(from_="attrs", import_="define, field"))
+
+    if config is not None and config.compact_arrays:
+        _add_compact_array_imports(manager, [field for model in models for field in model.fields
+                                             if compact_models is None or model.name in compact_models])
     
     # 检查是否需要导入Optional
     needs_optional = False
@@ -81,9 +150,10 @@ def generate_imports(manager: ImportManager, exclude_internal: bool = False) ->
 
         alias = aliases.pop() if aliases else None
         module = from_ if from_ is not None else import_
+        package = module.split(".")[0]
         if module in stdlib_modules:
             category = "stdlib"
-        elif module in third_party_modules:
+        elif package in third_party_modules:
             category = "third_party"
         else:
             category = "internal"
@@ -118,8 +188,8 @@ def generate_imports(manager: ImportManager, exclude_internal: bool = False) ->
     return imports
 
 
-def _gen_models_imports(models: List[DataModel]) -> List[str]:
-    imports_manager = collect_models_imports(models)
+def _gen_models_imports(models: List[DataModel], config: OpenAPIConfig = None) -> List[str]:
+    imports_manager = collect_models_imports(models, config)
     imports = generate_imports(imports_manager, exclude_internal=True)
     return imports
 
@@ -260,6 +330,39 @@ class TemplateRenderUtils:
             return f"Optional[{base_hint}]"
         return base_hint
 
+    def render_define_args(self, kw_only: bool = False) -> str:
+        """生成 @define(...) 的参数，只输出与 attrs 默认值不同的选项"""
+        args = []
+        if kw_only:
+            args.append("kw_only=True")
+        if not self.config.model_slots:
+            args.append("slots=False")
+        if self.config.model_frozen:
+            args.append("frozen=True")
+        if not self.config.model_weakref_slot:
+            args.append("weakref_slot=False")
+        if self.config.model_cache_hash:
+            args.append("cache_hash=True")
+        return f"({', '.join(args)})" if args else ""
+
+    def render_field_converter(self, field: DataModelField) -> str:
+        """compact_arrays 开启时，响应模型中基础类型列表字段以 array 存储"""
+        if not self.config.compact_arrays:
+            return ""
+        converter = COMPACT_ARRAY_CONVERTERS.get(_primitive_list_item_type(field))
+        return f"converter={converter}" if converter else ""
+
+    def get_required_field_parameters(self, field: DataModelField, compact_arrays: bool = True) -> str:
+        """compact_arrays=False 用于请求参数模型，请求参数按原样序列化，不转换为 array"""
+        converter = self.render_field_converter(field) if compact_arrays else ""
+        params = [self.render_field_metadata(field), converter]
+        return ", ".join(p for p in params if p)
+
+    def get_optional_field_parameters(self, field: DataModelField, compact_arrays: bool = True) -> str:
+        converter = self.render_field_converter(field) if compact_arrays else ""
+        params = [self.get_attrs_field_parameters(field), converter]
+        return ", ".join(p for p in params if p)
+
     def get_base_class(self) -> str:
         _, _, class_name = self.config.base_api_class.rpartition(".")
         if self.config.base_api_class_alias:
@@ -327,8 +430,10 @@ class Generator:
         self.render_utils = TemplateRenderUtils(config=self.config)
         # 注册全局函数
         self.env.globals.update({
-            'get_attrs_field': self.render_utils.get_attrs_field_parameters,
+            'get_attrs_field': self.render_utils.get_optional_field_parameters,
+            'get_required_field': self.render_utils.get_required_field_parameters,
             'get_field_metadata': self.render_utils.render_field_metadata,
+            'get_define_args': self.render_utils.render_define_args,
             'render_optional_hint': self.render_utils.render_optional_hint,
             'get_base_class': self.render_utils.get_base_class,
             'get_all_api_class_name': self.render_utils.get_all_api_class_name,
@@ -362,14 +467,16 @@ class Generator:
         # 生成导入语句
         apis_all_imports = self._generate_apis_imports(endpoints)
         referenced_models = list(api_group.models.values())
+        compact_models = collect_compact_array_models(endpoints, api_group.models) \
+            if self.config.compact_arrays else set()
 
-        models_all_imports = self._gen_models_imports(referenced_models)
+        models_all_imports = self._gen_models_imports(referenced_models, compact_models)
 
         # 创建__init__.py
         self._generate_init(package_dir)
 
         # 生成models.py
-        self._generate_models(package_dir, referenced_models, models_all_imports)
+        self._generate_models(package_dir, referenced_models, models_all_imports, compact_models)
 
         # 生成apis.py
         self._generate_apis(package_dir, endpoints, apis_all_imports)
@@ -379,12 +486,14 @@ class Generator:
         content = template.render()
         (package_dir / "__init__.py").write_text(content,encoding="utf-8")
 
-    def _generate_models(self, package_dir: Path, referenced_models: List[DataModel], imports: List[str]):
+    def _generate_models(self, package_dir: Path, referenced_models: List[DataModel], imports: List[str],
+                         compact_models: Collection[str] = ()):
         """生成models.py文件"""
         template = self.env.get_template("models.j2")
         content = template.render(
             referenced_models=referenced_models,
             imports=imports,
+            compact_models=compact_models,
         )
 
         format_content = self._format_content(content)
@@ -411,8 +520,8 @@ class Generator:
 
         return imports
 
-    def _gen_models_imports(self, models: List[DataModel]) -> List[str]:
-        imports_manager = collect_models_imports(models)
+    def _gen_models_imports(self, models: List[DataModel], compact_models: Collection[str] = ()) -> List[str]:
+        imports_manager = collect_models_imports(models, self.config, compact_models)
         imports = generate_imports(imports_manager, exclude_internal=True)
         return imports
 
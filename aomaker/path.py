@@ -34,4 +34,6 @@ AOMAKER_YAML_PATH = os.path.join(CONF_DIR, "aomaker.yaml")
 DIST_STRATEGY_PATH = os.path.join(CONF_DIR, "dist_strategy.yaml")
 
 MIDDLEWARES_DIR = os.path.join(BASEDIR, "middlewares")
-MIDDLEWARE_CONFIG_PATH = os.path.join(MIDDLEWARES_DIR, "middlewares.yaml")
\ No newline at end of file
+MIDDLEWARE_CONFIG_PATH = os.path.join(MIDDLEWARES_DIR, "middlewares.yaml")
+# 中间件发现结果的缓存
+MIDDLEWARE_MANIFEST_PATH = os.path.join(DB_DIR, "middlewares_manifest.json")
\ No newline at end of file
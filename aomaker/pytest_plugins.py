@@ -1,5 +1,9 @@
 # --coding:utf-8--
 from aomaker.storage import cache
+from aomaker.core.attachment_writer import attachment_writer
+from aomaker.core.middlewares.latency_middleware import flush_latency
+from aomaker.core.middlewares.profiling import flush_middleware_timings
+from aomaker.core.warmup import warmup_http_client
 
 deselected_cases = 0
 
@@ -11,6 +15,13 @@ def pytest_configure(config):
     config.deselected_cases = 0
 
 
+def pytest_sessionstart(session):
+    # allure-pytest 在 pytest_configure 中注册报告器，会话开始时重新查找
+    attachment_writer.reset()
+    # 每个 worker 在执行用例前按环境配置预热连接池
+    warmup_http_client()
+
+
 def pytest_collection_modifyitems(config, items):
     config.total_cases = len(items)
 
@@ -31,3 +42,14 @@ def pytest_runtest_teardown(item, nextitem):
     cache.upsert(progress_name,progress_info)
     print(f"Test Progress: {completed}/{total} cases completed ({progress:.2f}%)")
 
+
+
+def pytest_runtest_logfinish(nodeid, location):
+    # 用例结果写入前，确保该用例的 allure 附件都已落盘
+    attachment_writer.flush()
+
+
+def pytest_unconfigure(config):
+    attachment_writer.close()
+    flush_latency()
+    flush_middleware_timings()
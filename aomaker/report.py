@@ -5,7 +5,7 @@ from jinja2 import Template
 
 from aomaker.utils.gen_allure_report import CaseSummary, CaseDetail
 from aomaker.path import REPORT_DIR
-from aomaker.storage import config
+from aomaker.storage import config, latency, retry_stats, phase_timing
 
 base_dir = Path(__file__).parent
 source_html_dir = base_dir / "html"
@@ -70,6 +70,9 @@ def gen_aomaker_reports():
         "note": config.get("note") if config.get("note") else ""
     }
     summary["base_config"] = base_config
+    summary["latency_list"] = latency.summary()
+    summary["retry_list"] = retry_stats.summary()
+    summary["phase_list"] = phase_timing.summary()
     html_maker = HtmlMaker(report_target_dir=Path(REPORT_DIR))
     html_maker.render_template_html(summary)
 
@@ -4,8 +4,11 @@ from typing import Generator
 from aomaker.session import Session
 from aomaker.hook_manager import cli_hook, session_hook
 from aomaker._printer import printer
-from aomaker.storage import config, cache
+from aomaker.storage import config, cache, latency, middleware_timing, retry_stats, phase_timing
 from aomaker.config_handlers import set_conf_file
+from aomaker.core.call_log import clean_call_logs
+from aomaker.core.middlewares.latency_middleware import flush_latency
+from aomaker.core.middlewares.profiling import PROFILING_CONFIG_KEY, flush_middleware_timings, print_middleware_timings
 
 from .models import RunConfig
 from .reporting import clean_allure_json, gen_reports
@@ -14,14 +17,20 @@ from .reporting import clean_allure_json, gen_reports
 @printer("开始初始化环境...", "环境初始化完成，所有全局配置已加载到config表")
 def setup(run_config: RunConfig):
     cache.clear()
+    latency.clear()
+    retry_stats.clear()
+    phase_timing.clear()
+    middleware_timing.clear()
     env = run_config.env
     if env:
         set_conf_file(env)
     
     run_mode = run_config.run_mode
     config.set("run_mode", run_mode)
+    config.set(PROFILING_CONFIG_KEY, run_config.profile_middlewares)
     Session.set_session_vars(login_obj=run_config.login_obj)
     clean_allure_json()
+    clean_call_logs()
 
     if cli_hook.custom_kwargs:
         cli_hook.run()
@@ -30,6 +39,11 @@ def setup(run_config: RunConfig):
 @printer("运行结束，开始清理环境...", "环境清理完成!")
 def teardown(run_config: RunConfig):
     try:
+        # 主进程内（单进程/多线程模式）尚未写入的延迟统计
+        flush_latency()
+        if run_config.profile_middlewares:
+            flush_middleware_timings()
+            print_middleware_timings()
         if run_config.report_enabled:
             gen_reports()
         session_hook.execute_post_hooks()
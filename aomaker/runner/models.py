@@ -26,6 +26,10 @@ class RunConfig(BaseModel):
     login_obj: Optional[BaseLogin] = None
     report_enabled: bool = True
     processes: Optional[PositiveInt] = None
+    per_worker_log: bool = False
+    """多进程模式下，除汇总日志外，额外为每个 worker 写一份独立日志文件"""
+    profile_middlewares: bool = False
+    """统计每个中间件扣除 call_next 后的自身耗时，运行结束时汇总输出"""
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     @model_validator(mode='after')
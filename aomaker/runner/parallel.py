@@ -7,8 +7,9 @@ from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
 
 import pytest
 
-from aomaker.log import logger
+from aomaker.log import logger, LogAggregator, init_worker_logging
 from aomaker._printer import print_message
+from aomaker.core.middlewares.rate_limit_middleware import create_shared_state, install_shared_state
 
 from .base import Runner
 from .args import  make_args_group, _get_pytest_ini
@@ -27,11 +28,24 @@ class ProcessesRunner(Runner):
         max_process = self.max_process_count
         return min(process_count, max_process)
 
-    def _execute_tasks(self, process_count, task_args, extra_pytest_args, pytest_plugin_names):
+    def _execute_tasks(self, process_count, task_args, extra_pytest_args, pytest_plugin_names,
+                       per_worker_log=False):
+        # worker 的日志经队列汇总到父进程，由父进程统一写日志文件
+        aggregator = LogAggregator()
+        aggregator.start()
         logger.info(f"<AoMaker> 多进程任务启动，进程数：{process_count}")
-        with Pool(process_count) as pool:
-            task_func = functools.partial(main_task, pytest_plugin_names=pytest_plugin_names)
-            pool.map(task_func, make_args_group(task_args, extra_pytest_args))
+        # 限流的时间片和并发名额在各 worker 之间通过共享内存和信号量协调，须在启动 worker 前创建
+        rate_limit_state = create_shared_state()
+        try:
+            with Pool(process_count, initializer=init_worker,
+                      initargs=(aggregator.queue, per_worker_log, rate_limit_state)) as pool:
+                task_func = functools.partial(main_task, pytest_plugin_names=pytest_plugin_names)
+                pool.map(task_func, make_args_group(task_args, extra_pytest_args))
+                # 正常退出 worker，保证其队列中的日志全部送达
+                pool.close()
+                pool.join()
+        finally:
+            aggregator.stop()
 
     def run(self, run_config: RunConfig, **kwargs):
         """
@@ -48,7 +62,8 @@ class ProcessesRunner(Runner):
         else:
             process_count = min(process_count, len(task_args), self.max_process_count)
         pytest_plugin_names = [plugin.__name__ for plugin in self.pytest_plugins]
-        self._execute_tasks(process_count, task_args, extra_pytest_args, pytest_plugin_names)
+        self._execute_tasks(process_count, task_args, extra_pytest_args, pytest_plugin_names,
+                            per_worker_log=run_config.per_worker_log)
 
 
 
@@ -71,6 +86,12 @@ class ThreadsRunner(Runner):
         tp.shutdown()
 
 
+def init_worker(log_queue, per_worker_log: bool = False, rate_limit_state: dict = None):
+    """多进程 worker 的初始化（进程池 initializer）：日志汇总和限流共享状态"""
+    init_worker_logging(log_queue, per_worker_log)
+    install_shared_state(rate_limit_state)
+
+
 def main_task(args: list, pytest_plugin_names: list):
     """pytest启动"""
     pytest_opts = _get_pytest_ini()
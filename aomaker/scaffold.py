@@ -814,6 +814,12 @@ mock:
   account:
     user: 'aomaker'
     pwd: '123456'
+  # 连接预热: 每个 worker 执行用例前向 base_url 及 hosts 预建 keep-alive 连接
+  # warmup:
+  #   connections: 4    # 每个地址预建的连接数, 不超过连接池大小(默认 10)
+  #   hosts: []         # base_url 之外需要预热的地址
+  #   dns_ttl: 60       # 进程内 DNS 缓存秒数, 0 表示不缓存
+  #   timeout: 5        # 单条连接的建连超时(秒)
 
 release:
   base_url: 'https://release.aomaker.com'
@@ -836,6 +842,8 @@ release:
     base_api_class: "aomaker.core.api_object.BaseAPIObject"
     # 基类在生成代码中的别名
     base_api_class_alias: "BaseAPI"
+    # 生成内存紧凑的模型类（slots、无 weakref 槽位、List[int]/List[float] 使用 array 存储）
+    compact_models: false
     """
     create_file(Path(project_name) / "conf" / "aomaker.yaml", aomaker_content)
     create_file(Path(project_name) / "conf" / "dist_strategy.yaml")
@@ -939,6 +947,68 @@ class Login(BaseLogin):
     content = """logging_middleware:
     priority: 1000
     enabled: true
+    # options:
+    #   format: full          # full: 多行完整格式; compact: 单行紧凑格式
+    #   max_body_size: 4096   # 请求/响应体超过该字节数时只保留首尾, 0 表示不限制
+    #   skip_binary: true     # 二进制内容只记录类型和大小
+    #   sample_rate: 1        # 成功的请求每 N 次记录 1 次, 失败的请求总是完整记录
+    #   async_attach: true    # allure 附件交给后台线程写入
+    #   attach_dedup: true    # 相同内容的附件只写一次
+    #   attach_compress_size: 0  # 超过该字节数的附件 gzip 压缩存储, 0 表示不压缩
+    #   call_log: false       # 每次调用写一行 JSONL 记录到 logs/calls/, 用 aomaker show calls 分析
+latency_middleware:
+    enabled: true
+    # match:                  # 只对匹配的接口生效（各字段为"且"，列表内为"或"），不写则对所有接口生效
+    #   api: [CreateOrder]    # 接口类名, 支持 glob
+    #   route: /api/v1/*      # 路由模板, 支持 glob
+    #   method: [POST]
+    #   tag: [pay]            # @router.post(path, tags=["pay"])
+    # options:
+    #   flush_interval: 5     # 延迟直方图写入数据库的间隔(秒), 报告和 service 的 /latency 接口读取该数据
+cache_middleware:
+    enabled: true
+    # GET 接口通过 @router.get(path, cache=True) 或 cache=秒数 开启响应缓存
+    # options:
+    #   max_entries: 1024     # 内存中最多缓存的响应条数
+    #   max_bytes: 67108864   # 内存中缓存的响应体总字节数上限
+    #   disk_dir: .cache/http # 磁盘缓存目录, 跨运行复用, 靠 ETag/Last-Modified 重新验证
+    #   default_ttl: 0        # 响应没有 Cache-Control/Expires 时的新鲜期(秒)
+    #   cache_all_get: false  # 对所有 GET 接口开启缓存
+coalesce_middleware:
+    enabled: true
+    # 多线程同时发出相同的 GET 请求时只发送一次，结果共享; 通过 @router.get(path, coalesce=True) 开启
+    # options:
+    #   coalesce_all_get: false  # 对所有 GET 接口开启
+rate_limit_middleware:
+    enabled: true
+    # rate: 每秒请求数, burst: 允许的突发数, concurrency: 并发上限, 0 表示不限制
+    # options:
+    #   shared: true          # 多进程之间共享预算
+    #   hosts:
+    #     api.example.com: {rate: 50, burst: 10, concurrency: 20}
+    #   endpoints:            # 接口类名或路由模板, 支持 glob
+    #     CreateOrder: {rate: 5}
+retry_middleware:
+    enabled: true
+    # 连接错误和指定状态码按指数退避(全抖动)重试, 默认只重试幂等方法, 非幂等接口通过 @router.post(path, retry=True) 开启
+    # options:
+    #   max_retries: 0        # 单个请求最多重试次数, 0 表示不重试
+    #   statuses: [429, 502, 503, 504]
+    #   backoff_base: 0.1     # 第 n 次重试的等待上限为 backoff_base * 2^(n-1) 秒
+    #   backoff_max: 10
+    #   respect_retry_after: true
+    #   max_retry_after: 30   # Retry-After 超过该秒数时不再重试
+    #   budget_ratio: 0.1     # 全局重试预算: 重试流量最多约为正常流量的 10%
+    #   budget_min: 10
+compression_middleware:
+    enabled: true
+    # 请求体压缩: @router.post(path, compress=True) 或 compress="br"; 响应解压由 Accept-Encoding 协商
+    # options:
+    #   encoding: gzip        # gzip / deflate / br(需安装 brotli) / zstd(需安装 zstandard)
+    #   level: null           # 压缩级别, 不设置使用算法默认值
+    #   min_size: 1024        # 请求体小于该字节数时不压缩
+    #   compress_all: false   # 对所有带请求体的接口压缩
+    #   accept_encoding: false # 请求头被整体覆盖、缺少 Accept-Encoding 时自动补上
 """
     create_file(Path(project_name) / "middlewares" / "middlewares.yaml", content)
     
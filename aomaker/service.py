@@ -8,7 +8,8 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from aomaker.storage import stats, cache
+from aomaker.storage import stats, cache, latency, middleware_timing, retry_stats, phase_timing
+from aomaker.core.middlewares.profiling import summarize as summarize_middleware_timings
 from aomaker.path import LOG_FILE_path
 from aomaker.utils.gen_allure_report import gen_allure_summary
 
@@ -61,6 +62,30 @@ def get_stats_count(stats_: list = Depends(get_stats)):
     return len(stats_)
 
 
+@app.get("/latency")
+def get_latency(api_name: Optional[str] = Query(None, description="API class name to filter by."), ):
+    # 运行中各 worker 按 flush_interval 定期写入，这里读到的是合并后的最新分位数
+    return latency.summary(api_name)
+
+
+@app.get("/latency/retries")
+def get_retries(api_name: Optional[str] = Query(None, description="API class name to filter by."), ):
+    # 重试次数及因重试增加的耗时，与 /latency 同步写入
+    return retry_stats.summary(api_name)
+
+
+@app.get("/latency/phases")
+def get_phases(api_name: Optional[str] = Query(None, description="API class name to filter by."), ):
+    # DNS/建连/TLS/首字节/下载分阶段耗时与连接复用率，与 /latency 同步写入
+    return phase_timing.summary(api_name)
+
+
+@app.get("/middlewares/timing")
+def get_middleware_timing():
+    # 需以 aomaker run --profile-middlewares 运行
+    return summarize_middleware_timings(middleware_timing.get_histograms())
+
+
 @app.get("/summary")
 def get_allure_summary():
     return gen_allure_summary()
@@ -80,26 +105,48 @@ def get_progress():
     return progress_data
 
 
+async def follow_log(path: str, poll_interval: float = 1.0):
+    """
+    持续读取汇总日志文件的新增行
+
+    多进程模式下所有 worker 的日志都由主进程写入同一个文件，
+    文件滚动（被重命名并新建）后会自动切换到新文件继续读取。
+    """
+    log_file = open(path, "r", encoding="utf-8")
+    try:
+        log_file.seek(0, 2)  # Go to the end of file
+        while True:
+            lines = log_file.readlines()
+            if lines:
+                for line in lines:
+                    yield line
+                continue
+            await asyncio.sleep(poll_interval)
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                continue
+            opened = os.fstat(log_file.fileno())
+            if current.st_ino != opened.st_ino or current.st_size < log_file.tell():
+                log_file.close()
+                log_file = open(path, "r", encoding="utf-8")
+    finally:
+        log_file.close()
+
+
 @app.websocket("/ws/logs")
 async def get_logs(websocket: WebSocket):
     await websocket.accept()
-    with open(LOG_FILE_path, "r") as log_file:
+    try:
+        async for new_line in follow_log(LOG_FILE_path):
+            await websocket.send_text(new_line)
+    except WebSocketDisconnect:
+        print("Logs WebSocket connection was closed.")
+    finally:
         try:
-            log_file.seek(0, 2)  # Go to the end of file
-
-            while True:
-                new_line = log_file.readline()
-                if new_line:
-                    await websocket.send_text(new_line)
-                else:
-                    await asyncio.sleep(1)
-        except WebSocketDisconnect:
-            print("Logs WebSocket connection was closed.")
-        finally:
-            try:
-                await websocket.close()
-            except RuntimeError:
-                print("Logs WebSocket connection was closed by the client.")
+            await websocket.close()
+        except RuntimeError:
+            print("Logs WebSocket connection was closed by the client.")
 
 
 @app.websocket("/ws/progress")
@@ -4,7 +4,8 @@ import json
 from multiprocessing import current_process
 from threading import current_thread
 
-from aomaker.database.sqlite import SQLiteDB
+from aomaker.database.sqlite import SQLiteDB, lock
+from aomaker.core.latency import LatencyHistogram
 from aomaker._constants import DataBase
 from aomaker.log import logger
 
@@ -201,7 +202,179 @@ class Stats(SQLiteDB):
         self.delete_data(table=self.table, where=where)
 
 
+class HistogramTable(SQLiteDB):
+    """
+    按 (key_columns..., worker) 分行存储延迟直方图的表，写入时与已有记录累加，读取时跨 worker 合并
+
+    子类通过类属性声明表名、键列 ((列名, 类型), ...) 及随直方图一起累加的整数计数列
+    """
+    table_name: str = None
+    key_columns = ()
+    counter_columns = ()
+
+    def __init__(self, db_path=None):
+        super(HistogramTable, self).__init__(db_path)
+        self.table = self.table_name
+        self._keys = [name for name, _ in self.key_columns]
+        self.create_table()
+
+    def create_table(self):
+        columns = [f"{name} {column_type} NOT NULL" for name, column_type in self.key_columns]
+        columns.append("worker TEXT NOT NULL")
+        columns += [f"{name} INTEGER NOT NULL" for name in self.counter_columns]
+        columns.append("histogram TEXT NOT NULL")
+        unique = ", ".join(self._keys + ["worker"])
+        sql = f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                {", ".join(columns)},
+                UNIQUE({unique})
+                );"""
+        self.execute_sql(sql)
+
+    def _merge(self, key: tuple, worker: str, histogram: LatencyHistogram, **counters: int):
+        """把直方图和计数累加到已有记录上"""
+        where = {**dict(zip(self._keys, key)), "worker": worker}
+        with lock:
+            fields = ", ".join([*self.counter_columns, "histogram"])
+            row = self.select_data(self.table, fields, where, is_fetch_all=False)
+            if row is not None:
+                counters = {name: counters.get(name, 0) + row[name] for name in self.counter_columns}
+                histogram = LatencyHistogram.from_dict(json.loads(row["histogram"])).merge(histogram)
+            data = {**where, **counters, "histogram": json.dumps(histogram.to_dict())}
+            self.upsert_data(self.table, data=data, conflict_target=", ".join(self._keys + ["worker"]))
+
+    def _merged(self, where: dict = None):
+        """返回 {键: (计数, LatencyHistogram)}，各 worker 的数据已合并"""
+        merged = {}
+        for row in self.select_data(self.table, where=where):
+            key = tuple(row[name] for name in self._keys)
+            histogram = LatencyHistogram.from_dict(json.loads(row["histogram"]))
+            counters = {name: row[name] for name in self.counter_columns}
+            if key in merged:
+                total, hist = merged[key]
+                merged[key] = ({name: total[name] + counters[name] for name in total}, hist.merge(histogram))
+            else:
+                merged[key] = (counters, histogram)
+        return merged
+
+    def clear(self):
+        self.delete_data(table=self.table)
+
+
+class Latency(HistogramTable):
+    """接口延迟直方图，按 (接口, 状态码, worker) 分行存储，读取时跨 worker 合并"""
+    table_name = DataBase.LATENCY_TABLE
+    key_columns = (("api_name", "TEXT"), ("status", "INTEGER"))
+
+    def merge(self, api_name: str, status: int, worker: str, histogram: LatencyHistogram):
+        """把直方图累加到已有记录上"""
+        self._merge((api_name, status), worker, histogram)
+
+    def get_histograms(self, api_name: str = None):
+        """返回 {(api_name, status): LatencyHistogram}，同一接口各 worker 的数据已合并"""
+        where = {"api_name": api_name} if api_name else None
+        return {key: hist for key, (_, hist) in self._merged(where).items()}
+
+    def summary(self, api_name: str = None):
+        """各接口的延迟分位数（毫秒），按 p99 降序"""
+        result = []
+        for (name, status), hist in self.get_histograms(api_name).items():
+            result.append({
+                "api_name": name,
+                "status": status,
+                "count": hist.count,
+                "mean": _round_ms(hist.mean),
+                "p50": _round_ms(hist.quantile(0.5)),
+                "p90": _round_ms(hist.quantile(0.9)),
+                "p99": _round_ms(hist.quantile(0.99)),
+                "max": _round_ms(hist.max if hist.count else None),
+            })
+        result.sort(key=lambda item: item["p99"] or 0, reverse=True)
+        return result
+
+
+class RetryStats(HistogramTable):
+    """接口重试统计：重试次数与因重试增加的耗时，按 (接口, worker) 分行存储"""
+    table_name = DataBase.RETRY_STATS_TABLE
+    key_columns = (("api_name", "TEXT"),)
+    counter_columns = ("retries",)
+
+    def merge(self, api_name: str, worker: str, retries: int, histogram: LatencyHistogram):
+        self._merge((api_name,), worker, histogram, retries=retries)
+
+    def summary(self, api_name: str = None):
+        """各接口的重试次数、发生重试的调用数及增加的耗时（毫秒），按重试次数降序"""
+        where = {"api_name": api_name} if api_name else None
+        result = [{
+            "api_name": name,
+            "retries": counters["retries"],
+            "retried_calls": hist.count,
+            "added_p50": _round_ms(hist.quantile(0.5)),
+            "added_p99": _round_ms(hist.quantile(0.99)),
+            "added_total": _round_ms(hist.total),
+        } for (name,), (counters, hist) in self._merged(where).items()]
+        result.sort(key=lambda item: item["retries"], reverse=True)
+        return result
+
+
+class PhaseTiming(HistogramTable):
+    """接口请求分阶段耗时（DNS/建连/TLS/首字节/下载），按 (接口, 阶段, worker) 分行存储"""
+    table_name = DataBase.PHASE_TIMING_TABLE
+    key_columns = (("api_name", "TEXT"), ("phase", "TEXT"))
+
+    def merge(self, api_name: str, phase: str, worker: str, histogram: LatencyHistogram):
+        self._merge((api_name, phase), worker, histogram)
+
+    def summary(self, api_name: str = None):
+        """
+        各接口的请求数、新建连接数、连接复用率及各阶段 p50/p99（毫秒），按新建连接数降序
+
+        每个请求都有 ttfb 阶段，只有新建连接的请求才有 connect 阶段，两者之差即复用连接的请求数
+        """
+        merged = {}
+        where = {"api_name": api_name} if api_name else None
+        for (name, phase), (_, hist) in self._merged(where).items():
+            merged.setdefault(name, {})[phase] = hist
+        result = []
+        for name, phases in merged.items():
+            requests_count = phases["ttfb"].count if "ttfb" in phases else 0
+            new_connections = phases["connect"].count if "connect" in phases else 0
+            item = {
+                "api_name": name,
+                "requests": requests_count,
+                "new_connections": new_connections,
+                "reuse_rate": round(1 - new_connections / requests_count, 4) if requests_count else None,
+            }
+            for phase in ("dns", "connect", "tls", "ttfb", "download"):
+                hist = phases.get(phase)
+                item[f"{phase}_p50"] = _round_ms(hist.quantile(0.5)) if hist else None
+                item[f"{phase}_p99"] = _round_ms(hist.quantile(0.99)) if hist else None
+            result.append(item)
+        result.sort(key=lambda item: item["new_connections"], reverse=True)
+        return result
+
+
+class MiddlewareTiming(HistogramTable):
+    """中间件自身耗时直方图，按 (中间件, worker) 分行存储"""
+    table_name = DataBase.MIDDLEWARE_TIMING_TABLE
+    key_columns = (("name", "TEXT"),)
+
+    def merge(self, name: str, worker: str, histogram: LatencyHistogram):
+        self._merge((name,), worker, histogram)
+
+    def get_histograms(self):
+        """返回 {中间件名: LatencyHistogram}，各 worker 的数据已合并"""
+        return {name: hist for (name,), (_, hist) in self._merged().items()}
+
+
+def _round_ms(value):
+    return None if value is None else round(value, 2)
+
+
 cache = Cache()
 config = Config()
 schema = Schema()
 stats = Stats()
+latency = Latency()
+middleware_timing = MiddlewareTiming()
+retry_stats = RetryStats()
+phase_timing = PhaseTiming()
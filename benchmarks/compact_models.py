@@ -0,0 +1,107 @@
+# --coding:utf-8--
+"""
+紧凑模型内存基准：对比默认配置与 compact_models 选项下 aomaker gen models 生成的模型，
+在结构化 1M 元素响应时的内存占用。模型由代码生成器生成，覆盖该选项的全部效果
+（slots、去掉 weakref 槽位、List[int] / List[float] 字段以 array 存储）。
+
+运行: python benchmarks/compact_models.py [元素数量]
+"""
+import gc
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# aomaker 的存储层需要在项目根目录（含 .aomaker 文件）下导入，基准在临时项目目录中运行
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp(prefix="aomaker_bench_"))
+Path(".aomaker").touch()
+
+from rich.console import Console  # noqa: E402
+
+from aomaker.core.converters import RequestConverter  # noqa: E402
+from aomaker.maker.config import OpenAPIConfig  # noqa: E402
+from aomaker.maker.generator import Generator  # noqa: E402
+from aomaker.maker.models import APIGroup, DataModel, DataModelField, DataType, Endpoint, Import  # noqa: E402
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+
+def _field(name: str, type_hint: str, required: bool = True, item: str = None) -> DataModelField:
+    if item is None:
+        data_type = DataType(type=type_hint, is_custom_type=type_hint[0].isupper())
+    else:
+        data_type = DataType(type=type_hint, is_list=True,
+                             data_types=[DataType(type=item, is_custom_type=item[0].isupper())])
+    return DataModelField(name=name, data_type=data_type, required=required)
+
+
+def make_models(compact: bool):
+    """用代码生成器生成 ItemsResponse 模型并导入"""
+    typing_import = {Import(from_="typing", import_="List")}
+    item = DataModel(name="Item", imports=typing_import, fields=[
+        _field("id", "int"),
+        _field("status", "str"),
+        _field("score", "float", required=False),
+        _field("tags", "List[int]", item="int"),
+    ])
+    response = DataModel(name="ItemsResponse", imports=typing_import, fields=[
+        _field("data", "List[Item]", item="Item"),
+        _field("ids", "List[int]", required=False, item="int"),
+        _field("weights", "List[float]", required=False, item="float"),
+        _field("total", "int"),
+    ])
+    group = APIGroup(tag="bench", models={"Item": item, "ItemsResponse": response},
+                     endpoints=[Endpoint(class_name="ListItems", path="/items", method="get", response=response)])
+    output_dir = Path(tempfile.mkdtemp(prefix="compact" if compact else "default"))
+    Generator(str(output_dir), OpenAPIConfig(compact_models=compact), console=Console(quiet=True)).generate([group])
+
+    spec = importlib.util.spec_from_file_location(f"bench_models_{compact}", output_dir / "bench" / "models.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.ItemsResponse
+
+
+def build_payload(n: int) -> dict:
+    return {
+        "data": [{"id": i, "status": "ok", "score": i * 0.5, "tags": [i % 7, i % 11]} for i in range(n)],
+        "ids": list(range(10 ** 12, 10 ** 12 + n)),
+        "weights": [i * 0.25 for i in range(n)],
+        "total": n,
+    }
+
+
+def measure(compact: bool, n: int):
+    """返回 (模型常驻内存, 峰值内存, 结构化耗时)；常驻内存在释放原始 JSON 数据后统计"""
+    response_cls = make_models(compact)
+    converter = RequestConverter()
+    gc.collect()
+    tracemalloc.start()
+    payload = build_payload(n)
+    start = time.perf_counter()
+    model = converter.structure(payload, response_cls)
+    elapsed = time.perf_counter() - start
+    del payload
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert model.total == len(model.data) == len(model.ids) == len(model.weights)
+    del model
+    return retained, peak, elapsed
+
+
+def main():
+    print(f"结构化 {N} 个元素的响应（data: List[Item] + ids: List[int] + weights: List[float]）")
+    print(f"{'mode':<10}{'retained MB':>14}{'peak MB':>12}{'seconds':>10}")
+    for compact in (False, True):
+        retained, peak, elapsed = measure(compact, N)
+        mode = "compact" if compact else "default"
+        print(f"{mode:<10}{retained / 2 ** 20:>14.1f}{peak / 2 ** 20:>12.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import threading
+
+import pytest
+import requests
+
+from aomaker.core.http_client import CachedResponse
+from aomaker.core.middlewares import cache_middleware as cache_mod
+from aomaker.core.middlewares.cache_middleware import (
+    CacheEntry,
+    CacheOptions,
+    ResponseCache,
+    cache_key,
+    cache_middleware,
+    freshness_lifetime,
+    parse_cache_control,
+    response_cache,
+)
+
+
+class FakeServer:
+    """按顺序返回预设响应，并记录收到的请求头"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(dict(request.get("headers") or {}))
+        status, headers, body = self.responses.pop(0)
+        raw = requests.Response()
+        raw.status_code = status
+        raw.headers = requests.structures.CaseInsensitiveDict(headers)
+        raw._content = body
+        raw.url = request["url"]
+        return CachedResponse(raw)
+
+
+def _request(cache=True, headers=None, method="GET"):
+    return {"method": method, "url": "http://api/dicts", "params": {"b": 2, "a": 1},
+            "headers": headers or {}, "_api_meta": {"class_name": "GetDicts", "cache": cache}}
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def test_parse_cache_control_and_freshness():
+    assert parse_cache_control('max-age=60, no-cache, private="x"') == {"max-age": "60", "no-cache": None, "private": "x"}
+    assert freshness_lifetime({"Cache-Control": "max-age=60", "Age": "10"}, 0, 0) == 50
+    assert freshness_lifetime({"Cache-Control": "no-store"}, 30, 0) is None
+    assert freshness_lifetime({"Cache-Control": "no-cache"}, 30, 0) == 0
+    assert freshness_lifetime({"Expires": "Thu, 01 Jan 1970 00:01:40 GMT", "Date": "Thu, 01 Jan 1970 00:01:00 GMT"}, 0, 0) == 40
+    assert freshness_lifetime({}, 30, 0) == 30
+
+
+def test_cache_key_sorts_params_and_isolates_credentials():
+    assert cache_key(_request()) == "GET http://api/dicts?a=1&b=2"
+    assert cache_key(_request(headers={"Authorization": "t1"})) != cache_key(_request(headers={"Authorization": "t2"}))
+    assert cache_key(_request(headers={"Cookie": "sid=1"})) != cache_key(_request(headers={"cookie": "sid=2"}))
+    tenant_a = _request(headers={"X-Tenant-Id": "a"})
+    assert cache_key(tenant_a) == cache_key(_request())
+    assert cache_key(tenant_a, ["X-Tenant-Id"]) != cache_key(_request(headers={"X-Tenant-Id": "b"}), ["X-Tenant-Id"])
+
+
+def test_key_headers_option_and_threaded_counters():
+    assert CacheOptions.from_dict({"key_headers": ["X-Tenant-Id"]}).key_headers == ("X-Tenant-Id",)
+    threads = [threading.Thread(target=lambda: [response_cache.count("hits") for _ in range(1000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert response_cache.hits == 8000
+
+
+def test_fresh_response_served_from_cache():
+    server = FakeServer((200, {"Cache-Control": "max-age=60"}, b'{"v": 1}'))
+    first = cache_middleware(_request(), call_next=server)
+    second = cache_middleware(_request(), call_next=server)
+
+    assert len(server.requests) == 1
+    assert second.json() == {"v": 1}
+    assert second.from_cache is True
+    assert isinstance(second, CachedResponse)
+    assert first.json() == second.json()
+    assert response_cache.hits == 1
+
+
+def test_stale_response_revalidated_with_validators():
+    server = FakeServer(
+        (200, {"Cache-Control": "no-cache", "ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}, b'{"v": 1}'),
+        (304, {"ETag": '"v1"', "Cache-Control": "max-age=60"}, b""),
+    )
+    cache_middleware(_request(), call_next=server)
+    revalidated = cache_middleware(_request(), call_next=server)
+    third = cache_middleware(_request(), call_next=server)
+
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert server.requests[1]["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert revalidated.status_code == 200
+    assert revalidated.json() == {"v": 1}
+    assert third.json() == {"v": 1}
+    assert len(server.requests) == 2
+    assert response_cache.revalidated == 1
+
+
+def test_not_cached_without_opt_in_or_for_non_get():
+    server = FakeServer(*[(200, {"Cache-Control": "max-age=60"}, b"{}")] * 4)
+    cache_middleware(_request(cache=False), call_next=server)
+    cache_middleware(_request(cache=False), call_next=server)
+    cache_middleware(_request(method="POST"), call_next=server)
+    cache_middleware(_request(method="POST"), call_next=server)
+    assert len(server.requests) == 4
+    assert len(response_cache) == 0
+
+
+def test_endpoint_ttl_used_without_cache_headers():
+    server = FakeServer((200, {}, b"[1]"))
+    cache_middleware(_request(cache=30), call_next=server)
+    assert cache_middleware(_request(cache=30), call_next=server).json() == [1]
+    assert len(server.requests) == 1
+
+
+def test_vary_and_no_store():
+    server = FakeServer(
+        (200, {"Cache-Control": "max-age=60", "Vary": "Accept-Language"}, b'"zh"'),
+        (200, {"Cache-Control": "max-age=60", "Vary": "Accept-Language"}, b'"en"'),
+        (200, {"Cache-Control": "no-store"}, b'"x"'),
+    )
+    cache_middleware(_request(headers={"Accept-Language": "zh"}), call_next=server)
+    en = cache_middleware(_request(headers={"Accept-Language": "en"}), call_next=server)
+    assert en.json() == "en"
+    # no-store 的响应不会覆盖已有缓存
+    assert cache_middleware(_request(headers={"Accept-Language": "fr"}), call_next=server).json() == "x"
+    assert response_cache.get(cache_key(_request())).content == b'"en"'
+    assert len(server.requests) == 3
+
+
+def test_lru_bounds():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+
+    def entry(content):
+        return CacheEntry(url="u", status_code=200, headers={}, content=content, encoding=None, reason="OK",
+                          stored_at=0, ttl=60)
+
+    cache.set("a", entry(b"1234"))
+    cache.set("b", entry(b"1234"))
+    cache.get("a")
+    cache.set("c", entry(b"12"))
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.set("d", entry(b"12345678901"))
+    assert cache.get("d") is None
+    cache.set("e", entry(b"12345678"))
+    assert len(cache) == 1
+
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    stored = CacheEntry(url="u", status_code=200, headers={"ETag": '"x"'}, content=b"body", encoding="utf-8",
+                        reason="OK", stored_at=1.0, ttl=0)
+    cache.set("k", stored)
+
+    loaded = ResponseCache(disk_dir=str(tmp_path)).get("k")
+    assert loaded == stored
+    assert loaded.etag == '"x"'
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        CacheOptions.from_dict({"max_entries": 0})
+    with pytest.raises(ValueError):
+        CacheOptions.from_dict({"unknown": 1})
+
+
+def test_invalid_options_rejected_at_config():
+    from aomaker.core.middlewares.registry import registry, register_internal_middlewares
+    register_internal_middlewares()
+    with pytest.raises(ValueError, match="cache_middleware"):
+        registry.apply_config({"cache_middleware": {"options": {"max_entries": 0}}})
+
+
+def test_options_cached_without_config(monkeypatch):
+    from aomaker.core.middlewares.registry import registry
+    monkeypatch.delitem(registry.middleware_configs, cache_mod.MIDDLEWARE_NAME, raising=False)
+    monkeypatch.setitem(cache_mod._resolved, "source", cache_mod._UNRESOLVED)
+    options = cache_mod.get_cache_options()
+    response_cache.max_entries = 7
+    assert cache_mod.get_cache_options() is options
+    assert response_cache.max_entries == 7
+    response_cache.max_entries = options.max_entries
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+import requests
+
+from aomaker.core.http_client import CachedResponse
+from aomaker.core.middlewares.coalesce_middleware import (
+    RequestCoalescer,
+    coalesce_middleware,
+    request_fingerprint,
+)
+
+
+def _request(coalesce=True, method="GET", params=None, headers=None):
+    return {"method": method, "url": "http://api/fixtures", "params": params or {"a": 1, "b": 2},
+            "headers": headers or {"Token": "t"}, "_api_meta": {"class_name": "GetFixtures", "coalesce": coalesce}}
+
+
+class SlowServer:
+    def __init__(self, release: threading.Event, error: Exception = None):
+        self.release = release
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        with self._lock:
+            self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        raw = requests.Response()
+        raw.status_code = 200
+        raw._content = b'{"items": [1, 2]}'
+        return CachedResponse(raw)
+
+
+def _run_concurrently(count, target):
+    results, errors = [None] * count, [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(coalescer, expected):
+    for _ in range(500):
+        if coalescer.coalesced >= expected:
+            return
+        threading.Event().wait(0.01)
+
+
+def test_fingerprint_is_canonical():
+    assert request_fingerprint(_request(params={"a": 1, "b": 2})) == request_fingerprint(_request(params={"b": 2, "a": 1}))
+    assert request_fingerprint(_request(headers={"Token": "t"})) == request_fingerprint(_request(headers={"token": "t"}))
+    assert request_fingerprint(_request(headers={"Token": "t"})) != request_fingerprint(_request(headers={"Token": "u"}))
+
+
+def test_identical_requests_share_one_call():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    server = SlowServer(release)
+    key = request_fingerprint(_request())
+
+    threads, results, errors = _run_concurrently(8, lambda: coalescer.execute(key, _request(), server))
+    _wait_for_waiters(coalescer, 7)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert server.calls == 1
+    assert errors == [None] * 8
+    assert {id(r.raw_response) for r in results} == {id(results[0].raw_response)}
+    # 各等待者的 json() 结果互不影响
+    results[1].json()["items"].append(3)
+    assert results[2].json() == {"items": [1, 2]}
+
+
+def test_error_propagates_to_all_waiters():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    server = SlowServer(release, error=ConnectionError("down"))
+
+    threads, results, errors = _run_concurrently(4, lambda: coalescer.execute("k", _request(), server))
+    _wait_for_waiters(coalescer, 3)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert server.calls == 1
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert coalescer._in_flight == {}
+
+
+@pytest.mark.parametrize("request_data", [_request(coalesce=False), _request(method="POST")])
+def test_middleware_skips_when_not_applicable(request_data):
+    release = threading.Event()
+    release.set()
+    server = SlowServer(release)
+    coalesce_middleware(request_data, call_next=server)
+    coalesce_middleware(request_data, call_next=server)
+    assert server.calls == 2
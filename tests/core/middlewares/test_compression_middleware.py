@@ -0,0 +1,115 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+from aomaker.core.middlewares import compression_middleware as compression_mod
+from aomaker.core.middlewares.compression_middleware import (
+    CompressionOptions,
+    codec_available,
+    compress,
+    compression_middleware,
+)
+
+BULK = {"items": [{"name": f"user-{i}", "role": "member"} for i in range(200)]}
+
+
+class Capture:
+    def __init__(self):
+        self.request = None
+
+    def __call__(self, request):
+        self.request = request
+        return "response"
+
+
+@pytest.fixture
+def options(monkeypatch):
+    def apply(**kwargs):
+        opts = CompressionOptions(**kwargs)
+        monkeypatch.setattr(compression_mod, "get_compression_options", lambda: opts)
+        return opts
+
+    return apply
+
+
+def _request(compress=None, **body):
+    return {"method": "POST", "url": "http://api/users/bulk", "headers": {"Accept-Encoding": "identity"},
+            "_api_meta": {"class_name": "BulkCreate", "compress": compress}, **body}
+
+
+def test_json_body_compressed_for_opted_in_endpoint(options):
+    options()
+    capture = Capture()
+    original = _request(compress=True, json=BULK)
+
+    assert compression_middleware(original, call_next=capture) == "response"
+
+    sent = capture.request
+    assert "json" not in sent
+    assert sent["headers"]["Content-Encoding"] == "gzip"
+    assert sent["headers"]["Content-Type"] == "application/json"
+    assert json.loads(gzip.decompress(sent["data"])) == BULK
+    assert len(sent["data"]) * 10 < len(json.dumps(BULK))
+    # 外层中间件看到的仍是原始请求
+    assert original["json"] is BULK and "Content-Encoding" not in original["headers"]
+
+
+def test_endpoint_encoding_and_compress_all(options):
+    options(compress_all=True, encoding="deflate")
+    capture = Capture()
+    compression_middleware(_request(data="x" * 2048), call_next=capture)
+    assert zlib.decompress(capture.request["data"]) == b"x" * 2048
+    assert capture.request["headers"]["Content-Encoding"] == "deflate"
+
+    compression_middleware(_request(compress="gzip", data=b"y" * 2048), call_next=capture)
+    assert capture.request["headers"]["Content-Encoding"] == "gzip"
+
+    compression_middleware(_request(compress=False, data=b"y" * 2048), call_next=capture)
+    assert capture.request["data"] == b"y" * 2048
+
+
+def test_small_form_and_file_bodies_untouched(options):
+    options(compress_all=True)
+    capture = Capture()
+    for request in (_request(json={"a": 1}), _request(data={"a": "1" * 4096}),
+                    _request(data=b"z" * 4096, files={"f": b"z"})):
+        compression_middleware(request, call_next=capture)
+        assert "Content-Encoding" not in capture.request["headers"]
+
+
+def test_accept_encoding_added_when_missing(options):
+    options(accept_encoding=True)
+    capture = Capture()
+    compression_middleware({"method": "GET", "url": "http://api/x", "headers": {}}, call_next=capture)
+    assert "gzip" in capture.request["headers"]["Accept-Encoding"]
+    compression_middleware(_request(), call_next=capture)
+    assert capture.request["headers"]["Accept-Encoding"] == "identity"
+
+
+def test_codecs():
+    assert gzip.decompress(compress(b"abc", "gzip")) == b"abc"
+    assert zlib.decompress(compress(b"abc", "deflate", level=9)) == b"abc"
+    if not codec_available("zstd"):
+        with pytest.raises(ValueError):
+            compress(b"abc", "zstd")
+    with pytest.raises(ValueError):
+        CompressionOptions.from_dict({"encoding": "lzma"})
+    with pytest.raises(ValueError):
+        CompressionOptions.from_dict({"unknown": 1})
+
+
+def test_unavailable_encoding_rejected(monkeypatch):
+    monkeypatch.setattr(compression_mod, "AVAILABLE_CODECS", ("gzip", "deflate"))
+    with pytest.raises(ValueError, match="brotli"):
+        CompressionOptions(encoding="br")
+    with pytest.raises(ValueError):
+        compress(b"abc", "br")
+
+
+def test_invalid_options_rejected_at_config():
+    from aomaker.core.middlewares.registry import registry, register_internal_middlewares
+    register_internal_middlewares()
+    with pytest.raises(ValueError, match="compression_middleware"):
+        registry.apply_config({"compression_middleware": {"options": {"encoding": "lzma"}}})
@@ -0,0 +1,115 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from aomaker.core.latency import LatencyHistogram
+from aomaker.core.middlewares import latency_middleware as latency_mod
+from aomaker.core.middlewares.latency_middleware import (
+    ERROR_STATUS,
+    LatencyRecorder,
+    latency_middleware,
+    recorder,
+)
+from aomaker.storage import Latency
+
+
+@pytest.fixture
+def latency_db(tmp_path):
+    db = Latency(db_path=str(tmp_path / "latency.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture(autouse=True)
+def drain_global_recorder():
+    recorder.drain()
+    yield
+    recorder.drain()
+
+
+def test_recorder_merges_thread_stores():
+    rec = LatencyRecorder()
+
+    def work():
+        for i in range(100):
+            rec.record("GetUser", 200, i + 1)
+
+    threads = [threading.Thread(target=work, name=f"t{i}") for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    drained = rec.drain()
+    assert {key[0] for key in drained} == {"t0", "t1", "t2", "t3"}
+    assert sum(hist.count for hist in drained.values()) == 400
+    assert rec.drain() == {}
+
+
+def test_middleware_records_status_and_errors(monkeypatch):
+    # 不触发定期写库，样本留在内存中供 drain 检查
+    monkeypatch.setattr(latency_mod, "_flush_interval", lambda: float("inf"))
+    recorder.drain()
+    response = MagicMock(status_code=404)
+    request = {"url": "http://x/users", "_api_meta": {"class_name": "GetUser"}}
+    assert latency_middleware(request, call_next=lambda req: response) is response
+
+    def boom(req):
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        latency_middleware(request, call_next=boom)
+
+    drained = recorder.drain()
+    assert sorted((api, status) for _, api, status in drained) == [("GetUser", ERROR_STATUS), ("GetUser", 404)]
+
+
+def test_storage_merges_workers(latency_db):
+    for worker, values in (("gw0", [10, 20, 30]), ("gw1", [40, 50])):
+        hist = LatencyHistogram()
+        hist.extend(values)
+        latency_db.merge("GetUser", 200, worker, hist)
+    extra = LatencyHistogram()
+    extra.add(1000)
+    latency_db.merge("GetUser", 200, "gw0", extra)
+
+    merged = latency_db.get_histograms()[("GetUser", 200)]
+    assert merged.count == 6
+    assert merged.max == 1000
+
+    summary = latency_db.summary()
+    assert len(summary) == 1
+    assert summary[0]["count"] == 6
+    assert summary[0]["max"] == 1000
+    assert summary[0]["p50"] == pytest.approx(30, rel=0.02)
+
+    latency_db.clear()
+    assert latency_db.summary() == []
+
+
+def test_recorder_flush_writes_to_db(monkeypatch, latency_db):
+    monkeypatch.setattr("aomaker.storage.latency", latency_db)
+    rec = LatencyRecorder()
+    rec.record("ListUsers", 200, 12.5)
+    rec.flush()
+    rec.record("ListUsers", 200, 25)
+    rec.flush()
+
+    assert latency_db.summary()[0]["count"] == 2
+
+
+def test_periodic_flush_runs_on_writer_thread(monkeypatch):
+    rec = LatencyRecorder()
+    flushed = []
+    done = threading.Event()
+
+    def fake_flush():
+        flushed.append(threading.current_thread().name)
+        done.set()
+
+    monkeypatch.setattr(rec, "_flush", fake_flush)
+    rec.record("GetUser", 200, 1)
+    rec.maybe_flush(0)
+    assert done.wait(2)
+    assert flushed == ["aomaker-latency-writer"]
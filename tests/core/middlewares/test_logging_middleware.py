@@ -43,9 +43,11 @@ def mock_get_level():
 
 @pytest.fixture
 def mock_allure_attach():
-    """Mocks allure.attach function."""
-    with patch('aomaker.core.middlewares.logging_middleware.allure.attach') as mock_attach:
-            yield mock_attach
+    """Mocks allure.attach function, with an allure reporter reported as active."""
+    with patch('aomaker.core.middlewares.logging_middleware.allure.attach') as mock_attach, \
+            patch('aomaker.core.middlewares.logging_middleware.attachment_writer.reporter_active',
+                  return_value=True):
+        yield mock_attach
 
 @pytest.fixture
 def mock_traceback():
@@ -316,4 +318,242 @@ def test_log_allure_attach_fails(mock_logger, mock_get_level, mock_allure_attach
     assert response is mock_response
     mock_logger.info.assert_called_once()
     mock_allure_attach.assert_called_once()
-    mock_logger.warning.assert_called_once_with("Allure附件生成失败: Allure error") 
\ No newline at end of file
+    mock_logger.warning.assert_called_once_with("Allure附件生成失败: Allure error") 
+
+def test_log_skipped_when_no_sink_enabled(mock_logger, mock_get_level, mock_allure_attach):
+    """测试：没有 sink 会输出时跳过日志渲染，但仍生成 allure 附件"""
+    mock_response = MockResponse(status_code=200, content=b'{"a": 1}')
+    mock_call_next = MagicMock(return_value=mock_response)
+    request_data = {"url": "http://test.com/quiet", "method": "GET", "_api_meta": {"class_name": "QuietAPI"}}
+
+    with patch('aomaker.core.middlewares.logging_middleware.aomaker_logger.is_enabled', return_value=False), \
+            patch('aomaker.core.middlewares.logging_middleware._FULL_TEMPLATE') as mock_template:
+        structured_logging_middleware(request_data, mock_call_next)
+
+    mock_template.render.assert_not_called()
+    mock_logger.info.assert_not_called()
+    mock_logger.debug.assert_not_called()
+    mock_allure_attach.assert_called_once()
+
+
+def test_log_compact_format(mock_logger, mock_get_level, mock_allure_attach):
+    """测试：compact 格式输出单行日志"""
+    from aomaker.core.middlewares.logging_middleware import set_log_format
+    mock_response = MockResponse(status_code=200, content=b'{"a": 1}', elapsed=timedelta(seconds=0.2))
+    mock_call_next = MagicMock(return_value=mock_response)
+    request_data = {
+        "url": "http://test.com/compact",
+        "method": "POST",
+        "json": {"k": "v"},
+        "_api_meta": {"class_name": "CompactAPI"}
+    }
+
+    set_log_format("compact")
+    try:
+        structured_logging_middleware(request_data, mock_call_next)
+    finally:
+        set_log_format("full")
+
+    log_output = mock_logger.info.call_args[0][0]
+    assert "\n" not in log_output
+    assert log_output == "<API>: CompactAPI | POST http://test.com/compact | json={'k': 'v'} | 200 0.2s | body={'a': 1}"
+
+
+def test_set_log_format_invalid():
+    from aomaker.core.middlewares.logging_middleware import set_log_format
+    with pytest.raises(ValueError):
+        set_log_format("xml")
+
+
+def test_logger_level_cached():
+    """测试：get_level 读取缓存，change_level 时刷新"""
+    from aomaker.log import AoMakerLogger, aomaker_logger
+    try:
+        AoMakerLogger.change_level("warning")
+        assert AoMakerLogger._level_cache["<stdout>"] == 30
+        assert aomaker_logger.get_level() == 30
+    finally:
+        AoMakerLogger.change_level("info")
+    assert aomaker_logger.get_level() == 20
+
+
+@pytest.fixture
+def isolated_logger(monkeypatch):
+    """不带任何 sink 的独立 loguru logger，避免影响全局日志配置"""
+    import sys
+    from loguru._logger import Core
+    from aomaker.log import AoMakerLogger, uru_logger
+    isolated = type(uru_logger)(Core(), *uru_logger._options)
+    monkeypatch.setattr(AoMakerLogger, "logger", isolated)
+    monkeypatch.setattr(AoMakerLogger, "_level_cache", {})
+    monkeypatch.setattr(AoMakerLogger, "_cached_handlers", None)
+    isolated.add(sys.__stdout__, level="WARNING")
+    yield isolated
+    isolated.remove()
+
+
+def test_is_enabled_follows_real_sink_levels(isolated_logger, tmp_path):
+    """测试：按实际 sink 级别判断，增删 handler 后 get_level 缓存失效"""
+    from aomaker.log import aomaker_logger
+    log_file = str(tmp_path / "run.log")
+    assert aomaker_logger.get_level() == 30
+    assert not aomaker_logger.is_enabled(20)
+    assert aomaker_logger.get_level(log_file) is None
+
+    file_id = isolated_logger.add(log_file, level="INFO")
+    assert aomaker_logger.is_enabled(20)
+    assert not aomaker_logger.is_enabled(10)
+    assert aomaker_logger.get_level(log_file) == 20
+
+    isolated_logger.remove(file_id)
+    assert not aomaker_logger.is_enabled(20)
+    assert aomaker_logger.get_level(log_file) is None
+
+
+def test_response_parsed_only_for_attachment(isolated_logger, mock_logger, mock_allure_attach):
+    """测试：没有 sink 输出时不渲染日志，响应体只为 allure 附件解析一次"""
+    mock_response = MockResponse(status_code=200, content=b'{"a": 1}')
+    request_data = {"url": "http://test.com/quiet", "method": "GET", "_api_meta": {"class_name": "QuietAPI"}}
+
+    with patch('aomaker.core.middlewares.logging_middleware._FULL_TEMPLATE') as mock_template:
+        structured_logging_middleware(request_data, MagicMock(return_value=mock_response))
+
+    mock_template.render.assert_not_called()
+    mock_response.json.assert_called_once()
+    allure_json_content = json.loads(mock_allure_attach.call_args[0][0])
+    assert allure_json_content['response']['body'] == {"a": 1}
+
+
+def test_nothing_built_without_sink_or_reporter(isolated_logger, mock_logger):
+    """测试：没有 sink 和 allure 报告器时，既不截断请求体也不解析、序列化响应"""
+    mock_response = MockResponse(status_code=200, content=b'{"a": 1}')
+    request_data = {"url": "http://test.com/quiet", "method": "POST", "json": {"k": "v"},
+                    "_api_meta": {"class_name": "QuietAPI"}}
+
+    with patch('aomaker.core.middlewares.logging_middleware.attachment_writer.reporter_active',
+               return_value=False), \
+            patch('aomaker.core.middlewares.logging_middleware._shrink_payload') as mock_shrink, \
+            patch('aomaker.core.middlewares.logging_middleware.allure.attach') as mock_attach:
+        structured_logging_middleware(request_data, MagicMock(return_value=mock_response))
+
+    mock_shrink.assert_not_called()
+    mock_response.json.assert_not_called()
+    mock_attach.assert_not_called()
+
+
+@pytest.fixture
+def log_options():
+    """通过注册中心设置日志中间件 options"""
+    from aomaker.core.middlewares.registry import registry, register_internal_middlewares
+    register_internal_middlewares()
+
+    def _set(**options):
+        registry.apply_config({"logging_middleware": {"options": options}})
+    yield _set
+
+
+def test_log_options_from_registry(log_options):
+    from aomaker.core.middlewares.logging_middleware import get_log_options
+    log_options(max_body_size=100, sample_rate=5)
+    options = get_log_options()
+    assert options.max_body_size == 100
+    assert options.sample_rate == 5
+    assert get_log_options() is options
+
+
+def test_log_options_invalid(log_options):
+    """测试：配置有误时在加载中间件时报错，不会进入请求路径"""
+    from aomaker.core.middlewares.logging_middleware import get_log_options
+    log_options(sample_rate=3)
+    with pytest.raises(ValueError, match="unknown_key"):
+        log_options(unknown_key=1)
+    with pytest.raises(ValueError, match="logging_middleware"):
+        log_options(sample_rate=0)
+    assert get_log_options().sample_rate == 3
+
+
+def test_log_options_cached_without_config(monkeypatch):
+    """测试：未配置 options 时也只构建一次"""
+    from aomaker.core.middlewares import logging_middleware as logging_mod
+    from aomaker.core.middlewares.registry import registry
+    monkeypatch.delitem(registry.middleware_configs, logging_mod.MIDDLEWARE_NAME, raising=False)
+    monkeypatch.setitem(logging_mod._resolved, "source", logging_mod._UNRESOLVED)
+    configure = MagicMock()
+    monkeypatch.setattr(logging_mod.attachment_writer, "configure", configure)
+
+    options = logging_mod.get_log_options()
+    assert logging_mod.get_log_options() is options
+    configure.assert_called_once()
+
+
+def test_shrink_payload_serializes_json():
+    """测试：字典请求体按 JSON 序列化后截断"""
+    from aomaker.core.middlewares.logging_middleware import LogOptions, _shrink_payload
+    shrunk = _shrink_payload({"name": "x" * 100}, LogOptions(max_body_size=20))
+    assert shrunk.startswith('{"name": ') and shrunk.endswith('xxx"}')
+    assert _shrink_payload({"name": "x"}, LogOptions(max_body_size=20)) == {"name": "x"}
+
+
+def test_log_truncates_large_body(log_options, mock_logger, mock_get_level, mock_allure_attach):
+    """测试：超长响应只保留首尾，并标记省略字节数"""
+    log_options(max_body_size=20)
+    body = b'{"items": "' + b"x" * 1000 + b'"}'
+    mock_response = MockResponse(status_code=200, content=body)
+    mock_call_next = MagicMock(return_value=mock_response)
+    request_data = {"url": "http://test.com/big", "method": "POST", "json": {"payload": "y" * 100},
+                    "_api_meta": {"class_name": "BigAPI"}}
+
+    structured_logging_middleware(request_data, mock_call_next)
+
+    mock_response.json.assert_not_called()
+    log_output = mock_logger.info.call_args[0][0]
+    assert f"[已省略 {len(body) - 20} 字节]" in log_output
+    assert "y" * 100 not in log_output
+    allure_json_content = json.loads(mock_allure_attach.call_args[0][0])
+    assert allure_json_content['response']['body'].startswith('{"items": ')
+    assert "已省略" in allure_json_content['request']['json']
+
+
+def test_log_failure_not_truncated(log_options, mock_logger, mock_get_level, mock_allure_attach):
+    """测试：失败请求完整记录，不截断也不采样"""
+    log_options(max_body_size=10, sample_rate=100)
+    body = b'{"error": "' + b"e" * 100 + b'"}'
+    mock_call_next = MagicMock(return_value=MockResponse(status_code=500, content=body))
+    request_data = {"url": "http://test.com/fail", "method": "GET", "_api_meta": {"class_name": "FailAPI"}}
+
+    for _ in range(3):
+        structured_logging_middleware(request_data, mock_call_next)
+
+    assert mock_logger.info.call_count == 3
+    assert "e" * 100 in mock_logger.info.call_args[0][0]
+
+
+def test_log_sampling_success(log_options, mock_logger, mock_get_level, mock_allure_attach):
+    """测试：成功请求按 1/N 采样输出日志和 allure 附件，未采样的请求不解析响应体"""
+    log_options(sample_rate=4)
+    mock_response = MockResponse(status_code=200, content=b'{}')
+    mock_call_next = MagicMock(return_value=mock_response)
+    request_data = {"url": "http://test.com/sample", "method": "GET", "_api_meta": {"class_name": "SampleAPI"}}
+
+    for _ in range(8):
+        structured_logging_middleware(request_data, mock_call_next)
+
+    assert mock_logger.info.call_count == 2
+    assert mock_allure_attach.call_count == 2
+    assert mock_response.json.call_count == 2
+
+
+def test_log_skips_binary(mock_logger, mock_get_level, mock_allure_attach):
+    """测试：二进制响应与请求体只记录类型和大小"""
+    mock_response = MockResponse(status_code=200, content=b'\x89PNG\x00\x01\x02')
+    mock_response.headers = {"Content-Type": "image/png"}
+    mock_call_next = MagicMock(return_value=mock_response)
+    request_data = {"url": "http://test.com/img", "method": "PUT", "data": b"\x00\x01",
+                    "_api_meta": {"class_name": "ImageAPI"}}
+
+    structured_logging_middleware(request_data, mock_call_next)
+
+    mock_response.json.assert_not_called()
+    log_output = mock_logger.info.call_args[0][0]
+    assert "Response Body: [二进制内容] image/png, 7 字节" in log_output
+    assert "Request Data: [二进制内容] 未知类型, 2 字节" in log_output
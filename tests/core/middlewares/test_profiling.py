@@ -0,0 +1,81 @@
+import time
+from functools import partial
+
+import pytest
+
+from aomaker.core.latency import LatencyHistogram
+from aomaker.core.middlewares.profiling import profiled, summarize, timer
+from aomaker.core.middlewares.registry import middleware, registry
+from aomaker.storage import MiddlewareTiming
+
+
+@pytest.fixture(autouse=True)
+def reset_profiling():
+    timer.drain()
+    yield
+    registry.enable_profiling(False)
+    timer.drain()
+
+
+@middleware(name="slow_signing", priority=20)
+def slow_signing(request, call_next):
+    time.sleep(0.02)
+    return call_next(request)
+
+
+@middleware(name="fast_tracing", priority=10)
+def fast_tracing(request, call_next):
+    return call_next(request)
+
+
+def _run_chain(middlewares, request):
+    def send(req):
+        time.sleep(0.05)
+        return "response"
+
+    call_next = send
+    for mw in reversed(middlewares):
+        call_next = partial(mw, call_next=call_next)
+    return call_next(request)
+
+
+def test_profiled_excludes_call_next():
+    chain = [profiled("slow_signing", slow_signing), profiled("fast_tracing", fast_tracing)]
+    assert _run_chain(chain, {}) == "response"
+
+    hists = timer.drain()
+    assert 15 < hists["slow_signing"].max < 45
+    assert hists["fast_tracing"].max < 10
+
+
+def test_registry_enable_profiling_wraps_active_middlewares():
+    registry.register(slow_signing, **slow_signing.middleware_config)
+    registry.register(fast_tracing, **fast_tracing.middleware_config)
+    assert registry.active_middlewares == [slow_signing, fast_tracing]
+
+    registry.enable_profiling()
+    assert [mw.__wrapped_middleware__ for mw in registry.active_middlewares] == [slow_signing, fast_tracing]
+    _run_chain(registry.active_middlewares, {})
+    _run_chain(registry.active_middlewares, {})
+
+    timings = {item["name"]: item for item in registry.get_timings()}
+    assert timings["slow_signing"]["count"] == 2
+    assert registry.get_timings()[0]["name"] == "slow_signing"
+
+    registry.enable_profiling(False)
+    assert registry.active_middlewares == [slow_signing, fast_tracing]
+
+
+def test_middleware_timing_storage_merges_workers(tmp_path):
+    db = MiddlewareTiming(db_path=str(tmp_path / "timing.db"))
+    try:
+        for worker, values in (("gw0", [1, 2]), ("gw1", [3])):
+            hist = LatencyHistogram()
+            hist.extend(values)
+            db.merge("signing", worker, hist)
+        rows = summarize(db.get_histograms())
+        assert rows[0]["name"] == "signing"
+        assert rows[0]["count"] == 3
+        assert rows[0]["total"] == 6
+    finally:
+        db.close()
@@ -0,0 +1,187 @@
+import multiprocessing
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from aomaker.core.middlewares import rate_limit_middleware as rate_limit_mod
+from aomaker.core.middlewares.rate_limit_middleware import (
+    Budget,
+    LocalBackend,
+    RateLimiter,
+    SharedBackend,
+    create_shared_state,
+    install_shared_state,
+)
+
+
+def _request(class_name="GetUser", route="/api/users", url="http://api.example.com/api/users"):
+    return {"method": "GET", "url": url, "_api_meta": {"class_name": class_name, "route": route, "method": "GET"}}
+
+
+def test_gcra_reservations_are_paced():
+    backend = LocalBackend()
+    results = [backend.try_reserve("b", interval=0.1, burst=3, at=100.0) for _ in range(4)]
+    assert results[:3] == [None, None, None]
+    assert results[3] == pytest.approx(100.1)
+    # 没有放行的预约不占用时间片
+    assert backend.try_reserve("b", interval=0.1, burst=3, at=100.1) is None
+
+
+@pytest.fixture
+def shared_state(monkeypatch):
+    monkeypatch.setattr(rate_limit_mod, "_tats", {})
+    monkeypatch.setattr(rate_limit_mod, "_semaphores", {})
+    yield
+
+
+def test_shared_reservations_use_process_shared_value(shared_state):
+    install_shared_state({"tats": {"host:a": multiprocessing.Value("d", 0.0)}})
+    first, second = SharedBackend(), SharedBackend()
+    assert first.try_reserve("host:a", 0.5, 1, 10.0) is None
+    assert second.try_reserve("host:a", 0.5, 1, 10.0) == pytest.approx(10.5)
+    assert rate_limit_mod._tats["host:a"].value == pytest.approx(10.5)
+
+
+def test_shared_state_created_for_shared_budgets():
+    limiter = RateLimiter(hosts={"h": Budget(rate=5, concurrency=3)},
+                          endpoints={"A": Budget(concurrency=1), "B": Budget(rate=1)},
+                          backend=SharedBackend())
+    state = create_shared_state(limiter)
+    assert sorted(state["tats"]) == ["endpoint:B", "host:h"]
+    assert sorted(state["semaphores"]) == ["endpoint:A", "host:h"]
+    local = RateLimiter(endpoints={"A": Budget(concurrency=1)}, backend=LocalBackend())
+    assert create_shared_state(local) == {"tats": {}, "semaphores": {}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now, sleeps = [0.0], []
+    monkeypatch.setattr(rate_limit_mod, "time", SimpleNamespace(time=lambda: now[0], sleep=sleeps.append))
+    yield now, sleeps
+
+
+def test_looser_budget_reserved_when_stricter_grants(clock):
+    now, sleeps = clock
+    limiter = RateLimiter(hosts={"h": Budget(rate=10)}, endpoints={"Strict": Budget(rate=1)})
+    strict = limiter.budgets_for(_request("Strict", url="http://h/x"))
+    limiter.acquire(strict)
+    limiter.acquire(strict)
+    assert sleeps == [pytest.approx(1.0)]
+    # 第二个请求在 1.0 发出，host 的时间片也占在 1.0，同一时刻同 host 的其他请求需要顺延
+    now[0] = 1.0
+    limiter.acquire(limiter.budgets_for(_request("Other", url="http://h/y")))
+    assert sleeps[1] == pytest.approx(0.1)
+
+
+def test_reservations_refunded_when_later_budget_is_stricter(clock):
+    limiter = RateLimiter(hosts={"h": Budget(rate=1)}, endpoints={"Loose": Budget(rate=10)})
+    loose = limiter.budgets_for(_request("Loose", url="http://h/x"))
+    assert [name for name, _ in loose] == ["endpoint:Loose", "host:h"]
+    limiter.acquire(loose)
+    limiter.acquire(loose)
+    assert clock[1] == [pytest.approx(1.0)]
+    assert limiter.backend._tat["endpoint:Loose"] == pytest.approx(1.1)
+
+
+_counters = {}
+
+
+def _init_worker(shared, active, peak):
+    install_shared_state({"semaphores": shared})
+    _counters.update(active=active, peak=peak)
+
+
+def _hold_slot(budget):
+    active, peak = _counters["active"], _counters["peak"]
+    backend = SharedBackend()
+    backend.acquire(budget, 2)
+    try:
+        with active.get_lock():
+            active.value += 1
+            peak.value = max(peak.value, active.value)
+        time.sleep(0.05)
+        with active.get_lock():
+            active.value -= 1
+    finally:
+        backend.release(budget)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="需要 fork 启动方式")
+def test_shared_concurrency_blocks_across_processes(shared_state):
+    ctx = multiprocessing.get_context("fork")
+    shared = {"endpoint:GetUser": ctx.BoundedSemaphore(2)}
+    active, peak = ctx.Value("i", 0), ctx.Value("i", 0)
+    with ctx.Pool(4, initializer=_init_worker, initargs=(shared, active, peak)) as pool:
+        pool.map(_hold_slot, ["endpoint:GetUser"] * 8)
+        pool.close()
+        pool.join()
+    assert peak.value == 2
+
+
+def test_shared_backend_without_semaphore_limits_in_process(shared_state):
+    backend = SharedBackend()
+    backend.acquire("b", 1)
+    waiter = threading.Thread(target=backend.acquire, args=("b", 1))
+    waiter.start()
+    waiter.join(0.05)
+    assert waiter.is_alive()
+    backend.release("b")
+    waiter.join(1)
+    assert not waiter.is_alive()
+    backend.release("b")
+
+
+def test_budgets_resolved_by_host_and_endpoint():
+    limiter = RateLimiter(hosts={"*.example.com": Budget(rate=10)},
+                          endpoints={"Create*": Budget(rate=1), "/api/report/*": Budget(concurrency=1)})
+    assert [name for name, _ in limiter.budgets_for(_request())] == ["host:*.example.com"]
+    names = [name for name, _ in limiter.budgets_for(_request("CreateOrder", "/api/orders"))]
+    assert names == ["endpoint:Create*", "host:*.example.com"]
+    assert [name for name, _ in limiter.budgets_for(_request("Report", "/api/report/{id}", "http://other/x"))] == \
+           ["endpoint:/api/report/*"]
+
+
+def test_concurrency_limit_enforced_across_threads():
+    limiter = RateLimiter(endpoints={"GetUser": Budget(concurrency=2)})
+    budgets = limiter.budgets_for(_request())
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        held = limiter.acquire(budgets)
+        try:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+        finally:
+            limiter.release(held)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+
+
+def test_from_options_and_validation():
+    limiter = RateLimiter.from_options({"hosts": {"h": {"rate": 5, "burst": 2}}, "shared": True})
+    assert isinstance(limiter.backend, SharedBackend)
+    assert limiter.hosts["h"] == Budget(rate=5, burst=2)
+    assert isinstance(RateLimiter.from_options({"shared": False}).backend, LocalBackend)
+    with pytest.raises(ValueError):
+        RateLimiter.from_options({"unknown": 1})
+    with pytest.raises(ValueError):
+        Budget(burst=0)
+
+
+def test_invalid_options_rejected_at_config():
+    from aomaker.core.middlewares.registry import registry, register_internal_middlewares
+    register_internal_middlewares()
+    with pytest.raises(ValueError, match="rate_limit_middleware"):
+        registry.apply_config({"rate_limit_middleware": {"options": {"hosts": {"h": {"burst": 0}}}}})
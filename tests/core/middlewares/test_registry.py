@@ -1,12 +1,15 @@
 import pytest
 import yaml
 from unittest.mock import patch, MagicMock, call
+import os
 import sys
 from pathlib import Path
 
 
 from aomaker.core.middlewares.registry import (
     MiddlewareConfig,
+    MiddlewareMatch,
+    chain_key,
     middleware,
     registry as global_registry,
     apply_middleware_config,
@@ -389,4 +392,116 @@ def test_init_middlewares_no_scan_dir(
         mock_exists.assert_called_once_with(mock_dir_path)
         mock_scan.assert_not_called() # Scan should not be called
         mock_load_config.assert_called_once_with()
-        mock_apply_config.assert_called_once_with({}) 
\ No newline at end of file
+        mock_apply_config.assert_called_once_with({}) 
+
+@middleware(name="mw_sign", priority=50, match={"route": "/api/pay/*", "method": "post"})
+def sample_sign_middleware(request, call_next):
+    return call_next(request)
+
+
+def test_match_rule_parsing_and_matching():
+    rule = MiddlewareMatch.model_validate({"api": "Create*", "method": ["post", "put"], "tag": "pay"})
+    assert rule.api == ["Create*"]
+    assert rule.method == ["POST", "PUT"]
+    assert not rule.is_global
+    assert rule.matches(chain_key({"class_name": "CreateOrder", "method": "POST", "tags": ("pay",)}))
+    assert not rule.matches(chain_key({"class_name": "CreateOrder", "method": "GET", "tags": ("pay",)}))
+    assert not rule.matches(chain_key({"class_name": "CreateOrder", "method": "POST"}))
+    assert not rule.matches(chain_key({"class_name": "DeleteOrder", "method": "POST", "tags": ("pay",)}))
+    assert MiddlewareMatch().is_global
+
+
+def test_registry_get_chain_filters_by_match(fresh_registry):
+    reg = fresh_registry
+    reg.register(sample_sign_middleware, **sample_sign_middleware.middleware_config)
+    reg.register(sample_middleware_default, **sample_middleware_default.middleware_config)
+
+    pay_meta = {"class_name": "Pay", "route": "/api/pay/{id}", "method": "POST"}
+    assert reg.get_chain(pay_meta) == [sample_sign_middleware, sample_middleware_default]
+    assert reg.get_chain({"class_name": "GetUser", "route": "/api/users", "method": "GET"}) == [sample_middleware_default]
+    # 同一个接口类复用同一条链
+    assert reg.get_chain(pay_meta) is reg.get_chain(dict(pay_meta))
+
+
+def test_registry_apply_config_match_rebuilds_chain(fresh_registry):
+    reg = fresh_registry
+    reg.register(sample_middleware_default, **sample_middleware_default.middleware_config)
+    meta = {"class_name": "GetUser", "route": "/api/users", "method": "GET"}
+    assert reg.get_chain(meta) == [sample_middleware_default]
+    version = reg.version
+
+    reg.apply_config({"mw_default": {"match": {"api": ["CreateOrder"]}}})
+    assert reg.middleware_configs["mw_default"].match.api == ["CreateOrder"]
+    assert reg.version > version
+    assert reg.get_chain(meta) == []
+    assert reg.get_chain({"class_name": "CreateOrder"}) == [sample_middleware_default]
+
+
+@pytest.fixture
+def project_middlewares(tmp_path, monkeypatch):
+    """临时项目中的 middlewares 包，manifest 写到临时目录"""
+    # 其他用例可能 reload 过 registry 模块，这里始终使用模块当前的全局注册表
+    import aomaker.core.middlewares.registry as reg_mod
+    mw_dir = tmp_path / "middlewares"
+    mw_dir.mkdir()
+    (mw_dir / "__init__.py").touch()
+    (mw_dir / "sign.py").write_text("""
+from aomaker.core.middlewares.registry import middleware
+@middleware(name='project_sign', priority=5, match={'method': 'POST'})
+def sign(request, call_next):
+    return call_next(request)
+""")
+    (mw_dir / "middlewares.yaml").write_text("project_sign:\n  priority: 7\n")
+    manifest_path = tmp_path / "database" / "middlewares_manifest.json"
+    monkeypatch.setattr(reg_mod, 'load_middleware_config',
+                        lambda config_path=None: yaml.safe_load((mw_dir / "middlewares.yaml").read_text()))
+    monkeypatch.setattr(reg_mod, 'MIDDLEWARES_DIR', str(mw_dir))
+    monkeypatch.setattr(reg_mod, 'MIDDLEWARE_MANIFEST_PATH', str(manifest_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _reset_process_state(reg_mod.registry)
+    yield reg_mod, mw_dir, manifest_path
+    _reset_process_state(reg_mod.registry)
+    for mod_name in [m for m in sys.modules if m == "middlewares" or m.startswith("middlewares.")]:
+        del sys.modules[mod_name]
+
+
+def _reset_process_state(reg):
+    """模拟一个新进程：注册表为空且未初始化"""
+    reg.middleware_configs.clear()
+    reg.initialized = False
+    reg._rebuild_active_middlewares()
+
+
+def test_init_middlewares_runs_once_and_uses_manifest(project_middlewares):
+    reg_mod, mw_dir, manifest_path = project_middlewares
+    reg = reg_mod.registry
+
+    reg_mod.init_middlewares()
+    assert "project_sign" in reg.middleware_configs
+    assert manifest_path.exists()
+
+    with patch.object(reg_mod.MiddlewareRegistry, 'scan_middlewares') as mock_scan:
+        reg_mod.init_middlewares()
+        mock_scan.assert_not_called()
+
+        _reset_process_state(reg)
+        reg_mod.init_middlewares()
+        mock_scan.assert_not_called()
+
+    cfg = reg.middleware_configs["project_sign"]
+    assert cfg.priority == 7  # yaml 配置也来自 manifest
+    assert cfg.match.method == ["POST"]
+    assert reg.get_chain({"class_name": "GetUser", "method": "GET"}).count(cfg.middleware) == 0
+
+
+def test_init_middlewares_rescans_when_files_change(project_middlewares):
+    reg_mod, mw_dir, _ = project_middlewares
+    reg_mod.init_middlewares()
+
+    sign_file = mw_dir / "sign.py"
+    stat = sign_file.stat()
+    os.utime(sign_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    _reset_process_state(reg_mod.registry)
+    with patch.object(reg_mod.MiddlewareRegistry, 'scan_middlewares') as mock_scan:
+        reg_mod.init_middlewares()
+    mock_scan.assert_called_once_with("middlewares")
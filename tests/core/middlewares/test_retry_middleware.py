@@ -0,0 +1,174 @@
+import pytest
+import requests
+
+from aomaker.core.http_client import CachedResponse
+from aomaker.core.middlewares import retry_middleware as retry_mod
+from aomaker.core.middlewares.latency_middleware import LatencyRecorder, recorder
+from aomaker.core.middlewares.retry_middleware import (
+    RetryBudget,
+    RetryOptions,
+    parse_retry_after,
+    retry_middleware,
+)
+from aomaker.storage import RetryStats
+
+
+class FlakyServer:
+    """按顺序返回预设的状态码或抛出异常"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        request.pop("_api_meta", None)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        raw = requests.Response()
+        raw.status_code = status
+        raw.headers = requests.structures.CaseInsensitiveDict(headers)
+        raw._content = b"{}"
+        return CachedResponse(raw)
+
+
+def _request(method="GET", retry=None):
+    return {"method": method, "url": "http://api/orders",
+            "_api_meta": {"class_name": "Orders", "method": method, "retry": retry}}
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+    monkeypatch.setattr(retry_mod.time, "sleep", waited.append)
+    return waited
+
+
+@pytest.fixture
+def options(monkeypatch):
+    def apply(**kwargs):
+        opts = RetryOptions(**{"max_retries": 3, "backoff_base": 0.01, **kwargs})
+        retry_mod.budget.reset(opts.budget_ratio, opts.budget_min)
+        monkeypatch.setattr(retry_mod, "get_retry_options", lambda: opts)
+        return opts
+
+    yield apply
+    retry_mod.budget.reset(0.1, 10)
+    recorder.drain_retries()
+
+
+def test_retries_status_then_succeeds(options, sleeps):
+    options()
+    server = FlakyServer(503, 502, 200)
+    request = _request()
+    response = retry_middleware(request, call_next=server)
+
+    assert response.status_code == 200
+    assert server.calls == 3
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 0.02 for delay in sleeps)
+    assert request["_api_meta"]["retries"] == 2
+    assert request["_api_meta"]["retry_delay_ms"] >= 0
+    (_, api_name), (retries, hist) = next(iter(recorder.drain_retries().items()))
+    assert (api_name, retries, hist.count) == ("Orders", 2, 1)
+
+
+def test_connection_error_retried_and_reraised(options, sleeps):
+    options(max_retries=2)
+    server = FlakyServer(requests.ConnectionError("down"), requests.Timeout("slow"), requests.ConnectionError("x"))
+    with pytest.raises(requests.ConnectionError):
+        retry_middleware(_request(), call_next=server)
+    assert server.calls == 3
+
+
+def test_non_idempotent_requires_opt_in(options, sleeps):
+    options()
+    server = FlakyServer(503, 503, 200)
+    assert retry_middleware(_request("POST"), call_next=server).status_code == 503
+    assert retry_middleware(_request("POST", retry=True), call_next=server).status_code == 200
+    assert server.calls == 3
+    assert retry_middleware(_request("GET", retry=False), call_next=FlakyServer(503)).status_code == 503
+
+
+def test_retry_after_respected_and_capped(options, sleeps):
+    options(max_retry_after=5)
+    server = FlakyServer((429, {"Retry-After": "2"}), (429, {"Retry-After": "60"}))
+    assert retry_middleware(_request(), call_next=server).status_code == 429
+    assert sleeps == [2.0]
+    assert server.calls == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3", 0) == 3
+    assert parse_retry_after("Thu, 01 Jan 1970 00:01:40 GMT", 90) == 10
+    assert parse_retry_after("garbage", 0) is None
+    assert parse_retry_after(None, 0) is None
+
+
+def test_budget_stops_retry_storm(options, sleeps):
+    options(max_retries=5, budget_min=2, budget_ratio=0)
+    server = FlakyServer(*[503] * 10)
+    retry_middleware(_request(), call_next=server)
+    assert server.calls == 3
+    retry_middleware(_request(), call_next=server)
+    assert server.calls == 4
+    assert retry_mod.budget.exhausted == 2
+
+
+def test_budget_refills_with_traffic():
+    budget = RetryBudget(ratio=0.5, minimum=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_disabled_by_default(sleeps):
+    server = FlakyServer(503)
+    assert retry_middleware(_request(), call_next=server).status_code == 503
+    assert not sleeps
+
+
+def test_retry_stats_flushed(tmp_path, monkeypatch):
+    db = RetryStats(db_path=str(tmp_path / "retry.db"))
+    monkeypatch.setattr("aomaker.storage.retry_stats", db)
+    rec = LatencyRecorder()
+    rec.record_retry("Orders", 2, 150)
+    rec.record_retry("Orders", 1, 50)
+    rec.flush()
+    try:
+        [row] = db.summary()
+        assert row["api_name"] == "Orders"
+        assert row["retries"] == 3
+        assert row["retried_calls"] == 2
+        assert row["added_total"] == pytest.approx(200, rel=0.02)
+    finally:
+        db.close()
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        RetryOptions.from_dict({"max_retries": -1})
+    with pytest.raises(ValueError):
+        RetryOptions.from_dict({"retries": 1})
+
+
+def test_invalid_options_rejected_at_config():
+    from aomaker.core.middlewares.registry import registry, register_internal_middlewares
+    register_internal_middlewares()
+    with pytest.raises(ValueError, match="retry_middleware"):
+        registry.apply_config({"retry_middleware": {"options": {"max_retries": -1}}})
+
+
+def test_options_cached_without_config(monkeypatch):
+    from aomaker.core.middlewares.registry import registry
+    monkeypatch.delitem(registry.middleware_configs, retry_mod.MIDDLEWARE_NAME, raising=False)
+    monkeypatch.setitem(retry_mod._resolved, "source", retry_mod._UNRESOLVED)
+    reset = []
+    monkeypatch.setattr(retry_mod.budget, "reset", lambda *args: reset.append(args))
+    options = retry_mod.get_retry_options()
+    assert retry_mod.get_retry_options() is options
+    assert reset == [(options.budget_ratio, options.budget_min)]
@@ -396,6 +396,20 @@ class TestSendLogic:
         assert ao_response.response_model is None # 流式响应模型为 None
         assert ao_response.is_stream is True
 
+    def test_send_without_structure(self, api_instance: BaseAPIObject[DummyResponse]):
+        """测试 structure=False 时跳过 schema 校验与结构化"""
+        api_instance.converter.convert.return_value = {"url": "http://test.com/test/endpoint", "method": "GET"} # type: ignore
+        mock_cached_response = MagicMock(spec=['json', 'status_code', 'headers', 'text', 'content'])
+        mock_cached_response.json.return_value = {"data": [{"id": 1}]}
+        api_instance.http_client.send_request.return_value = mock_cached_response # type: ignore
+
+        ao_response = api_instance.send(structure=False)
+
+        api_instance.converter.structure.assert_not_called() # type: ignore
+        self.mock_validate.assert_not_called()
+        assert ao_response.response_model is None
+        assert ao_response.columns("id", backend="array").sum("id") == 1
+
     def test_send_call_dunder(self, api_instance: BaseAPIObject[DummyResponse]):
         """测试 __call__ 方法等同于调用 send"""
         # 使用 patch 监控 send 方法
@@ -0,0 +1,153 @@
+import gzip
+import json
+import threading
+from unittest.mock import patch
+
+import allure
+import pytest
+from allure_commons import hookimpl, plugin_manager
+
+from aomaker.core.attachment_writer import AttachmentWriter, GZIP_MIME_TYPE
+
+
+class FakeReporter:
+    def __init__(self):
+        self.attachments = []
+        self.threads = []
+
+    def _attach(self, uuid, name=None, attachment_type=None, extension=None):
+        self.attachments.append((name, attachment_type))
+        self.threads.append(threading.current_thread())
+        return f"{uuid}-attachment.{extension}"
+
+
+class FakeListener:
+    def __init__(self):
+        self.allure_logger = FakeReporter()
+
+
+class FakeAttachHook:
+    @hookimpl
+    def attach_data(self, body, name, attachment_type, extension):
+        pass
+
+
+class FakeFileLogger:
+    def __init__(self, report_dir):
+        self._report_dir = report_dir
+
+
+@pytest.fixture
+def allure_env(tmp_path):
+    listener = FakeListener()
+    file_logger = FakeFileLogger(str(tmp_path))
+    plugin_manager.register(listener)
+    plugin_manager.register(file_logger)
+    yield listener.allure_logger, tmp_path
+    plugin_manager.unregister(listener)
+    plugin_manager.unregister(file_logger)
+
+
+@pytest.fixture
+def writer():
+    w = AttachmentWriter(maxsize=4)
+    yield w
+    w.close()
+
+
+def test_attach_registers_on_caller_and_writes_in_background(allure_env, writer):
+    reporter, report_dir = allure_env
+    writer.dedup = False
+    writer.attach(json.dumps({"a": 1}), name="api", attachment_type=allure.attachment_type.JSON)
+    writer.flush()
+
+    assert reporter.attachments == [("api", "application/json")]
+    assert reporter.threads == [threading.current_thread()]
+    files = list(report_dir.glob("*-attachment.json"))
+    assert len(files) == 1
+    assert json.loads(files[0].read_text()) == {"a": 1}
+
+
+def test_attach_dedup_writes_once(allure_env, writer):
+    reporter, report_dir = allure_env
+    for _ in range(10):
+        writer.attach("same body", name="dup")
+    writer.attach("other body", name="dup")
+    writer.flush()
+
+    assert len(reporter.attachments) == 11
+    assert len(list(report_dir.glob("*-attachment.txt"))) == 2
+
+
+def test_attach_compress_large_body(allure_env, writer):
+    reporter, report_dir = allure_env
+    writer.configure(compress_size=100)
+    writer.attach("x" * 1000, name="big", attachment_type=allure.attachment_type.JSON)
+    writer.attach("small", name="small", attachment_type=allure.attachment_type.JSON)
+    writer.flush()
+
+    assert reporter.attachments[0] == ("big", GZIP_MIME_TYPE)
+    compressed = list(report_dir.glob("*-attachment.json.gz"))
+    assert len(compressed) == 1
+    assert gzip.decompress(compressed[0].read_bytes()) == b"x" * 1000
+    assert len(list(report_dir.glob("*-attachment.json"))) == 1
+
+
+def test_attach_falls_back_without_allure(writer):
+    with patch("aomaker.core.attachment_writer.allure.attach") as mock_attach:
+        writer.attach("body", name="sync")
+    mock_attach.assert_called_once_with("body", name="sync", attachment_type=allure.attachment_type.TEXT)
+    assert writer._thread is None
+
+
+def test_reporter_resolved_once(allure_env, writer):
+    _, report_dir = allure_env
+    with patch("aomaker.core.attachment_writer.plugin_manager.get_plugins",
+               wraps=plugin_manager.get_plugins) as get_plugins:
+        for i in range(5):
+            writer.attach(f"body {i}", name="n")
+        assert get_plugins.call_count == 1
+        writer.reset()
+        writer.attach("again", name="n")
+        assert get_plugins.call_count == 2
+    writer.flush()
+    assert len(list(report_dir.glob("*-attachment.txt"))) == 6
+
+
+def test_incompatible_private_api_falls_back(allure_env, writer):
+    reporter, _ = allure_env
+    reporter._attach = lambda uuid: None
+    with patch("aomaker.core.attachment_writer.allure.attach") as mock_attach:
+        writer.attach("body", name="a")
+        writer.attach("body", name="b")
+    assert mock_attach.call_count == 2
+    assert writer._thread is None
+
+
+def test_configure_invalid_compress_size(writer):
+    with pytest.raises(ValueError):
+        writer.configure(compress_size=-1)
+
+
+def test_close_drains_queue(allure_env, writer):
+    _, report_dir = allure_env
+    writer.dedup = False
+    for i in range(20):
+        writer.attach(f"body {i}", name="n")
+    writer.close()
+    assert len(list(report_dir.glob("*-attachment.txt"))) == 20
+
+
+def test_reporter_active_resolved_per_session(writer):
+    hook = FakeAttachHook()
+    plugin_manager.register(hook)
+    try:
+        writer.reset()
+        assert writer.reporter_active()
+        plugin_manager.unregister(hook)
+        assert writer.reporter_active()
+        writer.reset()
+        assert writer.reporter_active() is bool(plugin_manager.hook.attach_data.get_hookimpls())
+    finally:
+        if plugin_manager.is_registered(hook):
+            plugin_manager.unregister(hook)
@@ -1,8 +1,11 @@
+from typing import List, Optional
+
 import pytest
-from attrs import asdict
+from attrs import asdict, define, field
 from attrs.exceptions import FrozenInstanceError
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
+from aomaker.core import base_model
 from aomaker.core.base_model import (
     HTTPMethod,
     ContentType,
@@ -164,8 +167,8 @@ def test_process_stream_lines():
 
 
 def test_process_stream_json():
-    data = [{'a': 1}, None, {'b': 2}]
-    raw, fake_cached = make_fake_response(data, 'iter_json')
+    data = [b'[{"a": 1}, ', b'{"b"', b': 2}]']
+    raw, fake_cached = make_fake_response(data, 'iter_content')
     ao = AoResponse(cached_response=fake_cached, is_stream=True)
     called = []
     result = ao.process_stream(stream_mode='json', callback=called.append)
@@ -173,6 +176,15 @@ def test_process_stream_json():
     raw.close.assert_called_once()
 
 
+def test_process_stream_json_with_path():
+    data = [b'{"data": {"items": [1, 2', b', 3]}}']
+    raw, fake_cached = make_fake_response(data, 'iter_content')
+    ao = AoResponse(cached_response=fake_cached, is_stream=True)
+    called = []
+    ao.process_stream(stream_mode='json', callback=called.append, json_path='data.items[*]')
+    assert called == [1, 2, 3]
+
+
 def test_process_stream_content():
     data = [b'c1', b'', b'c2']
     raw, fake_cached = make_fake_response(data, 'iter_content')
@@ -182,7 +194,179 @@ def test_process_stream_content():
     assert called == [b'c1', b'c2']
     raw.close.assert_called_once()
 
-# 7. attrs 序列化测试
+# 7. AoResponse.iter_json 测试
+@define
+class StreamItem:
+    id: int
+    type_: str = field(metadata={"original_name": "type"})
+
+
+@define
+class StreamData:
+    items: List[StreamItem] = field(factory=list)
+
+
+@define
+class StreamResponse:
+    data: Optional[StreamData] = field(default=None)
+
+
+def test_iter_json_infers_item_type_from_response_model():
+    data = [b'{"data": {"items": [{"id": 1, "type": "a"}', b', {"id": 2, "type": "b"}]}}']
+    raw, fake_cached = make_fake_response(data, 'iter_content')
+    ao = AoResponse(cached_response=fake_cached, is_stream=True, response_type=StreamResponse)
+
+    items = list(ao.iter_json("data.items[*]"))
+
+    assert items == [StreamItem(id=1, type_="a"), StreamItem(id=2, type_="b")]
+    raw.close.assert_called_once()
+
+
+def test_iter_json_raw_items_when_type_unknown():
+    raw, fake_cached = make_fake_response([b'{"rows": [{"id": 1}]}'], 'iter_content')
+    ao = AoResponse(cached_response=fake_cached, is_stream=True, response_type=StreamResponse)
+    assert list(ao.iter_json("rows[*]")) == [{"id": 1}]
+
+
+def test_iter_json_explicit_item_type():
+    raw, fake_cached = make_fake_response([b'[{"id": 3, "type": "c"}]'], 'iter_content')
+    ao = AoResponse(cached_response=fake_cached, is_stream=True)
+    assert list(ao.iter_json(item_type=StreamItem)) == [StreamItem(id=3, type_="c")]
+
+
+def test_iter_json_not_stream():
+    raw, fake_cached = make_fake_response([], 'iter_content')
+    ao = AoResponse(cached_response=fake_cached)
+    with pytest.raises(ValueError):
+        list(ao.iter_json())
+
+# 8. AoResponse 查询测试
+@define
+class QueryOwner:
+    id: int
+
+
+@define
+class QueryItem:
+    id: int
+    status: str
+    owner: Optional[QueryOwner] = field(default=None)
+
+
+@define
+class QueryResponse:
+    data: List[QueryItem] = field(factory=list)
+    total: int = field(default=0)
+
+
+def make_query_response():
+    rows = [
+        QueryItem(id=1, status="running", owner=QueryOwner(id=10)),
+        QueryItem(id=2, status="stopped", owner=QueryOwner(id=10)),
+        QueryItem(id=3, status="running", owner=QueryOwner(id=20)),
+    ]
+    return AoResponse(cached_response=Mock(), response_model=QueryResponse(data=rows, total=3))
+
+
+def test_query_first_and_exists():
+    ao = make_query_response()
+    assert ao.first().id == 1
+    assert ao.first(status="stopped").id == 2
+    assert ao.first(status="unknown") is None
+    assert ao.exists()
+    assert ao.exists(owner__id=20)
+    assert not ao.exists(status="unknown")
+
+
+def test_query_empty_list():
+    ao = AoResponse(cached_response=Mock(), response_model=QueryResponse())
+    assert ao.first() is None
+    assert not ao.exists()
+    assert ao.find(status="running") == []
+
+
+def test_query_filter_returns_new_response():
+    ao = make_query_response()
+    running = ao.filter(lambda item: item.status == "running")
+    assert [item.id for item in running.items()] == [1, 3]
+    assert running.response_model.total == 3
+    assert running.cached_response is ao.cached_response
+    assert len(ao.items()) == 3
+
+
+def test_query_top_level_list():
+    ao = AoResponse(cached_response=Mock(), response_model=[{"id": 1}, {"id": 2}])
+    assert ao.first() == {"id": 1}
+    assert ao.find(id=2) == [{"id": 2}]
+    assert ao.filter(lambda row: row["id"] > 1).response_model == [{"id": 2}]
+
+
+def test_query_nested_path_and_original_name():
+    model = StreamResponse(data=StreamData(items=[StreamItem(id=1, type_="a"), StreamItem(id=2, type_="b")]))
+    ao = AoResponse(cached_response=Mock(), response_model=model)
+    assert ao.find(path="data.items[*]", type="b") == [StreamItem(id=2, type_="b")]
+    filtered = ao.filter(lambda item: item.id == 1, path="data.items[*]")
+    assert filtered.response_model.data.items == [StreamItem(id=1, type_="a")]
+    assert len(model.data.items) == 2
+
+
+def test_query_index_built_once():
+    ao = make_query_response()
+    index = ao.index_by("status")
+    assert [item.id for item in index["running"]] == [1, 3]
+    assert ao.index_by("status") is index
+
+    ao.response_model.data.append(QueryItem(id=4, status="running"))
+    # 索引已缓存，重复查找不会重新扫描列表
+    assert [item.id for item in ao.find(status="running")] == [1, 3]
+
+
+def test_query_find_multiple_criteria():
+    ao = make_query_response()
+    assert [item.id for item in ao.find(status="running", owner__id=10)] == [1]
+    assert ao.find(status="stopped", owner__id=20) == []
+
+
+def test_query_without_response_model_uses_raw_json():
+    cached = Mock()
+    cached.json = Mock(return_value={"data": [{"id": 1, "tags": ["a"]}, {"id": 2, "tags": ["b"]}]})
+    ao = AoResponse(cached_response=cached)
+    assert [row["id"] for row in ao.items()] == [1, 2]
+    assert ao.first(id=2) == {"id": 2, "tags": ["b"]}
+    assert ao.filter(lambda row: row["id"] == 1).items() == [{"id": 1, "tags": ["a"]}]
+    with pytest.raises(ValueError, match="响应中不存在路径"):
+        ao.items("rows[*]")
+
+
+def test_query_unhashable_criteria():
+    ao = AoResponse(cached_response=Mock(), response_model=[{"id": 1, "tags": ["a"]}, {"id": 2, "tags": ["b"]}])
+    assert ao.find(tags=["b"]) == [{"id": 2, "tags": ["b"]}]
+    assert ao.exists(id=1, tags=["a"])
+    assert not ao.exists(id=1, tags=["b"])
+    with pytest.raises(TypeError, match="不可哈希"):
+        ao.index_by("tags")
+    # 不可哈希的结果已缓存，之后的查询直接逐行比对，不再尝试建立索引
+    with patch("aomaker.core.base_model._get_nested", wraps=base_model._get_nested) as get_nested:
+        with pytest.raises(TypeError, match="不可哈希"):
+            ao.index_by("tags")
+        assert get_nested.call_count == 0
+        assert ao.find(tags=["a"]) == [{"id": 1, "tags": ["a"]}]
+        assert get_nested.call_count == 2
+
+
+def test_query_invalid_usage():
+    ao = make_query_response()
+    with pytest.raises(ValueError):
+        ao.find()
+    with pytest.raises(ValueError):
+        ao.items("missing[*]")
+    with pytest.raises(ValueError):
+        ao.items("total[*]")
+    stream = AoResponse(cached_response=Mock(), is_stream=True)
+    with pytest.raises(ValueError):
+        stream.first()
+
+# 9. attrs 序列化测试
 def test_attrs_asdict():
     req = JSONRequest(url='/u', method='GET', headers={'h': 'v'}, params={'p': 3}, json={'j': 4})
     d = asdict(req)
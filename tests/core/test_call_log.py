@@ -0,0 +1,97 @@
+import json
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from click.testing import CliRunner
+
+from aomaker.core.call_log import (
+    CallLogWriter,
+    call_log_files,
+    clean_call_logs,
+    iter_call_records,
+    summarize_calls,
+)
+
+
+def test_writer_appends_compact_lines(tmp_path):
+    path = tmp_path / "calls" / "w.jsonl"
+    writer = CallLogWriter(str(path), fsync_interval=0)
+    writer.write({"method": "GET", "route": "/a", "elapsed_ms": 1.5})
+    writer.write({"method": "GET", "route": "/a", "elapsed_ms": 2.5})
+    # fsync_interval=0 时每次写入都会落盘
+    assert path.read_text().splitlines() == [
+        '{"method":"GET","route":"/a","elapsed_ms":1.5}',
+        '{"method":"GET","route":"/a","elapsed_ms":2.5}',
+    ]
+    writer.close()
+
+
+def test_reader_skips_partial_lines(tmp_path):
+    path = tmp_path / "a.jsonl"
+    path.write_text('{"route": "/a", "elapsed_ms": 1}\n\n{"route": "/a", "elap')
+    assert list(iter_call_records([str(path)])) == [{"route": "/a", "elapsed_ms": 1}]
+
+
+def test_summarize_calls_groups_by_endpoint():
+    records = [{"method": "get", "route": "/users/{id}", "status": 200, "elapsed_ms": ms} for ms in range(1, 101)]
+    records += [{"method": "POST", "route": "/users", "status": 500, "elapsed_ms": 10},
+                {"method": "POST", "route": "/users", "status": None, "elapsed_ms": 20, "retries": 2}]
+    summary = summarize_calls(records)
+
+    users = summary[("GET", "/users/{id}")]
+    assert users.count == 100
+    assert users.errors == 0
+    assert abs(users.histogram.quantile(0.5) - 50) <= 1
+    assert summary[("POST", "/users")].errors == 2
+    assert summary[("POST", "/users")].retries == 2
+
+
+def test_clean_call_logs(tmp_path):
+    (tmp_path / "a.jsonl").write_text("{}\n")
+    (tmp_path / "keep.txt").write_text("x")
+    clean_call_logs(str(tmp_path))
+    assert call_log_files(str(tmp_path)) == []
+    assert (tmp_path / "keep.txt").exists()
+
+
+def test_logging_middleware_writes_call_record(tmp_path):
+    from aomaker.core.middlewares.logging_middleware import structured_logging_middleware
+    from aomaker.core.middlewares.registry import registry, register_internal_middlewares
+    register_internal_middlewares()
+    registry.apply_config({"logging_middleware": {"options": {
+        "call_log": True, "call_log_dir": str(tmp_path), "call_log_fsync_interval": 0}}})
+
+    response = MagicMock(status_code=201, content=b'{"id": 1}', elapsed=timedelta(seconds=0.1))
+    response.request.headers = {"Content-Length": "12"}
+    request = {"url": "http://test.com/users", "method": "POST", "json": {"name": "a"},
+               "_api_meta": {"class_name": "CreateUser", "route": "/users"}}
+    with patch("aomaker.core.middlewares.logging_middleware.logger"), \
+            patch("aomaker.core.middlewares.logging_middleware.allure.attach"):
+        structured_logging_middleware(request, MagicMock(return_value=response))
+
+    files = call_log_files(str(tmp_path))
+    assert len(files) == 1
+    record = json.loads(open(files[0]).read())
+    assert record["class"] == "CreateUser"
+    assert record["method"] == "POST"
+    assert record["route"] == "/users"
+    assert record["status"] == 201
+    assert record["req_bytes"] == 12
+    assert record["resp_bytes"] == 9
+    assert record["elapsed_ms"] >= 0
+    assert record["worker"] == "MainThread"
+    assert "test_logging_middleware_writes_call_record" in record["node"]
+    clean_call_logs(str(tmp_path))
+
+
+def test_show_calls_command(tmp_path):
+    from aomaker.cli import main
+    lines = [json.dumps({"method": "GET", "route": "/slow", "status": 200, "elapsed_ms": 900}),
+             json.dumps({"method": "GET", "route": "/fast", "status": 200, "elapsed_ms": 5})]
+    (tmp_path / "w.jsonl").write_text("\n".join(lines) + "\n")
+
+    result = CliRunner().invoke(main, ["show", "calls", "--path", str(tmp_path)])
+
+    assert result.exit_code == 0, result.output
+    assert "Total calls: 2" in result.output
+    assert result.output.index("/slow") < result.output.index("/fast")
@@ -0,0 +1,134 @@
+import sys
+from array import array
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from aomaker.core.base_model import AoResponse
+from aomaker.core.columnar import Columns, locate_rows
+
+ROWS = [
+    {"id": 1, "status": "ok", "size": 10, "score": 0.5, "owner": {"name": "a"}},
+    {"id": 2, "status": "ok", "size": 20, "score": 1.5, "owner": {"name": "b"}},
+    {"id": 3, "status": "ok", "size": 30, "score": 2, "owner": None},
+]
+
+
+def make_ao_response(payload):
+    cached = Mock()
+    cached.json = Mock(return_value=payload)
+    return AoResponse(cached_response=cached)
+
+
+def test_locate_rows():
+    payload = {"data": {"items": ROWS}}
+    assert locate_rows(payload, "data.items[*]") is ROWS
+    assert locate_rows(ROWS, "[*]") is ROWS
+    with pytest.raises(ValueError, match="不存在路径"):
+        locate_rows(payload, "rows[*]")
+    with pytest.raises(ValueError, match="不是数组"):
+        locate_rows(payload, "data[*]")
+
+
+def test_columns_array_backend_types():
+    cols = Columns.from_rows(ROWS, ["id", "status", "score", "owner.name"], backend="array")
+    assert len(cols) == 3
+    assert cols["id"] == array("q", [1, 2, 3])
+    assert cols["score"] == array("d", [0.5, 1.5, 2.0])
+    assert cols["status"] == ["ok", "ok", "ok"]
+    assert cols["owner.name"] == ["a", "b", None]
+
+
+def test_columns_assertions():
+    cols = Columns.from_rows(ROWS, ["id", "status", "size"], backend="array")
+    assert cols.all("status", "ok")
+    assert not cols.all("size", 10)
+    assert cols.all("size", predicate=lambda v: v >= 10)
+    assert cols.unique("id")
+    assert not cols.unique("status")
+    assert cols.is_sorted("id")
+    assert not cols.is_sorted("id", reverse=True)
+    assert cols.sum("size") == 60
+    assert cols.to_dict()["size"] == [10, 20, 30]
+
+
+def test_columns_all_requires_one_condition():
+    cols = Columns.from_rows(ROWS, ["id"], backend="array")
+    with pytest.raises(ValueError):
+        cols.all("id")
+    with pytest.raises(KeyError):
+        cols["missing"]
+
+
+def test_columns_invalid_backend():
+    with pytest.raises(ValueError):
+        Columns.from_rows(ROWS, ["id"], backend="pandas")
+
+
+def test_columns_duplicate_fields_extracted_once():
+    cols = Columns.from_rows(ROWS, ["id", "id", "owner.name", "owner.name"], backend="array")
+    assert cols.fields == ["id", "owner.name"]
+    assert cols["id"] == array("q", [1, 2, 3])
+    assert cols["owner.name"] == ["a", "b", None]
+
+
+def test_columns_non_dict_row():
+    with pytest.raises(ValueError, match="第 2 行不是对象"):
+        Columns.from_rows([{"id": 1}, [2]], ["id"], backend="array")
+
+
+def test_columns_unhashable_values():
+    cols = Columns.from_rows(ROWS, ["owner"], backend="array")
+    assert cols.unique("owner")
+    assert not Columns.from_rows(ROWS + ROWS[:1], ["owner"], backend="array").unique("owner")
+
+
+def test_columns_numpy_only_for_numeric(monkeypatch):
+    """numpy 后端下非数值列回退为 array，不依赖 numpy 是否安装"""
+    fake_numpy = SimpleNamespace(asarray=lambda values: ("ndarray", list(values)))
+    monkeypatch.setitem(sys.modules, "numpy", fake_numpy)
+    rows = ROWS + [{"id": 4, "status": None, "size": "40", "score": 3.5, "owner": {"name": "d"}}]
+
+    cols = Columns.from_rows(rows, ["id", "score", "status", "size", "owner", "owner.name"])
+
+    assert cols.backend == "numpy"
+    assert cols["id"] == ("ndarray", [1, 2, 3, 4])
+    assert cols["score"] == ("ndarray", [0.5, 1.5, 2.0, 3.5])
+    for name in ("status", "size", "owner", "owner.name"):
+        assert cols.backend_of(name) == "array"
+    assert cols.to_list("status") == ["ok", "ok", "ok", None]
+    assert not cols.all("status", "ok")
+    assert cols.unique("owner")
+
+
+def test_columns_numpy_backend():
+    pytest.importorskip("numpy")
+    cols = Columns.from_rows(ROWS, ["id", "status", "size"], backend="numpy")
+    assert cols.all("status", "ok")
+    assert cols.unique("id")
+    assert cols.is_sorted("size")
+    assert cols.sum("size") == 60
+
+
+def test_columns_pyarrow_backend():
+    pytest.importorskip("pyarrow")
+    cols = Columns.from_rows(ROWS, ["id", "status", "size"], backend="pyarrow")
+    assert cols.all("status", "ok")
+    assert cols.unique("id")
+    assert cols.is_sorted("size")
+    assert cols.sum("size") == 60
+
+
+def test_ao_response_columns():
+    ao = make_ao_response({"data": ROWS, "total": 3})
+    cols = ao.columns("id", "status", backend="array")
+    assert cols.all("status", "ok")
+    assert cols.fields == ["id", "status"]
+
+
+def test_ao_response_columns_stream_not_supported():
+    ao = make_ao_response({})
+    ao.is_stream = True
+    with pytest.raises(ValueError):
+        ao.columns("id")
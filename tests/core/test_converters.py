@@ -675,4 +675,66 @@ def test_convert_with_post_prepare_modification(monkeypatch):
     assert "headers" in final_result
     assert "X-Modified-By-PostPrepare" in final_result.get("headers", {}), \
         "Header added by post_prepare was not found in the final converted result"
-    assert final_result["headers"]["X-Modified-By-PostPrepare"] == "yes" 
\ No newline at end of file
+    assert final_result["headers"]["X-Modified-By-PostPrepare"] == "yes" 
+
+def test_compact_array_converters():
+    from array import array
+    from aomaker.core.converters import int_array, float_array
+
+    assert int_array([1, 2, 3]) == array("q", [1, 2, 3])
+    assert int_array(None) is None
+    huge = [2 ** 70]
+    assert int_array(huge) is huge
+    assert float_array([1, 2.5]) == array("d", [1.0, 2.5])
+    mixed = [1.0, "x"]
+    assert float_array(mixed) is mixed
+
+
+# --- Tests for field alias registry ---
+
+@define
+class AliasChild:
+    from_: str = field()
+    x_id: Optional[int] = field(default=None, metadata={"original_name": "x-id"})
+
+
+@define
+class AliasParent:
+    class_: str = field()
+    children: list[AliasChild] = field(factory=list)
+
+
+def test_field_alias_nested_structure_and_unstructure():
+    converter = RequestConverter()
+    data = {"class": "p", "children": [{"from": "a", "x-id": 1}, {"from": "b"}]}
+    parent = converter.structure(data, AliasParent)
+    assert parent == AliasParent(class_="p", children=[AliasChild(from_="a", x_id=1), AliasChild(from_="b")])
+    assert converter.unstructure(parent) == {
+        "class": "p",
+        "children": [{"from": "a", "x-id": 1}, {"from": "b", "x-id": None}],
+    }
+
+
+def test_field_alias_untyped_containers():
+    converter = RequestConverter()
+    child = AliasChild(from_="a")
+    assert converter.unstructure([child]) == [{"from": "a", "x-id": None}]
+    assert converter.unstructure({"k": child}) == {"k": {"from": "a", "x-id": None}}
+
+
+def test_field_alias_resolved_once_per_class():
+    from aomaker.core import converters as converters_module
+
+    @define
+    class OnceModel:
+        in_: int = field()
+
+    with patch.object(converters_module, "_get_keyword_alias_fields",
+                      wraps=converters_module._get_keyword_alias_fields) as spy:
+        converter = RequestConverter()
+        for i in range(3):
+            assert converter.unstructure([OnceModel(in_=i)]) == [{"in": i}]
+            assert converter.structure({"in": i}, OnceModel) == OnceModel(in_=i)
+
+    assert [c.args[0] for c in spy.call_args_list].count(OnceModel) == 1
+    assert converters_module.get_field_aliases(OnceModel) == {"in_": "in"}
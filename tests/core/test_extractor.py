@@ -0,0 +1,66 @@
+import pytest
+import requests
+from jsonpath import jsonpath
+
+from aomaker._aomaker import _extract_by_jsonpath
+from aomaker.core.base_model import AoResponse
+from aomaker.core.extractor import compile_jsonpath, extract, extract_one
+from aomaker.core.http_client import CachedResponse
+from aomaker.exceptions import JsonPathExtractFailed
+
+DATA = {
+    "data": [{"id": 1, "owner": {"id": 9}, "tags": ["a", "b"]}, {"id": 2, "tags": []}],
+    "meta": {"total": 2, "page-size": 20},
+}
+
+
+def _cached(data=DATA):
+    raw = requests.Response()
+    raw.status_code = 200
+    raw._content = requests.compat.json.dumps(data).encode()
+    return CachedResponse(raw)
+
+
+@pytest.mark.parametrize("expr", [
+    "$.data[*].id",
+    "$..id",
+    "$.meta.*",
+    "$.data[0].tags[1:]",
+    "$.data[1]['id']",
+    "$.meta.page-size",
+    "$..tags[0]",
+    "$.data[?(@.id > 1)].id",
+    "$.missing.path",
+])
+def test_matches_jsonpath_package(expr):
+    assert extract(DATA, expr) == (jsonpath(DATA, expr) or [])
+
+
+def test_simple_paths_use_fast_path():
+    assert compile_jsonpath("$.data[0].owner.id").simple
+    assert compile_jsonpath("data[0]['owner']").simple
+    assert not compile_jsonpath("$.data[*].id").simple
+    assert extract(DATA, "data[-1].id") == [2]
+    assert extract(DATA, "$.data[5].id") == []
+
+
+def test_compiled_expressions_are_cached():
+    assert compile_jsonpath("$.meta.total") is compile_jsonpath("$.meta.total")
+    assert compile_jsonpath.cache_info().maxsize == 1024
+
+
+def test_extract_from_responses_without_structuring():
+    cached = _cached()
+    assert extract(cached, "$.data[*].id") == [1, 2]
+    assert extract('{"a": [1, 2]}', "a[1]") == [2]
+
+    response = AoResponse(cached_response=cached, response_model=None)
+    assert response.extract("$.meta.total") == [2]
+
+
+def test_extract_one():
+    assert extract_one(DATA, "$.data[*].id", index=1) == 2
+    assert extract_one(DATA, "$.nope", default=None) is None
+    with pytest.raises(JsonPathExtractFailed):
+        extract_one(DATA, "$.nope")
+    assert _extract_by_jsonpath(DATA, "$..owner.id", 0) == 9
@@ -137,4 +137,22 @@ def test_get_http_client_singleton_and_cache_update(monkeypatch):
     # 验证单例返回
     assert client1 is client2
     # 验证从 cache 更新 headers
-    assert client1.session.headers.get('X-Cache') == 'CACHED' 
\ No newline at end of file
+    assert client1.session.headers.get('X-Cache') == 'CACHED' 
+
+def test_send_request_uses_endpoint_scoped_chain():
+    calls = []
+
+    def signing(request, call_next):
+        calls.append(request["_api_meta"]["class_name"])
+        return call_next(request)
+
+    client = HTTPClient()
+    client.session = FakeSession()
+    registry.register(signing, name="signing", match={"api": "Pay*"})
+
+    client.send_request({'method': 'POST', 'url': 'http://pay', '_api_meta': {'class_name': 'PayOrder'}})
+    client.send_request({'method': 'GET', 'url': 'http://user', '_api_meta': {'class_name': 'GetUser'}})
+    client.send_request({'method': 'POST', 'url': 'http://pay', '_api_meta': {'class_name': 'PayOrder'}})
+
+    assert calls == ['PayOrder', 'PayOrder']
+    assert len(client._handlers) == 2
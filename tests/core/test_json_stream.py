@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+from aomaker.core.json_stream import (
+    JSONArrayStreamParser,
+    iter_json_items,
+    aiter_json_items,
+    parse_stream_path,
+)
+
+
+def split_bytes(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("[*]", []),
+    ("$[*]", []),
+    ("$.data[*]", ["data"]),
+    ("data.items[*]", ["data", "items"]),
+])
+def test_parse_stream_path(path, expected):
+    assert parse_stream_path(path) == expected
+
+
+@pytest.mark.parametrize("path", ["data.items", "data[0].items[*]", "data..items[*]"])
+def test_parse_stream_path_invalid(path):
+    with pytest.raises(ValueError):
+        parse_stream_path(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+def test_iter_json_items_nested_path(chunk_size):
+    payload = {
+        "code": 0,
+        "meta": {"tags": ["a", "]", "{"], "note": "skip \"me\" \\ please"},
+        "data": {
+            "total": 3,
+            "items": [
+                {"id": 1, "name": "中文", "nested": {"x": [1, 2, {"y": "}"}]}},
+                {"id": 2, "name": "esc\\\"aped"},
+                {"id": 3, "name": None},
+            ],
+            "after": [1, 2, 3],
+        },
+    }
+    raw = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+
+    items = list(iter_json_items(split_bytes(raw, chunk_size), "data.items[*]"))
+
+    assert items == payload["data"]["items"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_iter_json_items_top_level_scalars(chunk_size):
+    raw = b'[1, -2.5e3, true, false, null, "s", [], {}]'
+    items = list(iter_json_items(split_bytes(raw, chunk_size)))
+    assert items == [1, -2.5e3, True, False, None, "s", [], {}]
+
+
+def test_iter_json_items_empty_array():
+    assert list(iter_json_items([b'{"data": []}'], "data[*]")) == []
+
+
+def test_iter_json_items_missing_path():
+    with pytest.raises(ValueError, match="不存在路径"):
+        list(iter_json_items([b'{"other": [1]}'], "data[*]"))
+
+
+def test_iter_json_items_truncated_stream():
+    with pytest.raises(ValueError, match="不完整"):
+        list(iter_json_items([b'{"data": [{"id": 1}, {"id"'], "data[*]"))
+
+
+def test_iter_json_items_stops_reading_after_array():
+    consumed = []
+
+    def chunks():
+        for chunk in (b'{"data": [1, 2]', b', "tail": "x"}'):
+            consumed.append(chunk)
+            yield chunk
+
+    assert list(iter_json_items(chunks(), "data[*]")) == [1, 2]
+    assert len(consumed) == 1
+
+
+def test_parser_keeps_buffer_bounded():
+    parser = JSONArrayStreamParser("items[*]")
+    parser.feed(b'{"items": [')
+    for i in range(1000):
+        parser.feed(json.dumps({"id": i, "payload": "x" * 100}).encode() + b",")
+        assert len(parser._buf) < 300
+    parser.feed(b'{"id": -1}]}')
+    parser.close()
+    assert parser.done
+
+
+def test_parser_compacts_once_per_feed():
+    parser = JSONArrayStreamParser("[*]")
+    items = parser.feed("[" + "1," * 5000 + '{"a": [1, ')
+    assert items == [1] * 5000
+    assert parser._buf == '{"a": [1, '
+    assert parser.feed("2]}]") == [{"a": [1, 2]}]
+
+
+def test_parser_skips_large_sibling_value_without_buffering():
+    parser = JSONArrayStreamParser("items[*]")
+    parser.feed(b'{"blob": "')
+    for _ in range(100):
+        parser.feed(b"y" * 1000)
+        assert len(parser._buf) < 1100
+    assert parser.feed(b'", "items": [1]}') == [1]
+
+
+def test_aiter_json_items():
+    async def chunks():
+        for chunk in split_bytes(b'{"data": {"items": [{"id": 1}, {"id": 2}]}}', 4):
+            yield chunk
+
+    async def collect():
+        return [item async for item in aiter_json_items(chunks(), "data.items[*]")]
+
+    assert asyncio.run(collect()) == [{"id": 1}, {"id": 2}]
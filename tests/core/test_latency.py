@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from aomaker.core.latency import LatencyHistogram
+
+
+def exact_quantile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def test_quantiles_within_precision():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    hist = LatencyHistogram(precision=0.01)
+    hist.extend(values)
+
+    assert hist.count == len(values)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        expected = exact_quantile(values, q)
+        assert abs(hist.quantile(q) - expected) / expected <= 0.011
+    assert hist.quantile(0) == min(values)
+    assert hist.quantile(1) == max(values)
+
+
+def test_empty_and_zero_values():
+    hist = LatencyHistogram()
+    assert hist.quantile(0.5) is None
+    assert hist.mean is None
+    hist.add(0)
+    hist.add(0)
+    assert hist.quantile(0.5) == 0
+    with pytest.raises(ValueError):
+        hist.quantile(1.5)
+
+
+def test_merge_and_round_trip():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.extend([1, 2, 3])
+    b.extend([100, 200])
+    merged = LatencyHistogram.from_dict(a.to_dict()).merge(b)
+    assert merged.count == 5
+    assert merged.min == 1 and merged.max == 200
+    assert merged.total == 306
+    assert LatencyHistogram.from_dict(merged.to_dict()).quantiles() == merged.quantiles()
+    with pytest.raises(ValueError):
+        merged.merge(LatencyHistogram(precision=0.05))
@@ -0,0 +1,139 @@
+import io
+import hashlib
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from requests.models import RequestEncodingMixin
+
+from aomaker.core import multipart
+from aomaker.core.base_model import AoResponse
+from aomaker.core.http_client import CachedResponse, HTTPClient
+from aomaker.core.middlewares import retry_middleware as retry_mod
+from aomaker.core.middlewares.retry_middleware import RetryOptions, retry_middleware
+from aomaker.core.multipart import MultipartEncoder
+
+
+def _same_as_requests(files, data=None):
+    """用 requests 自带的编码结果（及其 boundary）作为基准"""
+    body, content_type = RequestEncodingMixin._encode_files(files, data or {})
+    boundary = content_type.split("boundary=")[1]
+    return body, boundary
+
+
+def test_encoding_matches_requests():
+    files = {"report": ("report.txt", b"hello", "text/plain"), "raw": io.BytesIO(b"\x00\x01")}
+    data = {"name": "job", "tags": ["a", "b"]}
+    expected, boundary = _same_as_requests(dict(files, raw=io.BytesIO(b"\x00\x01")), data)
+
+    encoder = MultipartEncoder(files, data, boundary=boundary)
+
+    assert encoder.to_bytes() == expected
+    assert len(encoder) == len(expected)
+
+
+def test_file_streamed_in_chunks_and_rewound(tmp_path, monkeypatch):
+    monkeypatch.setattr(multipart, "MMAP_THRESHOLD", 1024)
+    source = tmp_path / "big.bin"
+    source.write_bytes(bytes(range(256)) * 40)
+    progress = []
+
+    with open(source, "rb") as f:
+        f.read(10)
+        encoder = MultipartEncoder({"file": ("big.bin", f)}, chunk_size=1000,
+                                   progress=lambda sent, total: progress.append((sent, total)))
+        first = b"".join(bytes(chunk) for chunk in encoder)
+        # 重新迭代（如重试）会完整地重新发送
+        second = b"".join(bytes(chunk) for chunk in encoder)
+        assert max(len(chunk) for chunk in encoder) <= 1000
+
+    assert first == second
+    assert len(first) == len(encoder)
+    assert source.read_bytes()[10:] in first
+    assert progress[-1] == (len(encoder), len(encoder))
+
+
+def test_path_values_opened_and_closed(tmp_path):
+    source = tmp_path / "data.csv"
+    source.write_text("a,b\n1,2\n")
+    encoder = MultipartEncoder({"upload": source})
+    body = encoder.to_bytes()
+    assert b'filename="data.csv"' in body and b"a,b\n1,2\n" in body
+    opened = list(encoder._opened)
+    encoder.close()
+    assert all(f.closed for f in opened)
+
+
+def test_http_client_streams_files():
+    client = HTTPClient()
+    client.session = MagicMock()
+    client.session.request.return_value = requests.Response()
+    progress = MagicMock()
+
+    client._send({"method": "POST", "url": "http://api/upload", "files": {"f": ("a.txt", b"abc")},
+                  "data": {"k": "v"}, "headers": {"content-type": "application/json"},
+                  "upload_progress": progress})
+
+    kwargs = client.session.request.call_args.kwargs
+    assert "files" not in kwargs and "upload_progress" not in kwargs
+    assert isinstance(kwargs["data"], MultipartEncoder)
+    assert kwargs["headers"] == {"Content-Type": kwargs["data"].content_type}
+    assert kwargs["data"].progress is progress
+
+
+def test_retried_upload_resends_whole_file(monkeypatch):
+    monkeypatch.setattr(retry_mod, "get_retry_options", lambda: RetryOptions(max_retries=1, backoff_base=0))
+    monkeypatch.setattr(retry_mod.time, "sleep", lambda _: None)
+    bodies, statuses = [], [503, 200]
+
+    def request(**kwargs):
+        bodies.append(b"".join(bytes(chunk) for chunk in kwargs["data"]))
+        raw = requests.Response()
+        raw.status_code = statuses.pop(0)
+        return raw
+
+    client = HTTPClient()
+    client.session = MagicMock()
+    client.session.request.side_effect = request
+    upload = io.BytesIO(b"header" + b"payload" * 10)
+    upload.read(6)
+
+    response = retry_middleware({"method": "PUT", "url": "http://api/upload", "headers": {},
+                                 "files": {"f": ("a.bin", upload)}, "_api_meta": {"class_name": "Upload"}},
+                                call_next=client._send)
+
+    retry_mod.recorder.drain_retries()
+    assert response.status_code == 200
+    # 每次发送的 boundary 不同，长度与文件内容一致
+    assert len(bodies) == 2 and len(bodies[0]) == len(bodies[1])
+    assert all(b"payload" * 10 in body and b"header" not in body for body in bodies)
+
+
+def _response(chunks, stream=True):
+    raw = MagicMock()
+    raw.iter_content.return_value = iter(chunks)
+    return AoResponse(cached_response=CachedResponse(raw), is_stream=stream)
+
+
+def test_save_to_streams_with_checksum(tmp_path):
+    chunks = [b"a" * 10, b"", b"b" * 5]
+    response = _response(chunks)
+    target = tmp_path / "nested" / "artifact.bin"
+
+    result = response.save_to(target, chunk_size=8)
+
+    assert Path(result.path).read_bytes() == b"a" * 10 + b"b" * 5
+    assert result.size == 15
+    assert result.checksum == hashlib.sha256(b"a" * 10 + b"b" * 5).hexdigest()
+    response.cached_response.raw_response.iter_content.assert_called_once_with(chunk_size=8)
+    response.cached_response.raw_response.close.assert_called_once()
+    assert not (tmp_path / "nested" / "artifact.bin.part").exists()
+
+
+def test_save_to_checksum_mismatch_removes_file(tmp_path):
+    target = tmp_path / "artifact.bin"
+    with pytest.raises(ValueError, match="校验失败"):
+        _response([b"data"]).save_to(target, algorithm="md5", expected_checksum="0" * 32)
+    assert not target.exists()
+    assert not (tmp_path / "artifact.bin.part").exists()
@@ -0,0 +1,80 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from aomaker.core.polling import JobPoller, wait_until
+from aomaker.exceptions import WaitTimeoutError
+from aomaker.models import ExecuteAsyncJobCondition
+
+
+class FakeJobApi:
+    """前 pending 次返回 running，之后返回 done"""
+
+    def __init__(self, pending=2):
+        self.pending = pending
+        self.sent = []
+        self.structured = 0
+        self.threads = set()
+
+    def send(self, structure=True):
+        self.sent.append((time.monotonic(), structure))
+        self.threads.add(threading.current_thread().name)
+        status = "running" if len(self.sent) <= self.pending else "done"
+        body = {"data": {"jobs": [{"id": 1, "status": status}]}, "ret_code": 0}
+        return SimpleNamespace(cached_response=SimpleNamespace(json=lambda: body))
+
+    def _handle_response(self, cached_response):
+        self.structured += 1
+        return SimpleNamespace(cached_response=cached_response, response_model="model")
+
+
+def test_wait_until_backs_off_and_structures_once():
+    api = FakeJobApi(pending=3)
+    condition = ExecuteAsyncJobCondition(expr="$.data.jobs[0].status", expected_value="done")
+
+    result = wait_until(api, condition, timeout=5, initial_interval=0.01, max_interval=0.03, backoff=2)
+
+    assert result.response_model == "model"
+    assert api.structured == 1
+    assert [structure for _, structure in api.sent] == [False] * 4
+    gaps = [b[0] - a[0] for a, b in zip(api.sent, api.sent[1:])]
+    assert gaps[0] >= 0.009 and gaps[1] >= 0.019 and gaps[2] >= 0.029
+    assert all(name.startswith("aomaker-poll") for name in api.threads)
+
+
+def test_wait_until_times_out():
+    api = FakeJobApi(pending=10 ** 6)
+    start = time.monotonic()
+    with pytest.raises(WaitTimeoutError) as exc_info:
+        wait_until(api, {"expr": "$.data.jobs[0].status", "expected_value": "done"},
+                   timeout=0.2, initial_interval=0.02, max_interval=0.05)
+    assert time.monotonic() - start < 1
+    assert exc_info.value.last_value == "running"
+    assert exc_info.value.attempts == len(api.sent)
+
+
+def test_many_pollers_share_workers():
+    poller = JobPoller(max_workers=2)
+    apis = [FakeJobApi(pending=2) for _ in range(20)]
+    futures = [poller.submit(api, {"expr": "data.jobs[0].status", "expected_value": "done"},
+                             timeout=5, initial_interval=0.01, max_interval=0.02) for api in apis]
+
+    assert all(future.result(timeout=5).response_model == "model" for future in futures)
+    threads = set().union(*(api.threads for api in apis))
+    assert len(threads) <= 2
+
+
+def test_send_error_propagates():
+    class BrokenApi(FakeJobApi):
+        def send(self, structure=True):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        wait_until(BrokenApi(), {"expr": "$.x", "expected_value": 1}, timeout=1)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        JobPoller().submit(FakeJobApi(), {"expr": "$.x", "expected_value": 1}, backoff=0.5)
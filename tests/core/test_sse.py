@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from attrs import define
+
+from aomaker.core.base_model import AoResponse
+from aomaker.core.http_client import CachedResponse
+from aomaker.core.sse import SSEParser, ServerSentEvent, aiter_sse_events, iter_sse_events
+
+STREAM = (
+    "\ufeff: keep-alive\r\n"
+    "retry: 3000\r\n"
+    "\r\n"
+    "event: delta\r\n"
+    "id: 1\r\n"
+    "data: {\"text\": \"he\"}\r\n"
+    "\r\n"
+    "data:first\n"
+    "data:  second\n"
+    "\n"
+    "id\n"
+    "data\n"
+    "\r"
+    "event: ignored-without-data\n"
+    "\n"
+    "data: truncated"
+).encode()
+
+EXPECTED = [
+    ServerSentEvent(data='{"text": "he"}', event="delta", id="1", retry=3000),
+    ServerSentEvent(data="first\n second", id="1", retry=3000),
+]
+
+
+def split_bytes(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 4096])
+def test_iter_sse_events_any_chunking(chunk_size):
+    assert list(iter_sse_events(split_bytes(STREAM, chunk_size))) == EXPECTED
+
+
+def test_crlf_split_across_chunks_is_one_line_end():
+    parser = SSEParser()
+    assert parser.feed(b"data: a\r") == []
+    assert parser.feed(b"\n\r") == []
+    assert parser.feed(b"\ndata: b\r\r") == [ServerSentEvent(data="a")]
+    assert parser.close() == [ServerSentEvent(data="b")]
+
+
+def test_multibyte_and_invalid_fields():
+    data = "data: 你好\nid: a\0b\nretry: 1x\nfoo: bar\n\n".encode()
+    assert list(iter_sse_events(split_bytes(data, 1))) == [ServerSentEvent(data="你好")]
+
+
+def test_empty_data_not_dispatched():
+    data = b"data:\n\nevent: ping\ndata:\n\ndata:\ndata:\n\n"
+    assert list(iter_sse_events([data])) == [ServerSentEvent(data="\n")]
+
+
+def test_buffer_limit():
+    parser = SSEParser(max_buffer_size=16)
+    with pytest.raises(ValueError, match="缓冲上限"):
+        parser.feed(b"data: " + b"x" * 32)
+
+
+def test_aiter_sse_events():
+    async def chunks():
+        for chunk in split_bytes(STREAM, 3):
+            yield chunk
+
+    async def collect():
+        return [event async for event in aiter_sse_events(chunks())]
+
+    assert asyncio.run(collect()) == EXPECTED
+
+
+@define
+class Delta:
+    text: str
+
+
+LLM_STREAM = b"".join(b'data: {"text": "%d"}\n\n' % i for i in range(3)) + b"data: [DONE]\n\ndata: {\"text\": \"late\"}\n\n"
+
+
+def _response(chunks, response_type=None):
+    raw = MagicMock()
+    raw.iter_content.return_value = iter(chunks)
+    return AoResponse(cached_response=CachedResponse(raw), is_stream=True, response_type=response_type)
+
+
+def test_iter_events_structures_and_stops_at_done():
+    response = _response(split_bytes(LLM_STREAM, 7), response_type=Delta)
+
+    events = list(response.iter_events(decode_json=True))
+
+    assert [event.data for event in events] == [Delta("0"), Delta("1"), Delta("2")]
+    response.cached_response.raw_response.close.assert_called_once()
+
+
+def test_iter_events_raw_and_process_stream():
+    events = list(_response([LLM_STREAM]).iter_events(stop_data=None))
+    assert events[3].data == "[DONE]" and len(events) == 5
+
+    seen = []
+    _response([LLM_STREAM]).process_stream(stream_mode="sse", callback=seen.append)
+    assert seen[0] == ServerSentEvent(data='{"text": "0"}')
+
+
+def test_aiter_events():
+    response = _response(split_bytes(LLM_STREAM, 4))
+
+    async def collect():
+        return [event.data async for event in response.aiter_events(item_type=Delta)]
+
+    assert asyncio.run(collect()) == [Delta("0"), Delta("1"), Delta("2")]
+    response.cached_response.raw_response.close.assert_called_once()
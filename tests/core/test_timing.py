@@ -0,0 +1,95 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from aomaker.core.http_client import CachedResponse
+from aomaker.core.middlewares.latency_middleware import LatencyRecorder
+from aomaker.core.timing import RequestTiming, TimingAdapter, current_timing, mount_timing_adapter
+from aomaker.storage import PhaseTiming
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"x" * 4096
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_phases_recorded_and_connection_reuse(base_url):
+    with mount_timing_adapter(requests.Session()) as session:
+        first = session.get(f"{base_url}/a").timing
+        second = session.get(f"{base_url}/b").timing
+
+    assert first.reused is False
+    assert first.dns_ms is not None and first.connect_ms is not None
+    assert first.tls_ms is None
+    assert first.ttfb_ms > 0 and first.download_ms is not None
+    assert first.total_ms >= first.ttfb_ms
+
+    assert second.reused is True
+    assert second.dns_ms is None and second.connect_ms is None
+    assert set(second.phases()) == {"ttfb", "download"}
+    assert current_timing() is None
+
+
+def test_stream_response_has_no_download_phase(base_url):
+    with mount_timing_adapter(requests.Session()) as session:
+        response = session.get(f"{base_url}/stream", stream=True)
+        assert response.timing.download_ms is None
+        assert len(response.content) == 4096
+
+
+def test_connection_errors_still_raised():
+    session = requests.Session()
+    session.mount("http://", TimingAdapter(max_retries=0))
+    with pytest.raises(requests.ConnectionError):
+        session.get("http://127.0.0.1:9/", timeout=1)
+    assert current_timing() is None
+
+
+def test_cached_response_timing():
+    raw = requests.Response()
+    assert CachedResponse(raw).timing is None
+    raw.timing = RequestTiming(ttfb_ms=1.0)
+    assert CachedResponse(raw).timing.ttfb_ms == 1.0
+    assert CachedResponse(MagicMock()).timing is None
+
+
+def test_phase_timing_flushed(tmp_path, monkeypatch):
+    db = PhaseTiming(db_path=str(tmp_path / "phases.db"))
+    monkeypatch.setattr("aomaker.storage.phase_timing", db)
+    rec = LatencyRecorder()
+    rec.record_timing("Orders", RequestTiming(dns_ms=2, connect_ms=1, ttfb_ms=30, download_ms=5, reused=False))
+    for _ in range(3):
+        rec.record_timing("Orders", RequestTiming(ttfb_ms=20, download_ms=5))
+    rec.flush()
+    try:
+        [row] = db.summary()
+        assert row["requests"] == 4
+        assert row["new_connections"] == 1
+        assert row["reuse_rate"] == 0.75
+        assert row["dns_p50"] == pytest.approx(2, rel=0.02)
+        assert row["tls_p50"] is None
+        assert row["ttfb_p50"] == pytest.approx(20, rel=0.02)
+    finally:
+        db.close()
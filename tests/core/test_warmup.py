@@ -0,0 +1,150 @@
+import inspect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import urllib3
+from urllib3.connectionpool import HTTPConnectionPool
+
+from aomaker.core import dns_cache as dns_cache_mod
+from aomaker.core import warmup as warmup_mod
+from aomaker.core.dns_cache import DNSCache
+from aomaker.core.http_client import HTTPClient
+from aomaker.core.timing import mount_timing_adapter
+from aomaker.core.warmup import WarmupOptions, warmup_connections, warmup_host
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.connections = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(httpd):
+    return f"http://localhost:{httpd.server_address[1]}"
+
+
+def test_warmed_connections_are_reused(server):
+    session = mount_timing_adapter(requests.Session())
+
+    assert warmup_host(session, _url(server), connections=3) == 3
+    timings = [session.get(f"{_url(server)}/ping").timing for _ in range(3)]
+
+    assert all(timing.reused for timing in timings)
+    assert _Handler.connections == 3
+
+
+def test_warmup_capped_at_pool_size(server):
+    session = mount_timing_adapter(requests.Session())
+    assert warmup_host(session, _url(server), connections=50) == 10
+
+
+def test_unreachable_host_only_warns(server):
+    session = mount_timing_adapter(requests.Session())
+    options = WarmupOptions(connections=2, hosts=("http://127.0.0.1:9",), timeout=1)
+
+    opened = warmup_connections(session, _url(server), options)
+
+    assert opened == {_url(server): 2, "http://127.0.0.1:9": 0}
+    assert session.get(_url(server)).status_code == 200
+
+
+def test_warmup_http_client_once_per_process(server, monkeypatch):
+    calls = []
+    settings = {"warmup": {"connections": 1}, "base_url": _url(server)}
+    monkeypatch.setattr("aomaker.storage.config.get", settings.get)
+    monkeypatch.setattr(warmup_mod, "warmup_connections", lambda *args: calls.append(args) or {})
+    monkeypatch.setattr(warmup_mod, "_warmed_pid", None)
+    monkeypatch.setattr("aomaker.core.http_client.get_http_client", lambda: HTTPClient())
+
+    warmup_mod.warmup_http_client()
+    warmup_mod.warmup_http_client()
+
+    [(_, base_url, options)] = calls
+    assert base_url == _url(server) and options.connections == 1
+
+
+def test_dns_cache_ttl_and_single_flight(monkeypatch):
+    lookups = []
+
+    def slow_resolve(host, port):
+        lookups.append(host)
+        time.sleep(0.05)
+        return ["10.0.0.1"]
+
+    monkeypatch.setattr(dns_cache_mod, "resolve", slow_resolve)
+    cache = DNSCache(ttl=60)
+    threads = [threading.Thread(target=cache.resolve, args=("api.example.com", 443)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lookups == ["api.example.com"]
+
+    now = time.monotonic()
+    monkeypatch.setattr(dns_cache_mod.time, "monotonic", lambda: now + 61)
+    assert cache.resolve("api.example.com", 443) == ["10.0.0.1"]
+    assert len(lookups) == 2
+
+    cache.ttl = 0
+    cache.resolve("api.example.com", 443)
+    assert len(lookups) == 3
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        WarmupOptions.from_dict({"connection": 4})
+    with pytest.raises(ValueError):
+        WarmupOptions(connections=-1)
+    with pytest.raises(ValueError):
+        WarmupOptions(dns_ttl=-1)
+    assert WarmupOptions.from_dict({"hosts": ["https://a"]}).hosts == ("https://a",)
+
+
+def test_dns_ttl_only_applied_when_configured(monkeypatch):
+    session = requests.Session()
+    monkeypatch.setattr(dns_cache_mod.dns_cache, "ttl", 0)
+    warmup_connections(session, "http://127.0.0.1:9", WarmupOptions())
+    assert dns_cache_mod.dns_cache.ttl == 0
+    warmup_connections(session, "http://127.0.0.1:9", WarmupOptions(dns_ttl=30))
+    assert dns_cache_mod.dns_cache.ttl == 30
+
+
+def test_supported_urllib3_pool_api():
+    """预热依赖连接池的私有方法，urllib3 升级到未验证的大版本时需要重新确认"""
+    assert urllib3.__version__.split(".")[0] in ("1", "2")
+    assert "timeout" in inspect.signature(HTTPConnectionPool._get_conn).parameters
+    assert list(inspect.signature(HTTPConnectionPool._put_conn).parameters) == ["self", "conn"]
+
+
+def test_pool_without_private_api_skipped(server, monkeypatch):
+    class _Pool:
+        pool = None
+
+    monkeypatch.setattr(warmup_mod, "_connection_pool", lambda session, url: _Pool())
+    assert warmup_host(requests.Session(), _url(server), connections=2) == 0
+    assert _Handler.connections == 0
@@ -1,6 +1,7 @@
 import pytest
 from typing import Optional
 from aomaker.maker.generator import collect_apis_imports, collect_models_imports,generate_imports, ImportManager
+from aomaker.maker.generator import Generator, TemplateRenderUtils as _TemplateRenderUtils
 from aomaker.maker.models import Import, DataType, DataModelField, DataModel, Endpoint
 from aomaker.maker.config import OpenAPIConfig
 
@@ -233,4 +234,98 @@ def test_format_invalid_python_raises():
     """
     bad = "def bad(:\n    pass"
     with pytest.raises(black.InvalidInput):
-        g._format_content(bad)
\ No newline at end of file
+        g._format_content(bad)
+
+# tests for compact model options
+
+
+def _int_list_field(name="ids", required=True):
+    dt = DataType(type="List[int]", is_list=True, data_types=[DataType(type="int")])
+    return DataModelField(name=name, data_type=dt, required=required)
+
+
+def test_render_define_args_default_is_unchanged():
+    render_utils = _TemplateRenderUtils(config=OpenAPIConfig())
+    assert render_utils.render_define_args(kw_only=True) == "(kw_only=True)"
+    assert render_utils.render_define_args() == ""
+
+
+def test_render_define_args_compact_frozen():
+    cfg = OpenAPIConfig(compact_models=True, model_frozen=True, model_cache_hash=True)
+    render_utils = _TemplateRenderUtils(config=cfg)
+    assert render_utils.render_define_args(kw_only=True) == \
+        "(kw_only=True, frozen=True, weakref_slot=False, cache_hash=True)"
+
+
+def test_cache_hash_requires_frozen():
+    with pytest.raises(ValueError):
+        OpenAPIConfig(model_cache_hash=True)
+
+
+def test_compact_arrays_field_converter():
+    render_utils = _TemplateRenderUtils(config=OpenAPIConfig(compact_arrays=True))
+    assert render_utils.get_required_field_parameters(_int_list_field()) == "converter=int_array"
+    assert render_utils.get_optional_field_parameters(_int_list_field(required=False)) == \
+        "default=None, converter=int_array"
+    str_field = DataModelField(name="s", data_type=DataType(type="str"))
+    assert render_utils.render_field_converter(str_field) == ""
+
+
+def test_compact_arrays_disabled_by_default():
+    render_utils = _TemplateRenderUtils(config=OpenAPIConfig())
+    assert render_utils.get_required_field_parameters(_int_list_field()) == ""
+
+
+def test_collect_models_imports_compact_arrays():
+    model = DataModel(name="M", fields=[_int_list_field()])
+    keys = set(collect_models_imports([model], OpenAPIConfig(compact_arrays=True))._imports.keys())
+    assert ("aomaker.core.converters", "int_array") in keys
+    keys = set(collect_models_imports([model], OpenAPIConfig())._imports.keys())
+    assert ("aomaker.core.converters", "int_array") not in keys
+    lines = generate_imports(collect_models_imports([model], OpenAPIConfig(compact_arrays=True)),
+                             exclude_internal=True)
+    assert "from aomaker.core.converters import int_array" in lines
+
+
+def test_compact_arrays_only_on_response_models(tmp_path):
+    cfg = OpenAPIConfig(compact_arrays=True)
+    endpoint = Endpoint(class_name="ListAPI", path="/items/{ids}", method="get",
+                        path_parameters=[_int_list_field()],
+                        query_parameters=[_int_list_field("sizes", required=False)],
+                        request_body=DataModel(name="Body", fields=[_int_list_field("values")]))
+    keys = set(collect_apis_imports([endpoint], cfg)._imports.keys())
+    assert ("aomaker.core.converters", "int_array") not in keys
+
+    content = Generator(str(tmp_path), cfg).env.get_template("apis.j2").render(imports=[], endpoints=[endpoint])
+    assert "class PathParams" in content and "class RequestBodyModel" in content
+    assert "converter" not in content
+
+def _ref_field(name, model_name):
+    return DataModelField(name=name, data_type=DataType(type=model_name, is_custom_type=True))
+
+
+def test_compact_arrays_only_on_response_reachable_models(tmp_path):
+    from aomaker.maker.models import APIGroup
+    item = DataModel(name="Item", fields=[DataModelField(
+        name="scores", data_type=DataType(type="List[float]", is_list=True, data_types=[DataType(type="float")]))])
+    shared = DataModel(name="Shared", fields=[_int_list_field("tags")])
+    resp = DataModel(name="ListResp", fields=[_int_list_field(), _ref_field("item", "Item"),
+                                              _ref_field("shared", "Shared")])
+    body = DataModel(name="CreateReq", fields=[_int_list_field("ids"), _ref_field("shared", "Shared")])
+    models = {m.name: m for m in (item, shared, resp, body)}
+    group = APIGroup(tag="items", models=models, endpoints=[
+        Endpoint(class_name="ListAPI", path="/items", method="get", response=resp),
+        Endpoint(class_name="CreateAPI", path="/items", method="post", request_body=body),
+    ])
+    Generator(str(tmp_path), OpenAPIConfig(compact_arrays=True)).generate([group])
+    content = (tmp_path / "items" / "models.py").read_text(encoding="utf-8")
+
+    def class_body(name):
+        return content.split(f"class {name}:")[1].split("\n\n\n")[0]
+
+    assert "converter=int_array" in class_body("ListResp")
+    assert "converter=float_array" in class_body("Item")
+    # 请求体模型、以及与请求体共用的模型按原样序列化
+    assert "converter" not in class_body("CreateReq")
+    assert "converter" not in class_body("Shared")
+    assert "from aomaker.core.converters import float_array, int_array" in content
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 
 from aomaker.storage import cache, config
 import aomaker.session as session_mod
@@ -30,7 +30,7 @@ def test_setup_without_env_no_hooks(monkeypatch):
 
     cache.clear.assert_called_once()
     ch.set_conf_file.assert_not_called()
-    config.set.assert_called_once_with('run_mode', cfg.run_mode)
+    config.set.assert_has_calls([call('run_mode', cfg.run_mode), call('profile_middlewares', False)])
     session_mod.Session.set_session_vars.assert_called_once_with(login_obj=cfg.login_obj)
     ctx_module.clean_allure_json.assert_called_once()
     hm.cli_hook.run.assert_not_called()
@@ -58,7 +58,7 @@ def test_setup_with_env_and_hooks(monkeypatch):
     cache.clear.assert_called_once()
     # Assert the mock within the context module was called
     mock_set_conf.assert_called_once_with('dev')
-    config.set.assert_called_once_with('run_mode', 'mp')
+    config.set.assert_has_calls([call('run_mode', 'mp'), call('profile_middlewares', False)])
     session_mod.Session.set_session_vars.assert_called_once_with(login_obj=dummy_login)
     ctx_module.clean_allure_json.assert_called_once()
     hm.cli_hook.run.assert_called_once()
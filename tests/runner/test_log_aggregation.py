@@ -0,0 +1,62 @@
+import re
+import multiprocessing
+
+import pytest
+
+import aomaker.log as aomaker_log
+from aomaker.log import LogAggregator, init_worker_logging, logger
+
+LINE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} \[(?P<worker>[^\]]+)\]-\[[^\]]+\]-\[.+\]-\[INFO\]:(?P<msg>.*)$")
+
+
+def _emit_lines(count):
+    for i in range(count):
+        logger.info(f"line-{i}")
+    return multiprocessing.current_process().name
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="需要 fork 启动方式")
+def test_aggregator_collects_worker_logs(tmp_path):
+    log_file = tmp_path / "aggregated.log"
+    aggregator = LogAggregator(log_file_path=str(log_file), batch_size=16)
+    aggregator.start()
+    try:
+        logger.info("from-main")
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(2, initializer=init_worker_logging,
+                      initargs=(aggregator.queue, True, str(tmp_path))) as pool:
+            workers = pool.map(_emit_lines, [40, 40])
+            pool.close()
+            pool.join()
+    finally:
+        aggregator.stop()
+
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    parsed = [LINE_PATTERN.match(line) for line in lines]
+    assert all(parsed), lines
+    by_worker = {}
+    for match in parsed:
+        by_worker.setdefault(match.group("worker"), []).append(match.group("msg"))
+
+    assert by_worker.pop(multiprocessing.current_process().name) == ["from-main"]
+    assert sum(len(msgs) for msgs in by_worker.values()) == 80
+    assert set(by_worker) <= set(workers)
+
+    for worker in set(workers):
+        per_worker = tmp_path / f"{worker}.log"
+        assert per_worker.exists()
+        assert len(per_worker.read_text(encoding="utf-8").splitlines()) == len(by_worker.get(worker, []))
+
+
+def test_aggregator_stop_restores_sinks(tmp_path):
+    file_handler_id = aomaker_log.file_handler_id
+    aggregator = LogAggregator(log_file_path=str(tmp_path / "aggregated.log"))
+    aggregator.start()
+    assert aomaker_log.queue_handler_id is not None
+    assert aomaker_log.file_handler_id is None
+    aggregator.stop()
+
+    assert aomaker_log.queue_handler_id is None
+    assert aomaker_log.aggregate_handler_id is None
+    assert (aomaker_log.file_handler_id is None) == (file_handler_id is None)
+    aggregator.stop()  # 重复调用无副作用
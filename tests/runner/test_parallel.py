@@ -32,7 +32,7 @@ def test_processes_runner_run_without_specified_processes(mock_print, mock_calc,
 
     mock_print.assert_called_once_with("🚀多进程模式准备启动...")
     mock_calc.assert_called_once_with(['t1', 't2', 't3'])
-    mock_exec.assert_called_once_with(3, ['t1', 't2', 't3'], ['E1'], ['p1', 'p2'])
+    mock_exec.assert_called_once_with(3, ['t1', 't2', 't3'], ['E1'], ['p1', 'p2'], per_worker_log=False)
 
 
 @patch('aomaker.runner.parallel.ProcessesRunner._execute_tasks')
@@ -48,7 +48,7 @@ def test_processes_runner_run_with_specified_processes(mock_print, mock_exec, mo
 
     runner.run(run_config)
 
-    mock_exec.assert_called_once_with(4, ['x1', 'x2', 'x3', 'x4'], ['E2'], ['pX'])
+    mock_exec.assert_called_once_with(4, ['x1', 'x2', 'x3', 'x4'], ['E2'], ['pX'], per_worker_log=False)
 
 
 @patch('aomaker.runner.parallel.make_args_group', return_value=[['R1'], ['R2']])